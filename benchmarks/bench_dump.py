@@ -0,0 +1,60 @@
+"""Benchmark: writing a compiled syllabus of 10,000 lessons with the
+original serializers and the ones in syllabus.models.
+
+Run from the repository root:
+
+    python benchmarks/bench_dump.py [--lessons N] [--repeat N]
+
+The course is the synthetic one from bench_load.py.
+"""
+
+import argparse
+import json
+import tempfile
+import timeit
+from pathlib import Path
+
+import yaml
+
+from bench_load import make_course
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lessons', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    course = make_course(args.lessons)
+    opts = dict(exclude_defaults=True, exclude_none=True, by_alias=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'syllabus.yaml'
+
+        cases = [
+            ('yaml.dump to string', 'yaml', lambda: path.write_text(
+                yaml.dump(course.model_dump(**opts), sort_keys=False)
+            )),
+            ('Course.to_yaml(path)', 'yaml',
+             lambda: course.to_yaml(path=path)),
+            ('json.dumps', 'json', lambda: path.write_text(
+                json.dumps(course.model_dump(), indent=4)
+            )),
+            ('Course.to_json(path)', 'json',
+             lambda: course.to_json(path=path)),
+        ]
+
+        print(f"{'serializer':<30}{'ms':>10}{'speedup':>9}")
+
+        expected, base = {}, {}
+        for name, kind, fn in cases:
+            fn()
+            out = path.read_text()
+            assert expected.setdefault(kind, out) == out, name
+            t = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            base.setdefault(kind, t)
+            print(f"{name:<30}{t * 1000:>10.1f}{base[kind] / t:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Micro-benchmark: the import scanner in syllabus.util.get_imports against
+the original full-AST implementation.
+
+Run from the repository root:
+
+    python benchmarks/bench_imports.py [--repeat N]
+
+Exercise files are built by repeating the Python files from
+test/lessons-source, so the timings reflect realistic code at a range of
+file sizes.
+"""
+
+import argparse
+import ast
+import tempfile
+import timeit
+from pathlib import Path
+
+from syllabus.util import get_imports
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DIR = ROOT / 'test' / 'lessons-source'
+
+
+def legacy_get_imports(filepath: Path) -> list[str]:
+    """get_imports as it was before the line scanner."""
+
+    with open(filepath, "r", encoding="utf-8") as file:
+        node = ast.parse(file.read(), filename=filepath)
+    imports: set[str] = set()
+
+    for n in ast.walk(node):
+        if isinstance(n, ast.Import):
+            for alias in n.names:
+                imports.add(alias.name.split('.')[0])
+        elif isinstance(n, ast.ImportFrom):
+            if n.module is not None:
+                imports.add(n.module.split('.')[0])
+
+    return sorted(imports)
+
+
+def make_files(dest: Path) -> list[Path]:
+    """Write exercise files of increasing size built from the fixtures."""
+
+    corpus = '\n\n'.join(
+        p.read_text(encoding='utf-8')
+        for p in sorted(SOURCE_DIR.rglob('*.py'))
+    )
+
+    files = []
+    for copies in (1, 10, 100):
+        p = dest / f'exercise_x{copies}.py'
+        p.write_text('\n\n'.join([corpus] * copies), encoding='utf-8')
+        files.append(p)
+    return files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = make_files(Path(tmp))
+
+        print(f"{'file':<22}{'lines':>8}{'legacy ms':>12}"
+              f"{'scanner ms':>12}{'speedup':>9}")
+
+        for p in files:
+            assert get_imports(p) == legacy_get_imports(p), p
+
+            lines = p.read_text(encoding='utf-8').count('\n')
+            legacy = min(timeit.repeat(
+                lambda: legacy_get_imports(p), number=1, repeat=args.repeat
+            ))
+            scanner = min(timeit.repeat(
+                lambda: get_imports(p), number=1, repeat=args.repeat
+            ))
+            print(f"{p.name:<22}{lines:>8}{legacy * 1000:>12.2f}"
+                  f"{scanner * 1000:>12.2f}{legacy / scanner:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark: loading a compiled syllabus of 10,000 lessons, with the
+original pure-Python loader and the fast load paths in syllabus.models.
+
+Run from the repository root:
+
+    python benchmarks/bench_load.py [--lessons N] [--repeat N]
+
+The course is synthetic: modules of lesson sets, each holding twenty
+lessons with the fields a compile produces.
+"""
+
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+
+import yaml
+
+from syllabus.models import Course, Lesson, LessonSet, Module, SafeLoader
+
+
+def make_course(n_lessons: int) -> Course:
+    """Build a course with ``n_lessons`` lessons."""
+
+    modules = []
+    n = 0
+    while n < n_lessons:
+        m = len(modules)
+        sets = []
+        for s in range(10):
+            lessons = []
+            for i in range(20):
+                rank = f'{m + 1:02d}/{s + 1:02d}/{i + 1:03d}'
+                lessons.append(Lesson(
+                    name=f'Lesson {n}',
+                    uid=f'u{n:07d}',
+                    path=rank,
+                    exercise=f'{rank}_Lesson_{n}.py',
+                    display=i % 3 == 0,
+                ))
+                n += 1
+            sets.append(LessonSet(
+                name=f'Set {s}', uid=f's{m}{s}', lessons=lessons
+            ))
+        modules.append(Module(
+            name=f'Module {m}', uid=f'm{m}', description='A module.',
+            lessons=sets
+        ))
+
+    return Course(name='Benchmark', uid='bench', modules=modules)
+
+
+def legacy_from_yaml(path: Path) -> Course:
+    """Course.from_yaml as it was before the fast load path."""
+
+    with open(path, encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    return Course(**data)
+
+
+def construct_course(data: dict) -> Course:
+    """Build the course without validation, using model_construct. This is
+    here to show that it is slower than validating in pydantic-core, so a
+    "trusted" load mode does not pay off."""
+
+    def construct_lesson(d):
+        if 'lessons' in d:
+            lessons = [construct_lesson(l) for l in d['lessons']]
+            return LessonSet.model_construct(**{**d, 'lessons': lessons})
+        return Lesson.model_construct(**d)
+
+    modules = [
+        Module.model_construct(**{
+            **m, 'lessons': [construct_lesson(l) for l in m['lessons']]
+        })
+        for m in data['modules']
+    ]
+    return Course.model_construct(**{**data, 'modules': modules})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lessons', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    course = make_course(args.lessons)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'syllabus.yaml'
+        course.to_yaml(path=path)
+        course.write_sidecar(path)
+
+        cases = [
+            ('yaml.safe_load + validate', lambda: legacy_from_yaml(path)),
+            (f'{SafeLoader.__name__} + validate',
+             lambda: Course.from_yaml(path)),
+            (f'{SafeLoader.__name__} + construct',
+             lambda: construct_course(
+                 yaml.load(path.read_text(encoding='utf-8'), SafeLoader)
+             )),
+            ('JSON sidecar', lambda: Course.load(path)),
+        ]
+
+        expected = legacy_from_yaml(path).model_dump()
+        print(f"{args.lessons} lessons, "
+              f"{path.stat().st_size // 1024} KiB of YAML\n")
+        print(f"{'loader':<30}{'ms':>10}{'speedup':>9}")
+
+        base = None
+        for name, fn in cases:
+            assert fn().model_dump() == expected, name
+            t = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            base = base or t
+            print(f"{name:<30}{t * 1000:>10.1f}{base / t:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Startup benchmark: how long the light syl commands take to start, and
+which modules they import.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [--repeat N] [--budget MS] [--top N]
+        [--modules N] [--sets N] [--lessons N] ...
+
+``python -X importtime`` is run on ``syllabus.cli.main`` and the slowest
+of the imports under it are listed. Then ``syl --version``, ``syl
+version`` and ``syl check`` are run in fresh interpreters on a synthetic
+curriculum, keeping the best of ``--repeat`` runs, and compared with an
+interpreter that does nothing. The exit status is 1 if the CLI imports
+one of the heavy libraries that only some commands need, or if a light
+command takes more than ``--budget`` milliseconds longer than the empty
+interpreter.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from curriculum import add_arguments, make_curriculum, spec_from_args
+
+# Libraries that only the commands that build or write models need
+HEAVY = ('pydantic', 'yaml', 'frontmatter')
+
+importtime_p = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """Return (module, self, cumulative) times, in microseconds, of
+    ``module`` and the modules imported by importing it."""
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True,
+    )
+
+    # A module is listed after the modules it imports, so the ones under
+    # ``module`` are those since the last top-level import before it
+    times = []
+    for line in result.stderr.splitlines():
+        m = importtime_p.match(line)
+        if not m:
+            continue
+        name, depth = m.group(4), len(m.group(3))
+        times.append((name, int(m.group(1)), int(m.group(2))))
+        if depth == 1 and name != module:
+            times = []
+
+    return times
+
+
+def best_time(argv: list[str], repeat: int) -> float:
+    """Return the best wall time of running ``argv``."""
+
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        subprocess.run(argv, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=150,
+                        help="Most milliseconds a light command may add to "
+                             "the start of the interpreter.")
+    parser.add_argument('--top', type=int, default=10,
+                        help="How many of the slowest imports to list.")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    failures = []
+
+    times = import_times('syllabus.cli.main')
+    total = times[-1][2]
+
+    print(f"{'import':<32}{'self ms':>10}{'cum ms':>10}")
+    for name, own, cum in sorted(times[:-1], key=lambda t: -t[2])[:args.top]:
+        print(f"{name:<32}{own / 1000:>10.1f}{cum / 1000:>10.1f}")
+    print(f"syllabus.cli.main imports in {total / 1000:.1f} ms")
+
+    heavy = sorted({name.split('.')[0] for name, _, _ in times}
+                   & set(HEAVY))
+    if heavy:
+        failures.append('syllabus.cli.main imports ' + ', '.join(heavy))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lessons = make_curriculum(Path(tmp) / 'lessons', spec_from_args(args))
+
+        commands = {
+            'syl --version': ['--version'],
+            'syl version': ['-l', str(lessons), 'version'],
+            'syl check': ['-l', str(lessons), 'check'],
+        }
+
+        python = best_time([sys.executable, '-c', 'pass'], args.repeat)
+
+        print(f"\n{'command':<32}{'ms':>10}{'+ms':>10}")
+        print(f"{'python -c pass':<32}{python * 1000:>10.1f}")
+        for name, cmd in commands.items():
+            t = best_time(
+                [sys.executable, '-m', 'syllabus.cli.main', *cmd],
+                args.repeat
+            )
+            extra = (t - python) * 1000
+            flag = '  OVER BUDGET' if extra > args.budget else ''
+            print(f"{name:<32}{t * 1000:>10.1f}{extra:>10.1f}{flag}")
+            if flag:
+                failures.append(f"{name} took {extra:.0f} ms to start")
+
+    if failures:
+        print('\n' + '\n'.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""Benchmark suite: the main syl operations on a synthetic curriculum,
+with results in JSON and a comparison against a stored baseline.
+
+Run from the repository root:
+
+    python benchmarks/bench_suite.py [--repeat N] [--output FILE]
+        [--baseline FILE] [--save-baseline] [--threshold RATIO]
+        [--modules N] [--sets N] [--lessons N] ...
+
+Each case runs on a fresh copy of a tree from curriculum.py, so cases
+that change the tree always start from the same one; the copy is not
+timed. The best of ``--repeat`` runs is kept. With a baseline, a case
+more than ``--threshold`` times slower than the baseline is reported as a
+regression and the exit status is 1. The baseline in this directory was
+made with the default curriculum.
+
+The peak memory of compiling with a warm compile cache is also measured,
+with tracemalloc, once as the pydantic Course and once as the tree of
+nodes that ``compile_syllabus(model=False)`` returns, and is compared
+with the baseline in the same way.
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+from typing import Callable
+
+from curriculum import add_arguments, make_curriculum, spec_from_args
+
+from syllabus.analysis import FileAnalysis
+from syllabus.cache import CompileCache
+from syllabus.models import Course
+from syllabus.sync import (
+    check_structure,
+    compile_syllabus,
+    metafy_lessons,
+    regroup_lessons,
+    renumber_lessons,
+)
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+
+def _compile(d: Path) -> None:
+    compile_syllabus(d)
+
+
+def _compile_tree(d: Path) -> None:
+    compile_syllabus(d, model=False)
+
+
+def _renumber(d: Path) -> None:
+    renumber_lessons(d, increment=1, dryrun=False)
+
+
+def _regroup(d: Path) -> None:
+    regroup_lessons(d, dryrun=False)
+
+
+def _metafy(d: Path) -> None:
+    metafy_lessons(d, dryrun=False)
+
+
+def _check(d: Path) -> None:
+    check_structure(d)
+
+
+def _from_yaml(d: Path) -> None:
+    Course.from_yaml(d / '.jtl' / 'syllabus.yaml')
+
+
+def _prepare_yaml(d: Path) -> None:
+    course = compile_syllabus(d)
+    (d / '.jtl').mkdir(exist_ok=True)
+    course.to_yaml(path=d / '.jtl' / 'syllabus.yaml')
+
+
+def _prime_cache(d: Path) -> None:
+    cache = CompileCache.load(d)
+    compile_syllabus(d, cache=cache, model=False)
+    cache.save()
+
+
+def _compile_cached(d: Path) -> None:
+    compile_syllabus(d, cache=CompileCache.load(d))
+
+
+def _compile_tree_cached(d: Path) -> None:
+    compile_syllabus(d, cache=CompileCache.load(d), model=False)
+
+
+# Name, the function to time, and an untimed setup step
+CASES: list[tuple[str, Callable[[Path], None], Callable | None]] = [
+    ('check_structure', _check, None),
+    ('compile_syllabus', _compile, None),
+    ('compile_tree', _compile_tree, None),
+    ('renumber_lessons', _renumber, None),
+    ('regroup_lessons', _regroup, None),
+    ('metafy_lessons', _metafy, None),
+    ('Course.from_yaml', _from_yaml, _prepare_yaml),
+]
+
+# Name, the function to measure, and an unmeasured setup step
+MEMORY_CASES: list[tuple[str, Callable[[Path], None], Callable | None]] = [
+    ('compile_syllabus', _compile_cached, _prime_cache),
+    ('compile_tree', _compile_tree_cached, _prime_cache),
+]
+
+
+def fresh_copy(source: Path, work: Path, setup: Callable | None) -> None:
+    """Copy the tree to ``work`` and run the setup step on it."""
+
+    if work.exists():
+        shutil.rmtree(work)
+    shutil.copytree(source, work)
+    FileAnalysis.clear()
+    if setup is not None:
+        setup(work)
+        FileAnalysis.clear()
+
+
+def run_case(
+    source: Path, work: Path, fn: Callable, setup: Callable | None,
+    repeat: int
+) -> float:
+    """Return the best time of ``fn`` over ``repeat`` fresh copies of the
+    tree."""
+
+    best = float('inf')
+
+    for _ in range(repeat):
+        fresh_copy(source, work, setup)
+
+        t = time.perf_counter()
+        fn(work)
+        best = min(best, time.perf_counter() - t)
+
+    return best
+
+
+def peak_memory(
+    source: Path, work: Path, fn: Callable, setup: Callable | None
+) -> int:
+    """Return the peak bytes allocated while running ``fn`` on a fresh
+    copy of the tree."""
+
+    fresh_copy(source, work, setup)
+
+    tracemalloc.start()
+    try:
+        fn(work)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare(
+    results: dict, spec: dict, baseline: dict, threshold: float,
+    section: str = 'results', unit: str = 'ms', scale: float = 1000
+) -> list[str]:
+    """Print the results next to the ``section`` of the baseline, in
+    ``unit``, and return the names of the cases that regressed."""
+
+    regressions = []
+    base = baseline.get(section, {})
+
+    print(f"\n{'case':<20}{unit:>10}{'baseline':>10}{'ratio':>8}")
+    for name, t in results.items():
+        b = base.get(name)
+        if b is None:
+            print(f"{name:<20}{t * scale:>10.1f}{'-':>10}{'-':>8}")
+            continue
+        ratio = t / b
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{name:<20}{t * scale:>10.1f}{b * scale:>10.1f}"
+              f"{ratio:>7.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Write the results as the new baseline.")
+    parser.add_argument('--threshold', type=float, default=1.25)
+    parser.add_argument('--only', action='append', default=None,
+                        help="Run only this case; may be repeated.")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+
+    # Serialization warnings would be timed along with the work
+    warnings.simplefilter('ignore')
+
+    results: dict[str, float] = {}
+    memory: dict[str, int] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_curriculum(Path(tmp) / 'source', spec)
+        work = Path(tmp) / 'lessons'
+
+        n_files = sum(1 for p in source.rglob('*') if p.is_file())
+        print(f"{spec.n_lessons} lessons, {n_files} files")
+
+        for name, fn, setup in CASES:
+            if args.only and name not in args.only:
+                continue
+            results[name] = run_case(source, work, fn, setup, args.repeat)
+            print(f"{name:<20}{results[name] * 1000:>10.1f} ms")
+
+        for name, fn, setup in MEMORY_CASES:
+            if args.only and name not in args.only:
+                continue
+            memory[name] = peak_memory(source, work, fn, setup)
+            print(f"{name:<20}{memory[name] / 1e6:>10.1f} MB peak")
+
+    report = {
+        'spec': spec.as_dict(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+        'memory': memory,
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(
+            results, spec.as_dict(), baseline, args.threshold
+        )
+        regressions += [
+            f"{name} (memory)" for name in compare(
+                memory, spec.as_dict(), baseline, args.threshold,
+                section='memory', unit='MB', scale=1e-6,
+            )
+        ]
+        if baseline.get('spec') != spec.as_dict():
+            print("\nNote: the baseline was made with a different "
+                  "curriculum")
+        if regressions:
+            print(f"\n{len(regressions)} regressions: "
+                  + ', '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
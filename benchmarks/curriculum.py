@@ -0,0 +1,204 @@
+"""Synthetic lesson trees for benchmarks.
+
+:func:`make_curriculum` writes a lesson directory of any size, laid out
+like a real course: ranked modules of ranked lesson sets, each with a
+README, holding Python, markdown and notebook lessons. Some lessons are a
+Python file and a markdown file with the same name, for regroup to
+gather up, and notebooks carry an embedded output of a chosen size.
+
+Run from the repository root to write a tree to look at:
+
+    python benchmarks/curriculum.py DEST [--modules N] [--sets N] ...
+"""
+
+import argparse
+import base64
+import json
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+
+@dataclass
+class CurriculumSpec:
+    """The shape of a synthetic curriculum."""
+
+    modules: int = 10
+    sets: int = 5
+    lessons: int = 50  # Per lesson set
+    py: float = 0.6  # Mix of lesson file types, by weight
+    md: float = 0.2
+    ipynb: float = 0.2
+    pairs: float = 0.1  # Share of Python lessons with a markdown twin
+    output_kb: int = 20  # Size of the embedded output in each notebook
+    tagged: bool = False  # Whether lessons already have a uid and name
+    seed: int = 1
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def n_lessons(self) -> int:
+        return self.modules * self.sets * self.lessons
+
+
+PY_BODY = '''import turtle
+
+t = turtle.Turtle()
+
+def draw(n):
+    for i in range(n):
+        t.forward(10 * i)
+        t.left(90)
+
+draw(20)
+'''
+
+MD_BODY = '''# {name}
+
+Some instructions for the lesson, with a list:
+
+* The first thing to do
+* The second thing to do
+
+And a block of code:
+
+    print("Hello")
+'''
+
+
+def _metadata(name: str, uid: str, spec: CurriculumSpec) -> dict:
+    return {'uid': uid, 'name': name} if spec.tagged else {}
+
+
+def _python(name: str, uid: str, spec: CurriculumSpec) -> str:
+    md = _metadata(name, uid, spec)
+    header = ''.join(f'# {k}: {v}\n' for k, v in md.items())
+    return header + '\n' + PY_BODY
+
+
+def _markdown(name: str, uid: str, spec: CurriculumSpec) -> str:
+    md = _metadata(name, uid, spec)
+    front = ''.join(f'{k}: {v}\n' for k, v in md.items())
+    front = f'---\n{front}---\n\n' if front else ''
+    return front + MD_BODY.format(name=name)
+
+
+def _notebook(
+    name: str, uid: str, spec: CurriculumSpec, rng: random.Random
+) -> str:
+    png = base64.b64encode(rng.randbytes(spec.output_kb * 768)).decode()
+    metadata = {'kernelspec': {'name': 'python3'}}
+    if spec.tagged:
+        metadata['syllabus'] = _metadata(name, uid, spec)
+
+    nb = {
+        'cells': [
+            {'cell_type': 'markdown', 'metadata': {},
+             'source': [f'# {name}\n']},
+            {'cell_type': 'code', 'execution_count': 1, 'metadata': {},
+             'outputs': [{'data': {'image/png': png},
+                          'output_type': 'display_data'}],
+             'source': PY_BODY.splitlines(keepends=True)},
+        ],
+        'metadata': metadata,
+        'nbformat': 4,
+        'nbformat_minor': 5,
+    }
+    return json.dumps(nb, indent=1) + '\n'
+
+
+def _readme(name: str, uid: str, spec: CurriculumSpec) -> str:
+    if spec.tagged:
+        return f'---\nuid: {uid}\n---\n\n# {name}\n'
+    return f'# {name}\n'
+
+
+def make_curriculum(dest: Path, spec: CurriculumSpec | None = None) -> Path:
+    """Write a lesson directory at ``dest`` and return it."""
+
+    spec = spec or CurriculumSpec()
+    rng = random.Random(spec.seed)
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+
+    n = 0
+
+    def uid() -> str:
+        nonlocal n
+        n += 1
+        return f'u{n:07d}'
+
+    (dest / 'README.md').write_text(
+        _readme('Benchmark Course', uid(), spec), encoding='utf-8'
+    )
+
+    kinds, weights = ['py', 'md', 'ipynb'], [spec.py, spec.md, spec.ipynb]
+
+    for m in range(1, spec.modules + 1):
+        module = dest / f'{m * 10:02d}_Module_{m}'
+        module.mkdir()
+        (module / 'README.md').write_text(
+            _readme(f'Module {m}', uid(), spec), encoding='utf-8'
+        )
+
+        for s in range(1, spec.sets + 1):
+            lesson_set = module / f'{s * 10:02d}_Set_{s}'
+            lesson_set.mkdir()
+            (lesson_set / 'README.md').write_text(
+                _readme(f'Set {s}', uid(), spec), encoding='utf-8'
+            )
+
+            for i in range(1, spec.lessons + 1):
+                name = f'Lesson {m}.{s}.{i}'
+                stem = f'{i * 10:03d}_Lesson_{i}'
+                kind = rng.choices(kinds, weights)[0]
+
+                if kind == 'ipynb':
+                    text = _notebook(name, uid(), spec, rng)
+                elif kind == 'md':
+                    text = _markdown(name, uid(), spec)
+                else:
+                    text = _python(name, uid(), spec)
+                    if rng.random() < spec.pairs:
+                        (lesson_set / f'{stem}.md').write_text(
+                            _markdown(name, uid(), spec), encoding='utf-8'
+                        )
+
+                (lesson_set / f'{stem}.{kind}').write_text(
+                    text, encoding='utf-8'
+                )
+
+    return dest
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add an option for each field of :class:`CurriculumSpec`."""
+
+    for key, value in CurriculumSpec().as_dict().items():
+        flag = '--' + key.replace('_', '-')
+        if isinstance(value, bool):
+            parser.add_argument(flag, action='store_true')
+        else:
+            parser.add_argument(flag, type=type(value), default=value)
+
+
+def spec_from_args(args: argparse.Namespace) -> CurriculumSpec:
+    return CurriculumSpec(**{
+        k: getattr(args, k) for k in CurriculumSpec().as_dict()
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('dest', type=Path)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    make_curriculum(args.dest, spec)
+    print(f"Wrote {spec.n_lessons} lessons to {args.dest}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,12 @@
-from importlib.metadata import version, PackageNotFoundError
+def __getattr__(name):
+    # importlib.metadata is slow to import, so the version is only looked
+    # up when it is asked for
+    if name == '__version__':
+        from importlib.metadata import version, PackageNotFoundError
 
-try:
-    __version__ = version("jtl-syllabus")
-except PackageNotFoundError:
-    __version__ = "unknown"
+        try:
+            return version("jtl-syllabus")
+        except PackageNotFoundError:
+            return "unknown"
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
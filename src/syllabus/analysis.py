@@ -0,0 +1,123 @@
+"""Read-once analysis of lesson files.
+
+A :class:`FileAnalysis` reads a file once and computes everything the
+syllabus needs from it: imports, docstring and comment metadata,
+frontmatter and the first heading. Analyses are memoized by path, so
+every function in :mod:`syllabus.util`, :mod:`syllabus.sync` and
+:mod:`syllabus.models` shares the same result. Like the compile cache, an
+analysis is only reused while the file's size and mtime are unchanged,
+so a long-lived process sees files that were rewritten. Commands call
+:meth:`FileAnalysis.clear` when they start, and writers call
+:meth:`FileAnalysis.forget` for the files they change."""
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import ClassVar
+
+from syllabus.notebook import cells_imports, scan_notebook
+from syllabus.profile import count, count_read, phase
+from syllabus.util import (
+    imports_from_source,
+    python_metadata_from_source,
+    read_markdown_header,
+)
+
+
+@dataclass
+class FileAnalysis:
+    """Everything extracted from one lesson file."""
+
+    path: Path
+    imports: list[str] = field(default_factory=list)
+    doc_metadata: dict = field(default_factory=dict)
+    comment_metadata: dict = field(default_factory=dict)
+    docstring: str = ''
+    frontmatter: dict = field(default_factory=dict)
+    heading: str | None = None
+    notebook_metadata: dict = field(default_factory=dict)
+
+    # Path -> ((size, mtime_ns), analysis)
+    _memo: ClassVar[dict[Path, tuple[tuple, 'FileAnalysis']]] = {}
+
+    @classmethod
+    def for_path(cls, p: Path) -> 'FileAnalysis':
+        """Return the analysis of a file, reading it on first use, or
+        again if its size or mtime has changed since it was read."""
+
+        p = Path(p)
+        count('fs.stat')
+        st = os.stat(p)
+        sig = (st.st_size, st.st_mtime_ns)
+
+        memo = cls._memo.get(p)
+        if memo is None or memo[0] != sig:
+            memo = cls._memo[p] = (sig, cls.read(p))
+        return memo[1]
+
+    @classmethod
+    def forget(cls, p: Path) -> None:
+        """Drop the memoized analysis of a file that has changed."""
+
+        cls._memo.pop(Path(p), None)
+
+    @classmethod
+    def move(cls, old: Path, new: Path) -> None:
+        """Keep the analysis of a file that was renamed without being
+        changed."""
+
+        memo = cls._memo.pop(Path(old), None)
+        if memo is not None:
+            memo[1].path = Path(new)
+            cls._memo[Path(new)] = memo
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all memoized analyses, at the start of a run."""
+
+        cls._memo.clear()
+
+    @classmethod
+    def read(cls, p: Path) -> 'FileAnalysis':
+        """Read and analyze a file, without memoizing it."""
+
+        with phase('analyze'):
+            return cls._read(Path(p))
+
+    @classmethod
+    def _read(cls, p: Path) -> 'FileAnalysis':
+        analysis = cls(path=p)
+
+        if p.suffix == '.ipynb':
+            analysis.notebook_metadata, cells = scan_notebook(p)
+            analysis.imports = cells_imports(cells, filename=str(p))
+            return analysis
+
+        if p.suffix == '.md':
+            analysis.frontmatter, analysis.heading = read_markdown_header(p)
+            return analysis
+
+        text = p.read_text(encoding='utf-8')
+        count_read(text)
+
+        if p.suffix == '.py':
+            analysis.imports = imports_from_source(text, filename=str(p))
+            (analysis.doc_metadata,
+             analysis.comment_metadata,
+             analysis.docstring) = python_metadata_from_source(
+                text, filename=str(p)
+            )
+
+        return analysis
+
+    @property
+    def metadata(self) -> dict:
+        """The file's syllabus metadata, by file type. Returns a copy."""
+
+        if self.path.suffix == '.ipynb':
+            return dict(self.notebook_metadata.get('syllabus', {}))
+        if self.path.suffix == '.md':
+            return dict(self.frontmatter)
+        if self.path.suffix == '.py':
+            return {**self.doc_metadata, **self.comment_metadata}
+        return {}
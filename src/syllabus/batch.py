@@ -0,0 +1,202 @@
+"""Compile many lesson directories in one run, for ``syl compile-all``.
+
+A repository may hold dozens of courses. Compiling them with one ``syl
+compile`` each pays for starting the interpreter and importing the
+library every time, and builds the courses one after another. Here the
+lesson directories are found, or read from a manifest, and compiled in a
+pool of worker processes. Each worker imports the library once and
+compiles course after course, and each course is compiled through the
+compile cache in its own ``.jtl/``, so an unchanged course is read
+almost entirely from its cache. Each course is written to its
+``.jtl/syllabus.yaml``, as ``syl compile`` would write it.
+
+A course that fails to compile does not stop the others; its error is
+reported in the summary.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from syllabus.nodes import CourseNode, LessonNode
+from syllabus.util import match_rank
+
+MANIFEST_COMMENT = '#'
+
+
+@dataclass
+class CourseResult:
+    """The outcome of compiling one lesson directory."""
+
+    lesson_dir: Path
+    output: Path | None = None
+    seconds: float = 0.0
+    lessons: int = 0
+    hits: int = 0
+    misses: int = 0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _skipped(p: Path) -> bool:
+    # As check_structure, which ignores these at the top of a course
+    return p.name.startswith('.') or p.name.startswith('_')
+
+
+def is_lesson_root(d: Path) -> bool:
+    """Return True if ``d`` looks like a lesson directory: it has a
+    README.md and at least one ranked subdirectory."""
+
+    d = Path(d)
+    if not (d / 'README.md').is_file():
+        return False
+
+    return any(
+        p.is_dir() and not _skipped(p) and match_rank(p)
+        for p in d.iterdir()
+    )
+
+
+def find_lesson_dirs(roots: list[Path]) -> list[Path]:
+    """Return the lesson directories in or under each of ``roots``. The
+    search does not go into a lesson directory once it is found, or into
+    hidden directories."""
+
+    found = []
+
+    def visit(d: Path):
+        if is_lesson_root(d):
+            found.append(d)
+            return
+        try:
+            children = sorted(p for p in d.iterdir() if p.is_dir())
+        except OSError:
+            return
+        for p in children:
+            if not _skipped(p):
+                visit(p)
+
+    for root in roots:
+        visit(Path(root))
+
+    # A root given twice, or inside another root, is compiled once
+    return list(dict.fromkeys(found))
+
+
+def read_manifest(path: Path) -> list[Path]:
+    """Return the lesson directories listed in a manifest file, one per
+    line. Paths are relative to the manifest's directory; blank lines and
+    lines starting with ``#`` are skipped."""
+
+    path = Path(path)
+    dirs = []
+
+    for line in path.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if not line or line.startswith(MANIFEST_COMMENT):
+            continue
+        dirs.append(path.parent / line)
+
+    return dirs
+
+
+def count_lessons(node) -> int:
+    """Return the number of lessons in a compiled course node."""
+
+    if isinstance(node, LessonNode):
+        return 1
+    if isinstance(node, CourseNode):
+        return sum(count_lessons(m) for m in node.modules)
+    return sum(count_lessons(l) for l in node.lessons)
+
+
+def compile_course(lesson_dir: Path, use_cache: bool = True) -> CourseResult:
+    """Compile one lesson directory to its ``.jtl/syllabus.yaml``. Errors
+    are returned in the result rather than raised, so that this can run
+    in a worker process for :func:`compile_all`."""
+
+    from syllabus.cache import CompileCache
+    from syllabus.sync import compile_syllabus
+
+    lesson_dir = Path(lesson_dir)
+    result = CourseResult(lesson_dir)
+    start = time.perf_counter()
+
+    try:
+        cache = CompileCache.load(lesson_dir) if use_cache else None
+        course = compile_syllabus(lesson_dir, cache=cache, model=False)
+
+        output = lesson_dir / '.jtl' / 'syllabus.yaml'
+        output.parent.mkdir(parents=True, exist_ok=True)
+        course.module_dir = str(
+            Path(os.path.relpath(lesson_dir, start=output.parent))
+        )
+        course.to_yaml(path=output)
+
+        if cache is not None:
+            cache.save()
+            result.hits, result.misses = cache.hits, cache.misses
+
+        result.output = output
+        result.lessons = count_lessons(course)
+    except Exception as e:  # pylint: disable=W0718
+        result.error = str(e) or type(e).__name__
+
+    result.seconds = time.perf_counter() - start
+
+    return result
+
+
+def compile_all(
+    lesson_dirs: list[Path], jobs: int = 1, use_cache: bool = True
+) -> list[CourseResult]:
+    """Compile each of ``lesson_dirs``, in a pool of ``jobs`` worker
+    processes. The results are in the order of ``lesson_dirs``."""
+
+    lesson_dirs = [Path(d) for d in lesson_dirs]
+    jobs = min(jobs, len(lesson_dirs))
+
+    if jobs <= 1:
+        return [compile_course(d, use_cache) for d in lesson_dirs]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(
+            compile_course, lesson_dirs, [use_cache] * len(lesson_dirs)
+        ))
+
+
+def summary(results: list[CourseResult], seconds: float) -> str:
+    """Return a table of the courses, with their lesson counts, compile
+    times, cache hits and errors, and a total line."""
+
+    names = [str(r.lesson_dir) for r in results]
+    width = max([len('course')] + [len(n) for n in names]) + 2
+
+    lines = [
+        f"{'course':<{width}}{'lessons':>8}{'ms':>10}{'cache':>12}  status"
+    ]
+    for name, r in zip(names, results):
+        if r.ok:
+            cache = f"{r.hits}/{r.hits + r.misses}"
+            lines.append(
+                f"{name:<{width}}{r.lessons:>8}{r.seconds * 1000:>10.1f}"
+                f"{cache:>12}  ok"
+            )
+        else:
+            lines.append(
+                f"{name:<{width}}{'-':>8}{r.seconds * 1000:>10.1f}"
+                f"{'-':>12}  FAILED: {r.error}"
+            )
+
+    failed = sum(not r.ok for r in results)
+    lines.append(
+        f"{len(results)} courses, {failed} failed, in {seconds:.2f} s"
+    )
+
+    return '\n'.join(lines)
@@ -0,0 +1,192 @@
+"""Persistent cache of per-file lesson analysis, stored under ``.jtl/`` in
+the lesson directory.
+
+Entries are keyed on the file's path relative to the lesson directory and
+are only reused while the file's size and mtime are unchanged, so a
+recompile only re-parses the files that changed."""
+
+import json
+import os
+from pathlib import Path
+
+from syllabus.profile import count, phase
+from syllabus.util import DISPLAY_MODULES, extract_metadata, get_imports
+
+CACHE_VERSION = 1
+CACHE_FILE = 'cache.json'
+
+
+def analyze_file(p: Path) -> dict:
+    """Compute the cacheable facts about a lesson file: its metadata and,
+    for code files, its imports. This is the per-file work that
+    :meth:`CompileCache.prime` sends to worker processes."""
+
+    p = Path(p)
+    entry = {'metadata': extract_metadata(p)}
+    if p.suffix in ('.ipynb', '.py'):
+        entry['imports'] = get_imports(p)
+    return entry
+
+
+class CompileCache:
+    """Cache of extracted metadata, imports and derived Lesson fields.
+
+    A cache created without a path lives only in memory; one created with
+    :meth:`load` is read from, and saved back to, ``.jtl/cache.json``. If
+    a TreeSnapshot is attached, file signatures come from its stat results.
+    """
+
+    def __init__(
+        self, lesson_dir: Path, path: Path | None = None, snapshot=None
+    ):
+        self.lesson_dir = Path(lesson_dir)
+        self.path = path
+        self.snapshot = snapshot
+        self.entries: dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self._checked: set[str] = set()
+
+    @classmethod
+    def load(cls, lesson_dir: Path) -> 'CompileCache':
+        """Load the cache for a lesson directory, or start an empty one if
+        there is no usable cache file."""
+
+        lesson_dir = Path(lesson_dir)
+        cache = cls(lesson_dir, lesson_dir / '.jtl' / CACHE_FILE)
+
+        try:
+            with phase('cache'):
+                data = json.loads(cache.path.read_text(encoding='utf-8'))
+                count('parse.json')
+        except (OSError, ValueError):
+            return cache
+
+        if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+            cache.entries = data.get('entries', {})
+
+        return cache
+
+    def save(self) -> None:
+        """Write the cache back to disk, dropping entries for files that
+        were not seen in this run."""
+
+        if self.path is None:
+            return
+
+        entries = {}
+        for key in sorted(self._checked):
+            entry = self.entries.get(key)
+            try:
+                json.dumps(entry)
+            except (TypeError, ValueError):
+                continue  # e.g. dates in frontmatter; just re-parse next time
+            entries[key] = entry
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps({'version': CACHE_VERSION, 'entries': entries}),
+            encoding='utf-8'
+        )
+
+    def key(self, p: Path) -> str:
+        """Return the cache key for a file, its path relative to the lesson
+        directory."""
+
+        try:
+            return Path(p).relative_to(self.lesson_dir).as_posix()
+        except ValueError:
+            return Path(p).as_posix()
+
+    def entry(self, p: Path) -> dict:
+        """Return the cache entry for a file, discarding it if the file's
+        size or mtime changed since it was stored."""
+
+        key = self.key(p)
+
+        if key not in self._checked:
+            if self.snapshot is not None:
+                st = self.snapshot.stat(p)
+            else:
+                st = os.stat(p)
+            sig = [st.st_size, st.st_mtime_ns]
+            entry = self.entries.get(key)
+            if entry is None or entry.get('sig') != sig:
+                self.entries[key] = {'sig': sig}
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._checked.add(key)
+
+        return self.entries[key]
+
+    def forget(self, p: Path) -> None:
+        """Check the file's signature again the next time it is used, for
+        caches that outlive one compile."""
+
+        self._checked.discard(self.key(p))
+
+    def metadata(self, p: Path) -> dict[str, str]:
+        """Cached version of :func:`syllabus.util.extract_metadata`."""
+
+        entry = self.entry(p)
+        if 'metadata' not in entry:
+            entry['metadata'] = extract_metadata(Path(p))
+        return dict(entry['metadata'])
+
+    def imports(self, p: Path) -> list[str]:
+        """Cached version of :func:`syllabus.util.get_imports`."""
+
+        entry = self.entry(p)
+        if 'imports' not in entry:
+            entry['imports'] = get_imports(Path(p))
+        return list(entry['imports'])
+
+    def needs_display(self, p: Path) -> bool:
+        """Cached version of :func:`syllabus.util.needs_display`."""
+
+        return len(set(self.imports(p)).intersection(DISPLAY_MODULES)) > 0
+
+    def lesson_fields(self, p: Path) -> dict | None:
+        """Return the stored Lesson fields for a single-file lesson, if
+        any."""
+
+        fields = self.entry(p).get('lesson')
+        return dict(fields) if fields is not None else None
+
+    def store_lesson_fields(self, p: Path, fields: dict) -> None:
+        """Store the derived Lesson fields for a single-file lesson."""
+
+        self.entry(p)['lesson'] = fields
+
+    def prime(self, paths: list[Path], jobs: int = 1) -> None:
+        """Analyze every file in ``paths`` that is not already cached,
+        using a pool of ``jobs`` worker processes.
+
+        Only the results are gathered here; callers still build the
+        lesson tree serially, so the output does not depend on ``jobs``.
+        """
+
+        todo = [Path(p) for p in paths if 'metadata' not in self.entry(p)]
+
+        if not todo:
+            return
+
+        if jobs <= 1 or len(todo) == 1:
+            results = map(analyze_file, todo)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            chunksize = max(1, len(todo) // (jobs * 4))
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(
+                    pool.map(analyze_file, todo, chunksize=chunksize)
+                )
+
+        for p, result in zip(todo, results):
+            self.entry(p).update(result)
+
+    def stats(self) -> str:
+        """Return a one-line summary of cache hits and misses."""
+
+        return f"Cache: {self.hits} hits, {self.misses} misses"
@@ -9,8 +9,8 @@ from pathlib import Path
 
 import click
 
-from syllabus.sync import  compile_syllabus, renumber_lessons, regroup_lessons, check_structure, metafy_lessons
-from syllabus import __version__  # Import the package version
+# The library is imported in each command, so that commands like `syl check`
+# don't wait for pydantic and YAML to load. test_cli checks this.
 
 
 logger = logging.getLogger(__name__)
@@ -40,17 +40,33 @@ class Context:
 
 
 
+def print_version(ctx, param, value):
+    if not value or ctx.resilient_parsing:
+        return
+
+    from syllabus import __version__
+
+    click.echo(f"syl, version {__version__}")
+    ctx.exit()
+
+
 @click.group()
-@click.version_option(version=__version__, prog_name="syl")
+@click.option('--version', is_flag=True, expose_value=False, is_eager=True,
+              callback=print_version, help="Show the version and exit.")
 @click.option('-v', '--verbose', count=True, help="Increase verbosity level.")
 @click.option('-e', '--exceptions', is_flag=True, help="Raise exceptions on errors.")
 @click.option('-d', '--dir', type=click.Path(), help="Set the working directory.", default=Path('.'))
 @click.option('-l', '--lesson-dir', type=click.Path(), help="Set the lesson directory.", default=None)
 @click.option('-f', '--file', type=str, help="Specify the output syllabus file.", default=None)
+@click.option('--profile', is_flag=True, help="Report time per phase and I/O counts on stderr.")
+@click.option('--cprofile', type=click.Path(), default=None, help="Also write cProfile stats to this file.")
 @click.pass_context
-def cli(ctx, verbose, exceptions, dir, lesson_dir, file):
+def cli(ctx, verbose, exceptions, dir, lesson_dir, file, profile, cprofile):
     setup_logging(verbose)
 
+    if profile or cprofile:
+        start_profile(ctx, profile, cprofile and Path(cprofile).resolve())
+
     ctx.obj = Context()
     ctx.obj.verbose = verbose > 0
     ctx.obj.exceptions = exceptions
@@ -69,8 +85,8 @@ def cli(ctx, verbose, exceptions, dir, lesson_dir, file):
     else:
         lesson_path = Path('lessons')  # Default to 'lessons' in current directory
     
-    # Check if the lesson directory exists
-    if not lesson_path.exists():
+    # Check if the lesson directory exists. compile-all finds its own.
+    if not lesson_path.exists() and ctx.invoked_subcommand != 'compile-all':
         logger.error(f"Error: The lesson directory {lesson_path} does not exist.")
         exit(1)
     
@@ -80,9 +96,29 @@ def cli(ctx, verbose, exceptions, dir, lesson_dir, file):
 
 
 
+def start_profile(ctx, report, cprofile):
+    """Profile the rest of the command, and report when it ends."""
+
+    from syllabus.profile import profile
+
+    def done():
+        if report:
+            click.echo(prof.report(), err=True)
+        if cprofile:
+            click.echo(f"cProfile stats written to {cprofile}", err=True)
+
+    # Callbacks run last-in first-out, so the profile stops before the
+    # report
+    ctx.call_on_close(done)
+    prof = ctx.with_resource(profile(cprofile))
+
+
 @click.command()
 def version():
     """Show the version and exit."""
+
+    from syllabus import __version__
+
     print(f"Syllabus CLI version {__version__}")
 
 
@@ -103,6 +139,8 @@ def check(ctx):
         logger.error("Error: The lesson directory %s does not exist.", target_dir)
         exit(1)
 
+    from syllabus.sync import check_structure
+
     try:
         check_structure(target_dir)
     except Exception as e:
@@ -119,10 +157,22 @@ cli.add_command(check)
 @click.option('-n', '--renumber', is_flag=True, help="Renumber lessons in the directory.")
 @click.option('-m', '--metafy', is_flag=True, help="Add metadata to lessons.")
 @click.option('-i', '--increment', type=int, default=1, help="Increment the lesson numbers by this amount.")
+@click.option('--minimal', is_flag=True, help="With -n, only rename lessons that are out of order.")
+@click.option('--no-cache', is_flag=True, help="Ignore and don't update the compile cache in .jtl/.")
+@click.option('-j', '--jobs', type=int, default=1,
+              help="Analyze lesson files in this many processes (0 for one per CPU).")
+@click.option('--sidecar', is_flag=True, help="Also write a JSON copy of the syllabus, for fast loading.")
+@click.option('--uid-seed', default=None, help="Derive missing uids from this seed and rank paths, instead of at random.")
 @click.pass_context
-def compile(ctx, regroup, renumber, increment, metafy):
+def compile(ctx, regroup, renumber, increment, minimal, metafy, no_cache, jobs, sidecar, uid_seed):
     """Read the lessons and compile a syllabus"""
 
+    if minimal and not renumber:
+        raise click.UsageError("--minimal requires -n")
+
+    from syllabus.cache import CompileCache
+    from syllabus.sync import compile_pipeline, compile_syllabus
+
     lesson_dir = ctx.obj.lesson_dir
     file = ctx.obj.syllabus_file
 
@@ -133,57 +183,152 @@ def compile(ctx, regroup, renumber, increment, metafy):
         logger.error("Error: The lesson directory %s does not exist.", target_dir)
         exit(1)
     
-    if regroup:
-        regroup_lessons(
-            lesson_dir=target_dir,
-            dryrun=False,
-        )
-    
-    if renumber:
-        renumber_lessons(
-            lesson_dir=target_dir,
-            increment=increment,
-            dryrun=False,
-        )
-    
-    if metafy:
-        metafy_lessons(
-            lesson_dir=target_dir,
-            dryrun=False,
+    cache = None if no_cache else CompileCache.load(target_dir)
+
+    # Only the sidecar needs the pydantic Course; the YAML is written
+    # straight from the compiled tree
+    if regroup or renumber or metafy:
+        # One scan of the tree for all of the steps, and the compile
+        try:
+            course = compile_pipeline(
+                lesson_dir=target_dir,
+                regroup=regroup,
+                renumber=renumber,
+                metafy=metafy,
+                increment=increment,
+                cache=cache,
+                jobs=jobs or os.cpu_count(),
+                minimal=minimal,
+                model=sidecar,
+                uid_seed=uid_seed,
+            )
+        except ValueError as e:
+            logger.error("Error: %s", e)
+            exit(1)
+    else:
+        course = compile_syllabus(
+            lesson_dir=target_dir, cache=cache, jobs=jobs or os.cpu_count(),
+            model=sidecar, uid_seed=uid_seed,
         )
-    
-    course = compile_syllabus(lesson_dir=target_dir)
+
+    if cache is not None:
+        cache.save()
+        click.echo(cache.stats(), err=(file == '-'))
     
     def rel_path(a, b):
         return str(Path(os.path.relpath(b, start=a)))
 
     
     if file == '-':
-        print(course.to_yaml)
+        print(course.to_yaml(), end='')
     elif file is None:
         file = target_dir/'.jtl'/'syllabus.yaml'
         
         Path(file).parent.mkdir(parents=True, exist_ok=True)
         course.module_dir = rel_path(Path(file).parent,target_dir)
-        Path(file).write_text(course.to_yaml())
+        course.to_yaml(path=file)
         print(f"Course YAML written to {file}")
     else:
         course.module_dir = rel_path(Path(file).parent,target_dir)
-        Path(file).write_text(course.to_yaml())
+        course.to_yaml(path=file)
         print(f"Course YAML written to {file}")
+
+    if sidecar and file != '-':
+        course.write_sidecar(file)
         
         
 
 cli.add_command(compile, name='compile')
 
 
+@click.command()
+@click.option('-m', '--manifest', type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Compile the lesson directories listed in this file, one per line.")
+@click.option('-j', '--jobs', type=int, default=0,
+              help="Compile in this many processes (0 for one per CPU).")
+@click.option('--no-cache', is_flag=True, help="Ignore and don't update the compile caches in .jtl/.")
+@click.argument('roots', nargs=-1, type=click.Path(exists=True, file_okay=False))
+@click.pass_context
+def compile_all_cmd(ctx, manifest, jobs, no_cache, roots):
+    """Compile every lesson directory under ROOTS, or in a manifest"""
+
+    import time
+
+    from syllabus.batch import compile_all, find_lesson_dirs, read_manifest, summary
+
+    if manifest:
+        lesson_dirs = read_manifest(manifest) + find_lesson_dirs(roots)
+    else:
+        lesson_dirs = find_lesson_dirs(roots or [Path('.')])
+
+    if not lesson_dirs:
+        logger.error("Error: No lesson directories found.")
+        exit(1)
+
+    start = time.perf_counter()
+    results = compile_all(
+        lesson_dirs, jobs=jobs or os.cpu_count(), use_cache=not no_cache
+    )
+
+    print(summary(results, time.perf_counter() - start))
+
+    if not all(r.ok for r in results):
+        exit(1)
+
+
+cli.add_command(compile_all_cmd, name='compile-all')
+
+
+@click.command()
+@click.option('--interval', type=float, default=0.2, help="Seconds between scans of the lesson directory.")
+@click.option('--debounce', type=float, default=0.1, help="Wait until files have been quiet for this many seconds.")
+@click.option('--no-cache', is_flag=True, help="Ignore and don't update the compile cache in .jtl/.")
+@click.pass_context
+def watch(ctx, interval, debounce, no_cache):
+    """Recompile the syllabus whenever lessons change"""
+
+    from syllabus.cache import CompileCache
+    from syllabus.watch import Watcher
+
+    target_dir = ctx.obj.lesson_dir
+    file = ctx.obj.syllabus_file
+
+    if file == '-':
+        logger.error("Error: watch must write the syllabus to a file.")
+        exit(1)
+
+    cache = None if no_cache else CompileCache.load(target_dir)
+
+    watcher = Watcher(
+        target_dir, output=file, cache=cache,
+        interval=interval, debounce=debounce,
+    )
+
+    print(f"Watching {target_dir}, writing {watcher.output}")
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    except (ValueError, AssertionError) as e:
+        logger.error("Error: %s", e)
+        exit(1)
+
+
+cli.add_command(watch, name='watch')
+
+
 @click.command()
 @click.option('-d', '--dryrun', is_flag=True, help="Perform a dry run without renaming files.")
 @click.option('-i', '--increment', type=int, default=1, help="Increment the lesson numbers by this amount.")
+@click.option('--minimal', is_flag=True, help="Only rename lessons that are out of order, using gaps and letter suffixes.")
+@click.option('--max-density', type=float, default=0.5, help="With --minimal, renumber a directory in full if more than this fraction of its ranks would have letters.")
 @click.pass_context
-def renumber(ctx, dryrun, increment):
+def renumber(ctx, dryrun, increment, minimal, max_density):
     """Renumber lessons."""
-    
+
+    from syllabus.sync import renumber_lessons
+
     lesson_dir = ctx.obj.lesson_dir
 
     # Use lesson_dir from argument if provided, otherwise use the one from context
@@ -193,7 +338,17 @@ def renumber(ctx, dryrun, increment):
         logger.error("Error: The lesson directory %s does not exist.", target_dir)
         exit(1)
         
-    renumber_lessons(lesson_dir=target_dir, increment=increment, dryrun=dryrun)
+    try:
+        plan = renumber_lessons(
+            lesson_dir=target_dir, increment=increment, dryrun=dryrun,
+            minimal=minimal, max_density=max_density
+        )
+    except ValueError as e:
+        logger.error("Error: %s", e)
+        exit(1)
+
+    if dryrun:
+        print(f"Plan written to {plan.write()}")
 
 
 cli.add_command(renumber, name='renumber')
@@ -204,7 +359,9 @@ cli.add_command(renumber, name='renumber')
 @click.pass_context
 def regroup(ctx, dryrun):
     """Regroup lessons with the same basename into directories"""
-    
+
+    from syllabus.sync import regroup_lessons
+
     lesson_dir = ctx.obj.lesson_dir
 
     # Use lesson_dir from argument if provided, otherwise use the one from context
@@ -214,17 +371,27 @@ def regroup(ctx, dryrun):
         logger.error("Error: The lesson directory %s does not exist.", target_dir)
         exit(1)
         
-    regroup_lessons(lesson_dir=target_dir, dryrun=dryrun)
+    try:
+        plan = regroup_lessons(lesson_dir=target_dir, dryrun=dryrun)
+    except ValueError as e:
+        logger.error("Error: %s", e)
+        exit(1)
+
+    if dryrun:
+        print(f"Plan written to {plan.write()}")
 
 
 cli.add_command(regroup, name='regroup')
 
 @click.command()
 @click.option('-d', '--dryrun', is_flag=True, help="Perform a dry run without modifying files.")
+@click.option('--uid-seed', default=None, help="Derive new uids from this seed and rank paths, instead of at random.")
 @click.pass_context
-def meta(ctx, dryrun):
+def meta(ctx, dryrun, uid_seed):
     """Setup metadata"""
-    
+
+    from syllabus.sync import metafy_lessons
+
     lesson_dir = ctx.obj.lesson_dir
 
     # Use lesson_dir from argument if provided, otherwise use the one from context
@@ -234,12 +401,121 @@ def meta(ctx, dryrun):
         logger.error("Error: The lesson directory %s does not exist.", target_dir)
         exit(1)
         
-    metafy_lessons(lesson_dir=target_dir, dryrun=dryrun)
+    changed = metafy_lessons(
+        lesson_dir=target_dir, dryrun=dryrun, uid_seed=uid_seed
+    )
+
+    if dryrun:
+        for p in changed:
+            print(f"Would change {p.relative_to(target_dir)}")
+        print(f"{len(changed)} files would change")
 
 
 cli.add_command(meta, name='meta')
 
 
+@click.command()
+@click.option('--check', is_flag=True, help="Report uids that more than one file has, with exit status 1 if there are any.")
+@click.argument('dirs', nargs=-1, type=click.Path(exists=True, file_okay=False))
+@click.pass_context
+def uids(ctx, check, dirs):
+    """Update the uid registry of one or more lesson directories"""
+
+    from syllabus.snapshot import TreeSnapshot
+    from syllabus.sync import uid_files
+    from syllabus.uids import UidRegistry, find_duplicates
+
+    registries = []
+
+    for d in [Path(d) for d in dirs] or [ctx.obj.lesson_dir]:
+        snapshot = TreeSnapshot(d)
+        registry = UidRegistry.load(d)
+        registry.refresh(uid_files(d, snapshot), snapshot)
+        registry.save()
+        registries.append(registry)
+        print(f"{d}: {len(registry)} uids")
+
+    if check:
+        duplicates = find_duplicates(registries)
+        for uid, files in duplicates.items():
+            print(f"Duplicate uid {uid}:")
+            for d, key in files:
+                print(f"  {d / key}")
+        print(f"{len(duplicates)} duplicate uids")
+        if duplicates:
+            exit(1)
+
+
+cli.add_command(uids, name='uids')
+
+
+@click.command()
+@click.option('--uid', default=None, help="Find the module, lesson set or lesson with this uid.")
+@click.option('--path', 'file_path', default=None, help="Find the lesson that has this file.")
+@click.option('--name', default=None, help="Find the modules, lesson sets and lessons with this name.")
+@click.option('--display', is_flag=True, help="Find the lessons with display: true.")
+@click.option('--parents', is_flag=True, help="Print the containers of each match, innermost first.")
+@click.pass_context
+def query(ctx, uid, file_path, name, display, parents):
+    """Look up lessons in the compiled syllabus"""
+
+    from syllabus.models import Course, dump_yaml
+
+    target_dir = ctx.obj.lesson_dir
+    file = ctx.obj.syllabus_file or target_dir/'.jtl'/'syllabus.yaml'
+
+    if not Path(file).exists():
+        logger.error("Error: %s does not exist; run syl compile first.", file)
+        exit(1)
+
+    given = sum(x is not None for x in (uid, file_path, name)) + display
+    if given != 1:
+        logger.error("Error: give one of --uid, --path, --name or --display.")
+        exit(1)
+
+    course = Course.load(file)
+
+    if uid is not None:
+        matches = [course.by_uid(uid)]
+    elif file_path is not None:
+        lesson = course.by_path(file_path)
+        if lesson is None and Path(file_path).exists():
+            # A path to the file itself, rather than from the lesson dir
+            try:
+                lesson = course.by_path(Path(file_path).resolve().relative_to(
+                    target_dir.resolve()
+                ))
+            except ValueError:
+                pass
+        matches = [lesson]
+    elif name is not None:
+        matches = course.by_name(name)
+    else:
+        matches = course.find_lessons(display=True)
+
+    matches = [m for m in matches if m is not None]
+    if not matches:
+        click.echo("No match", err=True)
+        exit(1)
+
+    def brief(obj):
+        return {'name': obj.name, **({'uid': obj.uid} if obj.uid else {})}
+
+    if parents:
+        data = [[brief(p) for p in course.parents(m)] for m in matches]
+    else:
+        data = [
+            m.model_dump(exclude_defaults=True, exclude_none=True,
+                         by_alias=True)
+            for m in matches
+        ]
+
+    print(dump_yaml(data), end='')
+
+
+cli.add_command(query, name='query')
+
+
 def run():
     cli()
 
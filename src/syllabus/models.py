@@ -1,24 +1,44 @@
 
 import json
+import os
 import re
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 import yaml
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
-from syllabus.util import clean_filename, extract_rank_string, needs_display
+from syllabus.profile import count, phase
 
-def to_yaml(m, simplify=False):
+# libyaml's loader and emitter are much faster than the pure-Python ones,
+# but are optional
+try:
+    from yaml import CSafeLoader as SafeLoader
+    from yaml import CSafeDumper
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader
+    CSafeDumper = None
+
+# Strings that PyYAML writes double-quoted. libyaml wraps long
+# double-quoted strings differently, so documents that have them are
+# written with the pure-Python emitter, to keep the output the same.
+double_quoted_p = re.compile(r'[^\x20-\x7e\n]| \n|\n ')
+
+# Version of the JSON sidecar written next to a compiled syllabus
+SIDECAR_VERSION = 1
+
+def to_yaml(m, simplify=False, stream=None):
     """
     Convert a Pydantic model to YAML representation.
 
     Args:
         m: The Pydantic model to convert
         simplify: If True, includes all fields; if False, excludes unset, default, and None values
+        stream: If provided, the YAML is written to this open file
 
     Returns:
-        str: YAML string representation of the model
+        str: YAML string representation of the model, or None if a stream
+        was given
     """
     d = {
         #"exclude_unset": not simplify,
@@ -28,7 +48,36 @@ def to_yaml(m, simplify=False):
     }
 
 
-    return yaml.dump(m.model_dump(**d), sort_keys=False)
+    with phase('dump'):
+        return dump_yaml(m.model_dump(**d), stream)
+
+
+def dump_yaml(data, stream=None):
+    """
+    Dump plain data to YAML, with libyaml when it gives the same output as
+    the pure-Python emitter.
+    """
+    if CSafeDumper is not None and libyaml_safe(data):
+        return yaml.dump(data, stream, Dumper=CSafeDumper, sort_keys=False)
+
+    return yaml.dump(data, stream, sort_keys=False)
+
+
+def libyaml_safe(data):
+    """
+    Return True if libyaml will write ``data`` exactly as PyYAML's own
+    emitter would: it holds only plain types, and no string that needs
+    double quotes.
+    """
+    if isinstance(data, str):
+        return not double_quoted_p.search(data)
+    if isinstance(data, dict):
+        return all(
+            libyaml_safe(k) and libyaml_safe(v) for k, v in data.items()
+        )
+    if isinstance(data, list):
+        return all(libyaml_safe(v) for v in data)
+    return data is None or isinstance(data, (bool, int, float))
 
 
 class Lesson(BaseModel):
@@ -50,16 +99,21 @@ class Lesson(BaseModel):
     terminal: Optional[bool] = False
     
     
-    def update_metadata(self, root: Path):
+    def update_metadata(self, root: Path, cache=None):
         """
         Extract metadata from the lesson file.
 
+        Args:
+            root: The lesson directory the lesson paths are relative to
+            cache: Optional CompileCache to read metadata through
+
         Returns:
             dict: A dictionary containing the extracted metadata
         """
         from syllabus.util import extract_metadata
 
-
+        if cache is not None:
+            extract_metadata = cache.metadata
         
         d = {}
         
@@ -78,46 +132,24 @@ class Lesson(BaseModel):
 
     
     @classmethod
-    def new_lesson(cls, root: Path,  p: Path):
-        
+    def new_lesson(cls, root: Path,  p: Path, cache=None, snapshot=None):
+        """
+        Return the lesson for a file or directory, with its rank path.
 
-        if (root/p).is_dir():
-            lesson = Lesson(name=clean_filename(p.name))
-            for f in (root/p).iterdir():
-                tless = Lesson.new_lesson(root, f.relative_to(root))
-                
-                lesson.display = lesson.display or tless.display
-                lesson.lesson = lesson.lesson or tless.lesson
-                lesson.exercise = lesson.exercise or tless.exercise
-                lesson.lesson = lesson.lesson or tless.lesson
-                lesson.description = lesson.description or tless.description
-                
-            lesson.update_metadata(root)
-                
-            
-        else:            
-            # Just a single file
-            if (root/p).suffix == '.md':  
-                d = {"name": clean_filename(p.stem), "lesson": str(p)}
-            
-            elif (root/p).suffix in ('.ipynb', '.py'):
+        Args:
+            root: The lesson directory
+            p: The lesson's path, relative to ``root``
+            cache: Optional CompileCache to read metadata through
+            snapshot: Optional TreeSnapshot to read the directory from
 
-                display = needs_display(root/p)
+        Returns:
+            Lesson: The lesson, or None if ``p`` is not a lesson file
+        """
+        from syllabus.nodes import LessonNode
 
+        lesson = LessonNode.new(root, p, cache, snapshot)
+        return lesson.to_model(path=True) if lesson is not None else None
 
-                d = {"name": clean_filename(p.stem), "exercise": str(p), "display": display}
-           
-            else:
-                return None
-           
-            lesson = Lesson(**d).update_metadata(root)
-            
-        
-        lesson.path = extract_rank_string(p)
-            
-        return lesson
-            
-    
     def __str__(self):
         return f"Lesson<{self.name}, lesson={Path(self.lesson)if self.lesson else '' }, exercise={Path(self.exercise) if self.exercise else ''}>"
     
@@ -199,7 +231,8 @@ class Course(BaseModel):
    
     modules: List[Module] = []
 
-
+    # Lookup tables, built by the first lookup; see index()
+    _index: Optional[dict] = PrivateAttr(default=None)
 
     class Config:
         arbitrary_types_allowed = True
@@ -220,10 +253,61 @@ class Course(BaseModel):
         Returns:
             Course: A new Course instance
         """
-        with open(path, encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+        with phase('load'):
+            count('parse.yaml')
+            with open(path, encoding='utf-8') as f:
+                data = yaml.load(f, Loader=SafeLoader)
+
+            return cls(**data)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a compiled syllabus, from its JSON sidecar if there is one that
+        is up to date with the YAML file, otherwise from the YAML file.
+
+        Args:
+            path: Path to the YAML file
+
+        Returns:
+            Course: A new Course instance
+        """
+        try:
+            with phase('load'):
+                sidecar = Sidecar.model_validate_json(
+                    sidecar_path(path).read_bytes()
+                )
+                count('parse.json')
+            if (sidecar.version == SIDECAR_VERSION
+                    and sidecar.source == file_signature(path)):
+                return sidecar.course
+        except (OSError, ValueError):
+            pass
+
+        return cls.from_yaml(path)
+
+    def write_sidecar(self, path, simplify=False):
+        """
+        Write the JSON sidecar for the YAML file at ``path``, which must
+        already hold this course. The sidecar records the size and mtime
+        of the YAML file, and is ignored by :meth:`load` if they change.
 
-        return cls(**data)
+        Args:
+            path: Path to the YAML file
+            simplify: As for :meth:`to_yaml`
+        """
+        sidecar = Sidecar(
+            version=SIDECAR_VERSION, source=file_signature(path), course=self
+        )
+
+        sidecar_path(path).write_text(
+            sidecar.model_dump_json(
+                exclude_defaults=not simplify,
+                exclude_none=not simplify,
+                by_alias=True,
+            ),
+            encoding='utf-8'
+        )
 
     def to_yaml(self, path=None, simplify=False):
         """
@@ -239,23 +323,134 @@ class Course(BaseModel):
 
         if path:
             with open(path, 'w', encoding="utf-8") as f:
-                f.write(to_yaml(self, simplify))
+                to_yaml(self, simplify, f)
         else:
             return to_yaml(self, simplify)
 
-    def to_json(self):
+    def to_json(self, path=None):
         """
         Convert the Course to JSON format.
 
+        Args:
+            path: If provided, writes JSON to this file path
+
         Returns:
-            str: JSON string representation of the Course
+            str or None: JSON string if path is None, otherwise None (writes to file)
         """
-        
-        return json.dumps(self.model_dump(), indent=4)
+
+        # pydantic's serializer is fast, but leaves non-ASCII characters
+        # unescaped, where json.dumps escapes them.
+        s = self.model_dump_json(indent=4)
+        if not s.isascii() or '\x7f' in s:
+            s = json.dumps(self.model_dump(), indent=4)
+
+        if path:
+            with open(path, 'w', encoding="utf-8") as f:
+                f.write(s)
+        else:
+            return s
 
     def __str__(self):
         return f"Course<{self.name}>"
 
+    def walk(self) -> Iterator[tuple[BaseModel, BaseModel]]:
+        """
+        Iterate over the modules, lesson sets and lessons of the course, in
+        order, with the course, module or lesson set that holds each one.
+
+        Yields:
+            tuple: (object, parent)
+        """
+        stack = [(m, self) for m in reversed(self.modules)]
+        while stack:
+            obj, parent = stack.pop()
+            yield obj, parent
+            children = getattr(obj, 'lessons', None) or []
+            stack.extend((c, obj) for c in reversed(children))
+
+    def index(self) -> dict:
+        """
+        Return the lookup tables of the course, building them the first
+        time. They are not updated when the course changes; call
+        :meth:`reindex` after changing it.
+
+        Returns:
+            dict: Tables ``uid``, ``path``, ``name`` and ``parent``. The
+            parent table is keyed by ``id()`` of the object.
+        """
+        if self._index is not None:
+            return self._index
+
+        by_uid, by_path, by_name, parents = {}, {}, {}, {}
+
+        for obj, parent in self.walk():
+            parents[id(obj)] = parent
+            if obj.uid:
+                by_uid.setdefault(obj.uid, obj)
+            by_name.setdefault(obj.name, []).append(obj)
+            for field in ('lesson', 'exercise', 'exer_test', 'assessment'):
+                p = getattr(obj, field, None)
+                if p:
+                    by_path.setdefault(Path(p).as_posix(), obj)
+
+        self._index = {
+            'uid': by_uid, 'path': by_path, 'name': by_name,
+            'parent': parents,
+        }
+        return self._index
+
+    def reindex(self):
+        """Drop the lookup tables, to be built again by the next lookup."""
+
+        self._index = None
+
+    def by_uid(self, uid):
+        """
+        Return the module, lesson set or lesson with the uid, or None.
+        """
+        return self.index()['uid'].get(uid)
+
+    def by_path(self, path):
+        """
+        Return the lesson whose lesson, exercise, test or assessment file is
+        ``path``, relative to the lesson directory, or None.
+        """
+        return self.index()['path'].get(Path(path).as_posix())
+
+    def by_name(self, name):
+        """
+        Return the modules, lesson sets and lessons with the name.
+        """
+        return list(self.index()['name'].get(name, []))
+
+    def parent(self, obj):
+        """
+        Return the course, module or lesson set that holds ``obj``, or None
+        if it is not in the course.
+        """
+        return self.index()['parent'].get(id(obj))
+
+    def parents(self, obj):
+        """
+        Return the containers of ``obj``, from the innermost out to the
+        course.
+        """
+        chain = []
+        while (obj := self.parent(obj)) is not None:
+            chain.append(obj)
+        return chain
+
+    def find_lessons(self, **fields) -> list[Lesson]:
+        """
+        Return the lessons, in order, that have the given field values, for
+        example ``course.find_lessons(display=True)``.
+        """
+        return [
+            obj for obj, _ in self.walk()
+            if isinstance(obj, Lesson)
+            and all(getattr(obj, k, None) == v for k, v in fields.items())
+        ]
+
     def sort(self):
         """Recursively sort by the path strings """
 
@@ -275,3 +470,26 @@ class Objective(BaseModel):
     """
     name: str
     description: str
+
+
+class Sidecar(BaseModel):
+    """
+    The JSON copy of a compiled syllabus, with the size and mtime of the
+    YAML file it was written from.
+    """
+    version: int
+    source: List[int]
+    course: Course
+
+
+def sidecar_path(path):
+    """Return the path of the JSON sidecar for a syllabus YAML file."""
+
+    return Path(path).with_suffix('.json')
+
+
+def file_signature(path):
+    """Return the size and mtime of a file, to tell if it has changed."""
+
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
@@ -0,0 +1,275 @@
+"""A compact tree of the course, used while it is compiled.
+
+Compiling makes an object for every lesson, lesson set and module, and
+pydantic models are slow to create and large. So the compiler builds a
+tree of these slotted nodes instead, sorts it, and converts it to a
+:class:`~syllabus.models.Course` once, at the end. The conversion uses
+``model_construct``, so values read from lesson metadata are kept as they
+are, without validation, as they always have been.
+
+Callers that only write the syllabus out can skip the conversion:
+:meth:`CourseNode.to_yaml` writes the same YAML as
+:meth:`Course.to_yaml <syllabus.models.Course.to_yaml>`.
+
+Nodes keep the rank paths of their objects, for sorting and for splicing
+recompiled containers into a course. The rank paths are left out of the
+models and the YAML.
+"""
+
+from pathlib import Path
+
+from syllabus.profile import phase
+from syllabus.util import clean_filename, extract_rank_string, needs_display
+
+
+class Node:
+    """Base of the nodes. Each subclass lists the fields of its model, in
+    the model's order, with their defaults."""
+
+    __slots__ = ()
+
+    model_name = ''
+    fields: dict = {}
+
+    def as_dict(self, simplify: bool = False) -> dict:
+        """Return the node as plain data, as ``model_dump`` would for the
+        model with ``exclude_defaults`` and ``exclude_none``, unless
+        ``simplify`` is set. The rank path is left out."""
+
+        d = {}
+
+        for k, default in self.fields.items():
+            if k == 'path':
+                continue
+            v = getattr(self, k)
+            if k in ('lessons', 'modules'):
+                v = [c.as_dict(simplify) for c in v]
+            if not simplify and (v is None or v == default):
+                continue
+            d[k] = v
+
+        return d
+
+    def to_model(self, path: bool = False):
+        """Return the pydantic model of the node and everything under it.
+        The rank paths are kept only if ``path`` is set."""
+
+        from syllabus import models
+
+        values = {
+            k: getattr(self, k) for k in self.fields
+            if k != 'path' or path
+        }
+        for k in ('lessons', 'modules'):
+            if k in values:
+                values[k] = [c.to_model(path) for c in values[k]]
+
+        m = getattr(models, self.model_name).model_construct(**values)
+        if 'path' in self.fields and not path:
+            del m.path  # Leave it out of the model's fields
+
+        return m
+
+    def sort(self) -> None:
+        pass
+
+
+class LessonNode(Node):
+    """A lesson; see :class:`~syllabus.models.Lesson`."""
+
+    __slots__ = (
+        'name', 'description', 'uid', 'path', 'lesson', 'exercise',
+        'exer_test', 'assessment', 'display', 'terminal',
+    )
+
+    model_name = 'Lesson'
+    fields = {
+        'name': None, 'description': None, 'uid': False, 'path': None,
+        'lesson': None, 'exercise': None, 'exer_test': None,
+        'assessment': None, 'display': False, 'terminal': False,
+    }
+
+    def __init__(
+        self, name, description=None, uid=False, path=None, lesson=None,
+        exercise=None, exer_test=None, assessment=None, display=False,
+        terminal=False
+    ):
+        self.name = name
+        self.description = description
+        self.uid = uid
+        self.path = path
+        self.lesson = lesson
+        self.exercise = exercise
+        self.exer_test = exer_test
+        self.assessment = assessment
+        self.display = display
+        self.terminal = terminal
+
+    def cache_fields(self) -> dict:
+        """Return the fields that the compile cache stores for a lesson:
+        all of them but the rank path."""
+
+        return {k: getattr(self, k) for k in self.fields if k != 'path'}
+
+    def update_metadata(self, root: Path, cache=None) -> 'LessonNode':
+        """Set the fields named in the metadata of the lesson and exercise
+        files. See :meth:`syllabus.models.Lesson.update_metadata`."""
+
+        from syllabus.util import extract_metadata
+
+        if cache is not None:
+            extract_metadata = cache.metadata
+
+        d = {}
+
+        if self.lesson:
+            d.update(extract_metadata(root/self.lesson))
+
+        if self.exercise:
+            d.update(extract_metadata(root/self.exercise))
+
+        for k, v in d.items():
+            if k in self.fields:
+                setattr(self, k, v)
+
+        return self
+
+    @classmethod
+    def new(cls, root: Path, p: Path, cache=None, snapshot=None):
+        """Return the lesson for the file or directory ``p``, relative to
+        the lesson directory ``root``, or None if ``p`` is not a lesson
+        file."""
+
+        is_dir = snapshot.is_dir if snapshot is not None else Path.is_dir
+        iterdir = snapshot.iterdir if snapshot is not None else Path.iterdir
+
+        if is_dir(root/p):
+            lesson = cls(clean_filename(p.name))
+            for f in iterdir(root/p):
+                tless = cls.new(root, f.relative_to(root), cache, snapshot)
+
+                lesson.display = lesson.display or tless.display
+                lesson.lesson = lesson.lesson or tless.lesson
+                lesson.exercise = lesson.exercise or tless.exercise
+                lesson.description = lesson.description or tless.description
+
+            lesson.update_metadata(root, cache)
+
+        else:
+            # Just a single file
+            if (root/p).suffix not in ('.md', '.ipynb', '.py'):
+                return None
+
+            fields = cache.lesson_fields(root/p) if cache else None
+            if fields is not None:
+                lesson = cls(**fields)
+                lesson.path = extract_rank_string(p)
+                return lesson
+
+            if (root/p).suffix == '.md':
+                lesson = cls(clean_filename(p.stem), lesson=str(p))
+            else:
+                if cache is not None:
+                    display = cache.needs_display(root/p)
+                else:
+                    display = needs_display(root/p)
+
+                lesson = cls(
+                    clean_filename(p.stem), exercise=str(p), display=display
+                )
+
+            lesson.update_metadata(root, cache)
+
+            if cache is not None:
+                cache.store_lesson_fields(root/p, lesson.cache_fields())
+
+        lesson.path = extract_rank_string(p)
+
+        return lesson
+
+
+class LessonSetNode(Node):
+    """A lesson set; see :class:`~syllabus.models.LessonSet`."""
+
+    __slots__ = ('name', 'path', 'description', 'uid', 'lessons')
+
+    model_name = 'LessonSet'
+    fields = {
+        'name': None, 'path': None, 'description': None, 'uid': False,
+        'lessons': [],
+    }
+
+    def __init__(self, name, path=None, description=None, uid=False,
+                 lessons=None):
+        self.name = name
+        self.path = path
+        self.description = description
+        self.uid = uid
+        self.lessons = lessons if lessons is not None else []
+
+    def sort(self) -> None:
+        """Sort the lessons and lesson sets by rank path."""
+
+        self.lessons.sort(key=lambda x: str(x.path))
+        for l in self.lessons:
+            l.sort()
+
+
+class ModuleNode(LessonSetNode):
+    """A module; see :class:`~syllabus.models.Module`."""
+
+    __slots__ = ('overview',)
+
+    model_name = 'Module'
+    fields = {
+        'name': None, 'path': None, 'description': None, 'overview': None,
+        'uid': False, 'lessons': [],
+    }
+
+    def __init__(self, name, path=None, description=None, overview=None,
+                 uid=False, lessons=None):
+        super().__init__(name, path, description, uid, lessons)
+        self.overview = overview
+
+
+class CourseNode(Node):
+    """A course; see :class:`~syllabus.models.Course`."""
+
+    __slots__ = (
+        'name', 'description', 'objectives', 'module_dir', 'uid', 'modules'
+    )
+
+    model_name = 'Course'
+    fields = {
+        'name': None, 'description': None, 'objectives': None,
+        'module_dir': None, 'uid': False, 'modules': [],
+    }
+
+    def __init__(self, name, description=None, objectives=None,
+                 module_dir=None, uid=False, modules=None):
+        self.name = name
+        self.description = description
+        self.objectives = objectives
+        self.module_dir = module_dir
+        self.uid = uid
+        self.modules = modules if modules is not None else []
+
+    def sort(self) -> None:
+        """Recursively sort by the rank paths."""
+
+        self.modules.sort(key=lambda x: str(x.path))
+        for m in self.modules:
+            m.sort()
+
+    def to_yaml(self, path=None, simplify: bool = False):
+        """Write the course as YAML to the file ``path``, or return it if
+        ``path`` is not given. The YAML is the same as the model's."""
+
+        from syllabus.models import dump_yaml
+
+        with phase('dump'):
+            data = self.as_dict(simplify)
+            if not path:
+                return dump_yaml(data)
+            with open(path, 'w', encoding='utf-8') as f:
+                dump_yaml(data, f)
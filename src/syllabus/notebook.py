@@ -0,0 +1,405 @@
+"""Incremental reading of Jupyter notebooks.
+
+Notebooks can carry megabytes of embedded outputs, but the syllabus only
+needs a few small parts of them. :class:`JsonScanner` walks the JSON text
+a chunk at a time, skipping over values it is not asked for without
+decoding them, so memory use scales with what is read, not with the size
+of the file. :func:`patch_notebook_metadata` uses it to rewrite only the
+syllabus metadata of a notebook."""
+
+import json
+import re
+from pathlib import Path
+from typing import Generator, TextIO
+
+from syllabus.profile import count, enabled
+
+CHUNK_SIZE = 1 << 16
+
+_STRUCTURE_P = re.compile(r'["\[\]{}]')
+_SCALAR_P = re.compile(r'[^,:\]}\s]+')
+_WS = ' \t\r\n'
+
+
+class JsonScanner:
+    """A pull-based scanner over JSON text, from a string or a file.
+
+    The caller walks the structure with :meth:`iter_object` and
+    :meth:`iter_array`, and for each key or element either decodes the
+    value with :meth:`read_value` or passes over it with
+    :meth:`skip_value`. Malformed input raises ValueError.
+    """
+
+    def __init__(self, text: str = '', file: TextIO | None = None):
+        self.buf = text
+        self.pos = 0
+        self.file = file
+        self.offset = 0  # Position of buf[0] in the whole text
+        self._pinned = 0  # While > 0, _fill must not discard the buffer
+
+    @classmethod
+    def open(cls, p: Path) -> 'JsonScanner':
+        count('files.opened')
+        return cls(file=open(p, 'r', encoding='utf-8'))
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+    def __enter__(self) -> 'JsonScanner':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def position(self) -> int:
+        """The position of the scanner in the whole text."""
+        return self.offset + self.pos
+
+    def _fill(self) -> bool:
+        """Read another chunk into the buffer, discarding what has already
+        been consumed. Return False at the end of the input."""
+
+        if self.file is None:
+            return False
+
+        chunk = self.file.read(CHUNK_SIZE)
+        if not chunk:
+            return False
+        if enabled():
+            count('bytes.read', len(chunk.encode('utf-8')))
+
+        if not self._pinned:
+            self.offset += self.pos
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character."""
+
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, c: str) -> None:
+        if self.peek() != c:
+            raise ValueError(
+                f"Expected {c!r} at {self.position}, "
+                f"found {self.buf[self.pos]!r}"
+            )
+        self.pos += 1
+
+    def _skip_string(self) -> None:
+        self.pos += 1  # Opening quote
+        while True:
+            i = self.buf.find('"', self.pos)
+            if i < 0:
+                # Keep any trailing backslashes, so an escaped quote at
+                # the start of the next chunk is still seen as escaped.
+                tail = len(self.buf) - len(self.buf.rstrip('\\'))
+                self.pos = max(self.pos, len(self.buf) - tail)
+                if not self._fill():
+                    raise ValueError("Unterminated JSON string")
+                continue
+
+            j = i
+            while j > self.pos and self.buf[j - 1] == '\\':
+                j -= 1
+
+            self.pos = i + 1
+            if (i - j) % 2 == 0:
+                return
+
+    def skip_value(self) -> None:
+        """Move past the next value without decoding it."""
+
+        c = self.peek()
+
+        if c == '"':
+            self._skip_string()
+            return
+
+        if c in '{[':
+            depth = 0
+            while True:
+                m = _STRUCTURE_P.search(self.buf, self.pos)
+                if m is None:
+                    self.pos = len(self.buf)
+                    if not self._fill():
+                        raise ValueError("Unterminated JSON value")
+                    continue
+
+                self.pos = m.start()
+                c = m.group()
+                if c == '"':
+                    self._skip_string()
+                    continue
+
+                self.pos += 1
+                depth += 1 if c in '{[' else -1
+                if depth == 0:
+                    return
+
+        # A number, true, false or null. Make sure it is not cut off at
+        # the end of the buffer.
+        while True:
+            m = _SCALAR_P.match(self.buf, self.pos)
+            if m is None:
+                raise ValueError(f"Unexpected {c!r} at {self.position}")
+            if m.end() < len(self.buf) or not self._fill():
+                self.pos = m.end()
+                return
+
+    def value_span(self) -> tuple[int, int]:
+        """Skip the next value and return its (start, end) position in the
+        whole text."""
+
+        self.peek()
+        start = self.position
+        self.skip_value()
+        return start, self.position
+
+    def read_value(self):
+        """Decode and return the next value."""
+
+        self.peek()
+        self._pinned += 1
+        try:
+            start = self.pos
+            self.skip_value()
+            return json.loads(self.buf[start:self.pos])
+        finally:
+            self._pinned -= 1
+
+    def iter_object(self) -> Generator[str, None, None]:
+        """Iterate over the keys of the next object. The caller must read
+        or skip the value of each key before asking for the next one."""
+
+        self.expect('{')
+        first = True
+        while True:
+            c = self.peek()
+            if c == '}':
+                self.pos += 1
+                return
+            if not first:
+                self.expect(',')
+            first = False
+            key = self.read_value()
+            self.expect(':')
+            yield key
+
+    def iter_array(self) -> Generator[int, None, None]:
+        """Iterate over the indexes of the next array. The caller must read
+        or skip each element before asking for the next one."""
+
+        self.expect('[')
+        i = 0
+        while True:
+            c = self.peek()
+            if c == ']':
+                self.pos += 1
+                return
+            if i:
+                self.expect(',')
+            yield i
+            i += 1
+
+
+def _line_indent(text: str, pos: int) -> str:
+    """Return the leading whitespace of the line that ``pos`` is on."""
+
+    start = text.rfind('\n', 0, pos) + 1
+    line = text[start:pos]
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _patch_metadata(scanner: JsonScanner, text: str, syllabus: dict) -> str:
+    """Splice ``syllabus`` into the ``metadata`` object the scanner is at."""
+
+    if scanner.peek() != '{':
+        raise ValueError("Notebook metadata is not an object")
+
+    md_start = scanner.position
+    pretty = '\n' in text[:md_start]
+    unit = _line_indent(text, md_start)  # Top-level keys are one level in
+    inner = unit * 2
+
+    def dump() -> str:
+        if not pretty:
+            return json.dumps(syllabus, ensure_ascii=False)
+        return json.dumps(
+            syllabus, indent=unit, ensure_ascii=False
+        ).replace('\n', '\n' + inner)
+
+    last_end = None
+    for key in scanner.iter_object():
+        if key == 'syllabus':
+            start, end = scanner.value_span()
+            return text[:start] + dump() + text[end:]
+        last_end = scanner.value_span()[1]
+
+    md_end = scanner.position
+    entry = '"syllabus": ' + dump()
+
+    if last_end is None:
+        # Empty metadata
+        if pretty:
+            entry = f'\n{inner}{entry}\n{unit}'
+        return text[:md_start] + '{' + entry + '}' + text[md_end:]
+
+    sep = f',\n{inner}' if pretty else ', '
+    return text[:last_end] + sep + entry + text[last_end:]
+
+
+def patch_notebook_metadata(text: str, syllabus: dict) -> str | None:
+    """Return the text of a notebook with ``metadata.syllabus`` set to
+    ``syllabus``. Only that value is replaced, or added at the end of the
+    metadata, in the notebook's own indentation; the rest of the text,
+    cells and outputs included, is kept as it is. Returns None if the
+    metadata can't be found, so the caller can rewrite the notebook in
+    full."""
+
+    try:
+        scanner = JsonScanner(text)
+        for key in scanner.iter_object():
+            if key == 'metadata':
+                return _patch_metadata(scanner, text, syllabus)
+            scanner.skip_value()
+    except ValueError:
+        pass
+
+    return None
+
+
+# Cell magics whose body is still Python code
+PYTHON_CELL_MAGICS = ('time', 'timeit', 'capture', 'prun')
+
+
+def _read_cells(scanner: JsonScanner) -> list[str]:
+    """Read the source of each code cell from the ``cells`` array."""
+
+    cells: list[str] = []
+
+    for _ in scanner.iter_array():
+        cell_type, source = None, ''
+        for key in scanner.iter_object():
+            if key == 'cell_type':
+                cell_type = scanner.read_value()
+            elif key == 'source':
+                source = scanner.read_value()
+            else:
+                scanner.skip_value()
+
+        if cell_type == 'code':
+            cells.append(_join_source(source))
+
+    return cells
+
+
+def _join_source(source: str | list[str]) -> str:
+    return ''.join(source) if isinstance(source, list) else source
+
+
+def scan_notebook(p: Path) -> tuple[dict, list[str]]:
+    """Return the top-level ``metadata`` object of a notebook and the
+    source of each code cell, from one pass over the file. Outputs and
+    attachments are skipped over. Falls back to a full parse if the
+    notebook can't be scanned."""
+
+    count('parse.notebook')
+    try:
+        with JsonScanner.open(p) as scanner:
+            metadata, cells = {}, []
+            for key in scanner.iter_object():
+                if key == 'metadata':
+                    metadata = scanner.read_value()
+                elif key == 'cells':
+                    cells = _read_cells(scanner)
+                else:
+                    scanner.skip_value()
+            return metadata, cells
+    except (ValueError, UnicodeDecodeError):
+        count('parse.json')
+        with open(p, 'r', encoding='utf-8') as file:
+            notebook = json.load(file)
+        cells = [
+            _join_source(c.get('source', ''))
+            for c in notebook.get('cells', [])
+            if c.get('cell_type') == 'code'
+        ]
+        return notebook.get('metadata', {}), cells
+
+
+def _is_help_line(line: str) -> bool:
+    """Whether a line is IPython help syntax, like ``len?``: the last
+    character outside strings and comments is a ``?``. A line that ends
+    inside a string is not."""
+
+    quote = None
+    last = ''
+    i = 0
+    while i < len(line):
+        c = line[i]
+        if quote:
+            if c == '\\':
+                i += 1
+            elif line.startswith(quote, i):
+                i += len(quote) - 1
+                quote = None
+        elif c == '#':
+            break
+        elif c in '\'"':
+            quote = line[i:i + 3] if line.startswith(c * 3, i) else c
+            i += len(quote) - 1
+        elif not c.isspace():
+            last = c
+        i += 1
+
+    return quote is None and last == '?'
+
+
+def cell_python(source: str) -> str:
+    """Return the Python code in a code cell, with IPython magics, shell
+    escapes and help lines replaced by ``pass``. Cells run by a non-Python
+    cell magic, like ``%%bash``, give an empty string."""
+
+    lines = source.splitlines()
+
+    if lines and lines[0].startswith('%%'):
+        magic = lines[0][2:].split(None, 1)
+        if not magic or magic[0] not in PYTHON_CELL_MAGICS:
+            return ''
+        lines = lines[1:]
+
+    out = []
+    for line in lines:
+        stripped = line.lstrip()
+        if stripped.startswith(('%', '!', '?')) or _is_help_line(stripped):
+            line = line[:len(line) - len(stripped)] + 'pass'
+        out.append(line)
+
+    return '\n'.join(out)
+
+
+def cells_imports(cells: list[str], filename: str = '<notebook>') -> list[str]:
+    """Return the top-level names of the modules imported by a list of code
+    cells. Magics and shell lines are ignored, and a cell that is not valid
+    Python only contributes the import lines that parse on their own."""
+
+    from syllabus.util import imports_from_source
+
+    imports: set[str] = set()
+
+    for source in cells:
+        imports.update(imports_from_source(cell_python(source), filename))
+
+    return sorted(imports)
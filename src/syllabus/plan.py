@@ -0,0 +1,164 @@
+"""Planned, batched renames for reorganizing a lesson directory.
+
+:func:`syllabus.sync.regroup_lessons` and
+:func:`syllabus.sync.renumber_lessons` describe what they want to do as a
+:class:`RenamePlan`: directories to create, paths to move, and empty
+directories to remove, all in terms of the tree as it was scanned. The
+plan is checked as a whole before anything is changed, so a collision
+stops the command with the tree untouched, and moves that swap or rotate
+names go through temporary names."""
+
+import json
+from pathlib import Path
+
+from syllabus.profile import phase
+
+PLAN_FILE = 'plan.json'
+
+
+class RenamePlan:
+    """Directory creations, moves and empty-directory removals for a lesson
+    directory.
+
+    Paths are the ones in the scanned tree. A move of a file inside a
+    directory that is itself moved is given with the directory's old
+    path; moves are made deepest first, so the file is moved before its
+    directory is.
+    """
+
+    def __init__(self, lesson_dir: Path):
+        self.lesson_dir = Path(lesson_dir)
+        self.mkdirs: list[Path] = []
+        self.moves: list[tuple[Path, Path]] = []
+        self.rmdirs: list[Path] = []
+        self.steps: list[tuple] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.mkdirs or self.moves or self.rmdirs)
+
+    def mkdir(self, p: Path) -> None:
+        self.mkdirs.append(Path(p))
+
+    def move(self, old: Path, new: Path) -> None:
+        self.moves.append((Path(old), Path(new)))
+
+    def rmdir(self, p: Path) -> None:
+        self.rmdirs.append(Path(p))
+
+    def _depth(self, p: Path) -> int:
+        return len(p.relative_to(self.lesson_dir).parts)
+
+    def _temp_name(self, tree, p: Path) -> Path:
+        i = 0
+        while True:
+            temp = p.with_name(f'.{p.name}.syl-{i}')
+            if not tree.exists(temp):
+                return temp
+            i += 1
+
+    def resolve(self, tree) -> list[tuple]:
+        """Check the plan against a TreeSnapshot or TreeModel and return the
+        steps that carry it out, in order: removals, creations, then the
+        moves, deepest first. A move whose target is the source of another
+        move at the same depth, as in a swap, goes through a temporary
+        name. Raises ValueError, listing every problem, if the plan can't
+        be carried out."""
+
+        errors: list[str] = []
+
+        def rel(p: Path) -> str:
+            return str(p.relative_to(self.lesson_dir))
+
+        removed = set(self.rmdirs)
+        sources = {old for old, _ in self.moves}
+        targets: dict[Path, Path] = {}
+
+        for p in self.mkdirs:
+            if tree.exists(p) and not tree.is_dir(p):
+                errors.append(f"Can't create directory '{rel(p)}': a file "
+                              f"has that name")
+
+        for old, new in self.moves:
+            if not tree.exists(old):
+                errors.append(f"Can't move '{rel(old)}': it does not exist")
+            if new in targets:
+                errors.append(f"'{rel(targets[new])}' and '{rel(old)}' "
+                              f"would both be moved to '{rel(new)}'")
+            elif (tree.exists(new) and new not in sources
+                    and new not in removed):
+                errors.append(f"Can't move '{rel(old)}' to '{rel(new)}': "
+                              f"'{rel(new)}' already exists")
+            targets[new] = old
+
+        if errors:
+            raise ValueError(
+                "Reorganization would fail, nothing was changed:\n  "
+                + "\n  ".join(errors)
+            )
+
+        steps: list[tuple] = [('rmdir', p) for p in self.rmdirs]
+        steps.extend(('mkdir', p) for p in self.mkdirs)
+
+        by_depth: dict[int, list[tuple[Path, Path]]] = {}
+        for old, new in self.moves:
+            by_depth.setdefault(self._depth(old), []).append((old, new))
+
+        for depth in sorted(by_depth, reverse=True):
+            moves = by_depth[depth]
+            level_sources = {old for old, _ in moves}
+
+            direct, temps = [], []
+            for old, new in moves:
+                if new in level_sources:
+                    temp = self._temp_name(tree, old)
+                    steps.append(('rename', old, temp))
+                    temps.append((temp, new))
+                else:
+                    direct.append((old, new))
+
+            steps.extend(('rename', old, new) for old, new in direct)
+            steps.extend(('rename', temp, new) for temp, new in temps)
+
+        self.steps = steps
+        return steps
+
+    def apply(self, tree) -> None:
+        """Check the plan and carry it out on a TreeModel. The changes reach
+        the filesystem when the tree is committed."""
+
+        with phase('plan'):
+            steps = self.resolve(tree)
+
+        for step in steps:
+            if step[0] == 'rmdir':
+                tree.rmdir(step[1])
+            elif step[0] == 'mkdir':
+                tree.mkdir(step[1])
+            else:
+                tree.rename(step[1], step[2])
+
+    def to_dict(self) -> dict:
+        """Return the plan, with paths relative to the lesson directory."""
+
+        def rel(p: Path) -> str:
+            return p.relative_to(self.lesson_dir).as_posix()
+
+        return {
+            'lesson_dir': str(self.lesson_dir),
+            'mkdir': [rel(p) for p in self.mkdirs],
+            'move': [[rel(old), rel(new)] for old, new in self.moves],
+            'rmdir': [rel(p) for p in self.rmdirs],
+            'steps': [
+                [step[0]] + [rel(p) for p in step[1:]] for step in self.steps
+            ],
+        }
+
+    def write(self, path: Path | None = None) -> Path:
+        """Write the plan as JSON, by default to ``.jtl/plan.json`` in the
+        lesson directory, and return the path."""
+
+        path = Path(path or self.lesson_dir / '.jtl' / PLAN_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2) + '\n',
+                        encoding='utf-8')
+        return path
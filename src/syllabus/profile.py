@@ -0,0 +1,176 @@
+"""Per-phase timing and I/O counters for syl commands.
+
+The compile and reorganization code marks its phases -- walking the
+tree, classifying paths, analyzing files, building models, sorting,
+dumping YAML -- with :func:`phase`, and counts files opened, bytes read,
+directory scans, stat calls and parses with :func:`count`. Both do
+nothing unless a profile is running:
+
+    from syllabus.profile import profile
+
+    with profile(cprofile='compile.prof') as prof:
+        course = compile_syllabus(lesson_dir)
+    print(prof.report())
+
+Phase times are exclusive: time spent in a phase nested inside another is
+only counted for the inner one. Work done in the process pool of
+``compile -j`` is not seen by the profile.
+"""
+
+import functools
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Generator
+
+_active: 'Profiler | None' = None
+
+
+class Profiler:
+    """Accumulated phase times and counters of one profiled run."""
+
+    def __init__(self):
+        self.times: dict[str, float] = {}
+        self.counts: Counter = Counter()
+        self.total = 0.0
+        self._stack: list[list] = []  # [phase, time it was last resumed]
+
+    def enter(self, name: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.times[outer[0]] = self.times.get(outer[0], 0.0) \
+                + now - outer[1]
+        self._stack.append([name, now])
+
+    def exit(self) -> None:
+        if not self._stack:
+            return
+        now = time.perf_counter()
+        name, start = self._stack.pop()
+        self.times[name] = self.times.get(name, 0.0) + now - start
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def as_dict(self) -> dict:
+        """Return the phase times, in seconds, and the counters."""
+
+        return {
+            'total': self.total,
+            'phases': dict(self.times),
+            'counts': dict(sorted(self.counts.items())),
+        }
+
+    def report(self) -> str:
+        """Return a table of the phase times and counters."""
+
+        lines = [f"{'phase':<16}{'ms':>10}{'%':>7}"]
+
+        other = self.total - sum(self.times.values())
+        phases = sorted(self.times.items(), key=lambda kv: -kv[1])
+        for name, t in phases + [('other', max(other, 0.0))]:
+            share = 100 * t / self.total if self.total else 0.0
+            lines.append(f"{name:<16}{t * 1000:>10.1f}{share:>7.1f}")
+        lines.append(f"{'total':<16}{self.total * 1000:>10.1f}")
+
+        if self.counts:
+            lines.append('')
+            lines.append(f"{'counter':<16}{'count':>10}")
+            for name, n in sorted(self.counts.items()):
+                lines.append(f"{name:<16}{n:>10}")
+
+        return '\n'.join(lines)
+
+
+class _Phase:
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> None:
+        if _active is not None:
+            _active.enter(self.name)
+
+    def __exit__(self, *exc) -> None:
+        if _active is not None:
+            _active.exit()
+
+
+_phases: dict[str, _Phase] = {}
+
+
+def phase(name: str) -> _Phase:
+    """Return a context manager that times a block as phase ``name``."""
+
+    p = _phases.get(name)
+    if p is None:
+        p = _phases[name] = _Phase(name)
+    return p
+
+
+def phased(name: str):
+    """Decorate a function to time its calls as phase ``name``."""
+
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return f(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add ``n`` to counter ``name``."""
+
+    if _active is not None:
+        _active.counts[name] += n
+
+
+def count_read(text: str) -> None:
+    """Count a file opened and the bytes of ``text`` read from it."""
+
+    if _active is not None:
+        _active.counts['files.opened'] += 1
+        _active.counts['bytes.read'] += len(text.encode('utf-8'))
+
+
+def enabled() -> bool:
+    return _active is not None
+
+
+@contextmanager
+def profile(
+    cprofile: Path | str | None = None
+) -> Generator[Profiler, None, None]:
+    """Profile the code run in the ``with`` block. If ``cprofile`` is given,
+    the run is also profiled with cProfile, and the stats are written to
+    that file, for ``python -m pstats`` or snakeviz."""
+
+    global _active
+
+    prof = Profiler()
+    previous, _active = _active, prof
+
+    cp = None
+    if cprofile:
+        import cProfile
+        cp = cProfile.Profile()
+    start = time.perf_counter()
+    if cp is not None:
+        cp.enable()
+
+    try:
+        yield prof
+    finally:
+        if cp is not None:
+            cp.disable()
+        prof.total = time.perf_counter() - start
+        while prof._stack:
+            prof.exit()
+        _active = previous
+        if cp is not None:
+            cp.dump_stats(str(cprofile))
@@ -0,0 +1,433 @@
+"""In-memory snapshot of a lesson directory tree.
+
+Each directory is read with a single ``os.scandir`` the first time it is
+needed, and its entry types and child lists are kept, so classifying paths
+(see :mod:`syllabus.sync`) does not go back to the filesystem.
+:class:`TreeModel` is a mutable copy of a snapshot, for commands that
+change the tree and then compile it."""
+
+import os
+from pathlib import Path
+from typing import Generator
+
+from syllabus.profile import count, phase
+
+
+class _Listing:
+    """The scanned contents of one directory."""
+
+    __slots__ = ('dirnames', 'filenames', 'links', 'entries')
+
+    def __init__(self, entries: list[os.DirEntry]):
+        self.entries = {e.name: e for e in entries}
+        self.dirnames: list[str] = []
+        self.filenames: list[str] = []
+        self.links: set[str] = set()
+
+        for e in sorted(entries, key=lambda e: e.name):
+            try:
+                is_dir = e.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                self.dirnames.append(e.name)
+                if e.is_symlink():
+                    self.links.add(e.name)
+            else:
+                self.filenames.append(e.name)
+
+
+class TreeSnapshot:
+    """A read-once view of the directory tree under ``root``.
+
+    Paths outside of ``root`` are answered from the live filesystem. The
+    snapshot does not notice changes made after a directory was scanned;
+    build a new one for each command.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._root_parts = self.root.parts
+        self._listings: dict[Path, _Listing | None] = {}
+
+    @classmethod
+    def scan(cls, root: Path) -> 'TreeSnapshot':
+        """Build a snapshot and read the whole tree under ``root``."""
+
+        snapshot = cls(root)
+        for _ in snapshot.walk():
+            pass
+        return snapshot
+
+    def _inside(self, p: Path) -> bool:
+        # Comparing parts is much faster than searching p.parents
+        return p.parts[:len(self._root_parts)] == self._root_parts
+
+    def listing(self, d: Path) -> _Listing | None:
+        """Return the listing of directory ``d``, scanning it on first
+        use, or None if ``d`` is not a directory."""
+
+        d = Path(d)
+
+        if d not in self._listings:
+            count('fs.scandir')
+            try:
+                with phase('walk'), os.scandir(d) as it:
+                    self._listings[d] = _Listing(list(it))
+            except (NotADirectoryError, FileNotFoundError):
+                self._listings[d] = None
+
+        return self._listings[d]
+
+    def entry(self, p: Path) -> os.DirEntry | None:
+        """Return the directory entry for ``p``, from its parent's
+        listing."""
+
+        p = Path(p)
+        parent = self.listing(p.parent)
+        return parent.entries.get(p.name) if parent else None
+
+    def exists(self, p: Path) -> bool:
+        p = Path(p)
+        if p == self.root and self.listing(p) is not None:
+            return True
+        if p == self.root or not self._inside(p):
+            return p.exists()
+        return self.entry(p) is not None
+
+    def is_dir(self, p: Path) -> bool:
+        p = Path(p)
+        if p == self.root:
+            return self.listing(p) is not None
+        if not self._inside(p):
+            return p.is_dir()
+        parent = self.listing(p.parent)
+        return parent is not None and p.name in parent.dirnames
+
+    def names(self, d: Path) -> list[str]:
+        """Return the sorted names of all entries in directory ``d``."""
+
+        listing = self.listing(d)
+        if listing is None:
+            return []
+        return sorted(listing.dirnames + listing.filenames)
+
+    def iterdir(self, d: Path) -> list[Path]:
+        return [Path(d, n) for n in self.names(d)]
+
+    def stat(self, p: Path) -> os.stat_result:
+        """Return the stat result for ``p``. The directory entry caches it,
+        so each file is stat'ed at most once."""
+
+        p = Path(p)
+        count('fs.stat')
+        e = self.entry(p) if self._inside(p) else None
+        return e.stat() if e is not None else os.stat(p)
+
+    def walk(
+        self, top: Path | None = None
+    ) -> Generator[tuple[Path, list[str], list[str]], None, None]:
+        """Walk the snapshot top-down like :meth:`pathlib.Path.walk`, with
+        sorted names. Removing names from ``dirnames`` prunes the walk."""
+
+        top = Path(top) if top is not None else self.root
+        stack = [top]
+
+        while stack:
+            d = stack.pop()
+            listing = self.listing(d)
+            if listing is None:
+                continue
+
+            dirnames = list(listing.dirnames)
+            filenames = list(listing.filenames)
+            yield d, dirnames, filenames
+
+            stack.extend(
+                Path(d, n) for n in reversed(dirnames)
+                if n not in listing.links
+            )
+
+
+class _Node:
+    """A file or directory in a :class:`TreeModel`."""
+
+    __slots__ = ('name', 'parent', 'children', 'link', 'disk', 'scanned',
+                 'text')
+
+    def __init__(self, name: str, parent: '_Node | None', is_dir: bool):
+        self.name = name
+        self.parent = parent
+        self.children: dict[str, _Node] | None = {} if is_dir else None
+        self.link = False
+        self.disk: Path | None = None  # Where the content is on disk now
+        self.scanned: Path | None = None  # Where the snapshot saw it
+        self.text: str | None = None  # Content waiting to be written
+
+
+class TreeModel:
+    """A mutable copy of a lesson directory tree, made from one full scan.
+
+    It answers the same questions as :class:`TreeSnapshot`, so the
+    classification and compile functions in :mod:`syllabus.sync` can run
+    on it. Changes -- new directories, renames, deletions and file
+    contents -- are applied to the model at once, so later steps see
+    them, but only reach the filesystem when :meth:`commit` is called.
+    Failing changes raise OSError, as the filesystem would.
+    """
+
+    def __init__(self, snapshot: TreeSnapshot):
+        self.snapshot = snapshot
+        self.root = snapshot.root
+        self._root_parts = self.root.parts
+        self.ops: list[tuple] = []
+
+        self._root = _Node(self.root.name, None, True)
+        self._root.disk = self._root.scanned = self.root
+        self._missing = snapshot.listing(self.root) is None
+
+        nodes = {self.root: self._root}
+        for dirpath, dirnames, filenames in snapshot.walk():
+            parent = nodes[Path(dirpath)]
+            listing = snapshot.listing(dirpath)
+            for n in dirnames:
+                node = self._add(parent, Path(dirpath, n), True)
+                node.link = n in listing.links
+                nodes[node.disk] = node
+            for n in filenames:
+                self._add(parent, Path(dirpath, n), False)
+
+    @classmethod
+    def scan(cls, root: Path) -> 'TreeModel':
+        """Scan the tree under ``root`` into a model."""
+
+        return cls(TreeSnapshot(root))
+
+    def _add(self, parent: _Node, p: Path, is_dir: bool) -> _Node:
+        node = _Node(p.name, parent, is_dir)
+        node.disk = node.scanned = p
+        parent.children[p.name] = node
+        return node
+
+    def path(self, node: _Node) -> Path:
+        """Return the current path of a node."""
+
+        parts = []
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return self.root.joinpath(*reversed(parts))
+
+    def node(self, p: Path) -> _Node | None:
+        """Return the node at path ``p``, or None if there is none."""
+
+        try:
+            parts = Path(p).relative_to(self.root).parts
+        except ValueError:
+            return None
+
+        if self._missing:
+            return None
+
+        node = self._root
+        for part in parts:
+            if node.children is None:
+                return None
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def _inside(self, p: Path) -> bool:
+        parts = Path(p).parts
+        return parts[:len(self._root_parts)] == self._root_parts
+
+    def exists(self, p: Path) -> bool:
+        if not self._inside(p):
+            return Path(p).exists()
+        return self.node(p) is not None
+
+    def is_dir(self, p: Path) -> bool:
+        if not self._inside(p):
+            return Path(p).is_dir()
+        node = self.node(p)
+        return node is not None and node.children is not None
+
+    def names(self, d: Path) -> list[str]:
+        """Return the sorted names of all entries in directory ``d``."""
+
+        node = self.node(d)
+        if node is None or node.children is None:
+            return []
+        return sorted(node.children)
+
+    def iterdir(self, d: Path) -> list[Path]:
+        return [Path(d, n) for n in self.names(d)]
+
+    def stat(self, p: Path) -> os.stat_result:
+        """Return the stat result for ``p``, from the snapshot if the file
+        has not been written or moved on disk since it was scanned. Renames
+        keep the size and mtime of a file."""
+
+        node = self.node(p)
+        if node is not None and node.scanned is not None \
+                and node.disk == node.scanned:
+            return self.snapshot.stat(node.scanned)
+        count('fs.stat')
+        return os.stat(p)
+
+    def walk(
+        self, top: Path | None = None
+    ) -> Generator[tuple[Path, list[str], list[str]], None, None]:
+        """Walk the model top-down, like :meth:`TreeSnapshot.walk`."""
+
+        top = Path(top) if top is not None else self.root
+        stack = [top]
+
+        while stack:
+            d = stack.pop()
+            node = self.node(d)
+            if node is None or node.children is None:
+                continue
+
+            dirnames = sorted(
+                n for n, c in node.children.items() if c.children is not None
+            )
+            filenames = sorted(
+                n for n, c in node.children.items() if c.children is None
+            )
+            yield d, dirnames, filenames
+
+            stack.extend(
+                Path(d, n) for n in reversed(dirnames)
+                if not node.children[n].link
+            )
+
+    def source(self, p: Path) -> Path | None:
+        """Return where the content of file ``p`` can be read from disk
+        before the model is committed, or None for a new file."""
+
+        node = self.node(p)
+        return node.disk if node is not None else None
+
+    def read_text(self, p: Path) -> str:
+        """Return the content of file ``p``, including pending writes."""
+
+        node = self.node(p)
+        if node is None or node.children is not None:
+            raise FileNotFoundError(p)
+        if node.text is not None:
+            return node.text
+        return node.disk.read_text(encoding='utf-8')
+
+    def _parent(self, p: Path) -> _Node:
+        parent = self.node(Path(p).parent)
+        if parent is None or parent.children is None:
+            raise FileNotFoundError(Path(p).parent)
+        return parent
+
+    def mkdir(self, p: Path) -> None:
+        """Create a directory, if it does not already exist."""
+
+        p = Path(p)
+        if self.is_dir(p):
+            return
+        if self.exists(p):
+            raise FileExistsError(p)
+        node = _Node(p.name, self._parent(p), True)
+        node.parent.children[p.name] = node
+        self.ops.append(('mkdir', p))
+
+    def rename(self, old: Path, new: Path) -> None:
+        """Move a file or directory. The target must not exist."""
+
+        old, new = Path(old), Path(new)
+        node = self.node(old)
+        if node is None:
+            raise FileNotFoundError(old)
+        if self.exists(new):
+            raise FileExistsError(new)
+
+        parent = self._parent(new)
+        del node.parent.children[node.name]
+        node.name, node.parent = new.name, parent
+        parent.children[new.name] = node
+        self.ops.append(('rename', old, new))
+
+    def rmdir(self, p: Path) -> None:
+        """Remove an empty directory."""
+
+        node = self.node(p)
+        if node is None or node.children is None:
+            raise NotADirectoryError(p)
+        if node.children:
+            raise OSError(f"Directory not empty: '{p}'")
+        del node.parent.children[node.name]
+        self.ops.append(('rmdir', Path(p)))
+
+    def unlink(self, p: Path) -> None:
+        """Remove a file."""
+
+        node = self.node(p)
+        if node is None or node.children is not None:
+            raise FileNotFoundError(p)
+        del node.parent.children[node.name]
+        self.ops.append(('unlink', Path(p)))
+
+    def write_text(self, p: Path, text: str) -> None:
+        """Set the content of a file, creating it if needed."""
+
+        p = Path(p)
+        node = self.node(p)
+        if node is None:
+            parent = self._parent(p)
+            node = parent.children[p.name] = _Node(p.name, parent, False)
+        elif node.children is not None:
+            raise IsADirectoryError(p)
+        node.text = text
+        node.scanned = None
+        self.ops.append(('write', p, text))
+
+    def commit(self) -> None:
+        """Apply the pending changes to the filesystem, in the order they
+        were made. Files are written atomically."""
+
+        with phase('commit'):
+            self._commit()
+
+    def _commit(self) -> None:
+        from syllabus.analysis import FileAnalysis
+        from syllabus.util import write_text_atomic
+
+        for op in self.ops:
+            if op[0] == 'mkdir':
+                op[1].mkdir(parents=True, exist_ok=True)
+            elif op[0] == 'rename':
+                op[1].rename(op[2])
+            elif op[0] == 'rmdir':
+                op[1].rmdir()
+            elif op[0] == 'unlink':
+                op[1].unlink()
+                FileAnalysis.forget(op[1])
+            elif op[0] == 'write':
+                write_text_atomic(op[1], op[2])
+
+        self.ops = []
+
+        # Now every node is on disk at its own path. Analyses of files
+        # that were only renamed are still good.
+        stack = [(self._root, self.root)]
+        while stack:
+            node, p = stack.pop()
+            if node.children is not None:
+                stack.extend(
+                    (c, p / n) for n, c in node.children.items()
+                )
+            elif node.text is not None:
+                if node.disk is not None:
+                    FileAnalysis.forget(node.disk)
+                FileAnalysis.forget(p)
+            elif node.disk != p:
+                FileAnalysis.move(node.disk, p)
+            node.disk = p
+            node.text = None
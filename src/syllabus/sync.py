@@ -2,60 +2,105 @@
 lesson directory structures."""
 # pylint: disable=C0115  # missing-class-docstring
 
+from __future__ import annotations
+
 import re
 from pathlib import Path
 from collections import defaultdict
 import math
 from textwrap import dedent
-from typing import Generator
-import frontmatter
+from typing import TYPE_CHECKING, Generator
 
 
-from syllabus.models import Lesson, LessonSet, Module, Course
+from syllabus.analysis import FileAnalysis
+from syllabus.nodes import CourseNode, LessonNode, LessonSetNode, ModuleNode
+from syllabus.plan import RenamePlan
+from syllabus.profile import phase, phased
+from syllabus.snapshot import TreeModel, TreeSnapshot
+from syllabus.uids import UidRegistry
 from syllabus.util import *
 
-def is_lesson(f: Path) -> bool:
+# The models, and the pydantic and YAML libraries under them, are only
+# imported by the functions that build them, so `syl check` and the
+# reorganization commands start quickly.
+if TYPE_CHECKING:
+    from syllabus.cache import CompileCache
+    from syllabus.models import Course
+
+class LiveFilesystem:
+    """The subset of the TreeSnapshot interface used for classification,
+    answered straight from the filesystem. Used when no snapshot is given."""
+
+    def is_dir(self, p: Path) -> bool:
+        return Path(p).is_dir()
+
+    def exists(self, p: Path) -> bool:
+        return Path(p).exists()
+
+    def names(self, d: Path) -> list[str]:
+        return sorted(c.name for c in Path(d).iterdir())
+
+    def iterdir(self, d: Path) -> list[Path]:
+        return [Path(d, n) for n in self.names(d)]
+
+    def walk(self, top: Path):
+        return Path(top).walk()
+
+
+def _fs(snapshot: TreeSnapshot | None) -> TreeSnapshot | LiveFilesystem:
+    return snapshot if snapshot is not None else LiveFilesystem()
+
+
+def is_lesson(f: Path, snapshot: TreeSnapshot | None = None) -> bool:
     """Check if the file is a lesson. It is a lesson if it has a rank and
     an extension of (.ipynb, .md, or .py), or if it is a directory with a rank
     and no file in the directory has a rank. """
 
-    if f.is_dir():
-        return match_rank(f) and not any(
-            match_rank(Path(d)) for d in f.iterdir()
-        )
+    fs = _fs(snapshot)
+
+    with phase('classify'):
+        if fs.is_dir(f):
+            return match_rank(f) and not any(
+                match_rank(Path(d)) for d in fs.names(f)
+            )
 
-    if f.suffix in ('.ipynb', '.md', '.py'):
-        return match_rank(f)
+        if f.suffix in ('.ipynb', '.md', '.py'):
+            return match_rank(f)
 
     return False
 
-def is_module(d: Path) -> bool:
+def is_module(d: Path, snapshot: TreeSnapshot | None = None) -> bool:
 
-    if d.is_dir():
+    with phase('classify'):
+        if _fs(snapshot).is_dir(d):
 
-        ranks = extract_rank_string(Path(d))
-        pparts = ranks.split('/')
-        if len(pparts) == 1:
-            return True
+            ranks = extract_rank_string(Path(d))
+            pparts = ranks.split('/')
+            if len(pparts) == 1:
+                return True
 
     return False
 
-def is_lesson_set(d: Path) -> bool:
+def is_lesson_set(d: Path, snapshot: TreeSnapshot | None = None) -> bool:
 
-    return d.is_dir() and not is_module(d) and not is_lesson(d)
+    return (
+        _fs(snapshot).is_dir(d)
+        and not is_module(d, snapshot)
+        and not is_lesson(d, snapshot)
+    )
 
 
-def what_is(p: Path) -> str:
+def what_is(p: Path, snapshot: TreeSnapshot | None = None) -> str:
     """Determine if the path is a lesson, module, or lesson set."""
 
-    if is_lesson(p):
-        if p.is_dir():
+    if is_lesson(p, snapshot):
+        if _fs(snapshot).is_dir(p):
             return 'LD' # Lesson Directory
         else:
             return 'LF' # Lesson File
-    elif is_lesson_set(p):
+    elif is_lesson_set(p, snapshot):
         return 'SL' # Set of Lessons
-    elif is_module(p):
+    elif is_module(p, snapshot):
         return 'MO' # Module
     elif p.name == 'README.md':
         return 'RM' # README
@@ -72,148 +117,295 @@ def get_lesson_name(p: Path) -> str:
         return clean_filename(p.name)
 
 
-def get_readme_metadata(lesson_dir: Path) -> dict[str, str]:
+def get_readme_metadata(
+    lesson_dir: Path, snapshot: TreeSnapshot | None = None
+) -> dict[str, str]:
     """Get the metadata from the README.md file in the lesson directory."""
 
     readme_path = Path(lesson_dir, 'README.md')
 
-    if readme_path.exists():
+    if _fs(snapshot).exists(readme_path):
 
-        # Get the first level 1 heading for the name
-        heading1 = None
-        with open(readme_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                if line.startswith('# '):  # Level 1 heading
-                    heading1 = line[2:].strip()
-                    break
+        # The frontmatter and the first level 1 heading, for the name,
+        # come from the same read of the file.
+        analysis = FileAnalysis.for_path(readme_path)
 
-        metadata = extract_metadata_markdown(readme_path)
-        metadata['name'] = metadata.get('name', heading1)
+        metadata = dict(analysis.frontmatter)
+        metadata['name'] = metadata.get('name', analysis.heading)
 
         return metadata
 
 
     return {}
 
-def compile_syllabus(lesson_dir: Path) -> Course:
+def lesson_files(
+    lesson_dir: Path, snapshot: TreeSnapshot | None = None
+) -> list[Path]:
+    """Return every file that compiling the lesson directory will analyze:
+    ranked lesson files, and all lesson files inside lesson directories."""
+
+    lesson_dir = Path(lesson_dir)
+    files: list[Path] = []
+
+    for (dirpath, dirnames, filenames) in _fs(snapshot).walk(lesson_dir):
+
+        if not match_rank(Path(dirpath)):
+            continue # No rank, so skip this directory
+
+        in_lesson_dir = is_lesson(Path(dirpath), snapshot)
+
+        for f in sorted(filenames):
+            if Path(f).suffix not in ('.ipynb', '.md', '.py'):
+                continue
+            if in_lesson_dir or match_rank(Path(f)):
+                files.append(Path(dirpath, f))
+
+    return files
+
+
+def compile_syllabus(
+    lesson_dir: Path,
+    cache: CompileCache | None = None,
+    jobs: int = 1,
+    snapshot: TreeSnapshot | None = None,
+    model: bool = True,
+    uid_seed: str | None = None,
+) -> Course | CourseNode:
+    """Compile the lesson directory into a Course.
+
+    If a cache is given, per-file metadata, imports and lesson fields are
+    read through it, so unchanged files are not parsed again. With
+    ``jobs`` > 1, files that are not cached are analyzed in a process pool
+    before the tree is built; the result is the same as a serial compile.
+    The directory tree is read once, into ``snapshot`` if one is not
+    given. A snapshot or TreeModel that is passed in belongs to a larger
+    command, which is responsible for clearing FileAnalysis.
+
+    The course is built as a tree of slotted nodes, and converted to the
+    pydantic Course at the end. With ``model=False`` the CourseNode is
+    returned instead, which is enough to write the YAML.
+
+    A course without a uid gets a random one, unless there is a uid seed,
+    ``uid_seed`` or the ``uid_seed`` of the course README; then it is
+    derived from the seed, and the same lessons always compile to the
+    same output."""
 
     lesson_dir = Path(lesson_dir)
 
-    check_structure(lesson_dir)
+    if snapshot is None:
+        snapshot = TreeSnapshot(lesson_dir)
+        FileAnalysis.clear()
+
+    with phase('check'):
+        check_structure(lesson_dir, snapshot)
+
+    if cache is not None:
+        cache.snapshot = snapshot
+
+    if jobs > 1:
+        if cache is None:
+            from syllabus.cache import CompileCache
+
+            cache = CompileCache(lesson_dir, snapshot=snapshot)
+        cache.prime(lesson_files(lesson_dir, snapshot), jobs=jobs)
+
+    with phase('build'):
+        course = compile_course_header(lesson_dir, snapshot, uid_seed)
+
+        for d in module_dirs(lesson_dir, snapshot):
+            course.modules.append(
+                compile_container(lesson_dir, d, cache, snapshot)
+            )
+
+    # Because we added the lessons that are single files independently
+    # from lessons that are directories, they won't have been added in
+    # sorted order. So we need to sort them now.
 
-    course = Course(name='')
-    m = get_readme_metadata(lesson_dir)
-    course.uid = m.get('uid', rand62(8))
+    with phase('sort'):
+        course.sort()
+
+    if not model:
+        return course
+
+    with phase('model'):
+        return course.to_model()
+
+
+def uid_seed_for(
+    lesson_dir: Path,
+    snapshot: TreeSnapshot | None = None,
+    uid_seed: str | None = None,
+) -> str | None:
+    """Return the seed for deterministic uids: ``uid_seed`` if it is given,
+    otherwise the ``uid_seed`` in the course README, or None for random
+    uids."""
+
+    if uid_seed is None:
+        uid_seed = get_readme_metadata(lesson_dir, snapshot).get('uid_seed')
+
+    return str(uid_seed) if uid_seed is not None else None
+
+
+def compile_course_header(
+    lesson_dir: Path,
+    snapshot: TreeSnapshot | None = None,
+    uid_seed: str | None = None,
+) -> CourseNode:
+    """Return a CourseNode with no modules, with the name, uid and
+    description from the lesson directory's README. If the README has no
+    uid, the course gets a random one, or, with a uid seed, one derived
+    from the seed; see :func:`uid_seed_for`."""
+
+    course = CourseNode(name='')
+    m = get_readme_metadata(lesson_dir, snapshot)
+    if 'uid' in m:
+        course.uid = m['uid']
+    else:
+        seed = uid_seed_for(lesson_dir, snapshot, uid_seed)
+        course.uid = rand62(8) if seed is None else stable_uid(seed, '.')
     course.description = m.get('description', course.description)
 
     course.name = m.get('name', course.name)
 
-    omap: dict[str, Module | LessonSet] = {}
-    last_container: Module | LessonSet | None = None
+    return course
+
+
+def module_dirs(
+    lesson_dir: Path, snapshot: TreeSnapshot | None = None
+) -> list[Path]:
+    """Return the ranked module directories of the lesson directory."""
+
+    fs = _fs(snapshot)
+
+    return [
+        d for d in fs.iterdir(lesson_dir)
+        if match_rank(d) and fs.is_dir(d)
+    ]
 
-    for (dirpath, dirnames, filenames) in lesson_dir.walk():
+
+def compile_container(
+    lesson_dir: Path,
+    container_dir: Path,
+    cache: CompileCache | None = None,
+    snapshot: TreeSnapshot | None = None,
+) -> ModuleNode | LessonSetNode:
+    """Compile a module or lesson set directory, and everything under it.
+
+    Unlike :func:`compile_syllabus`, the result is not sorted and keeps the
+    rank paths of its objects, so it can be spliced into a course that is
+    sorted afterwards."""
+
+    lesson_dir = Path(lesson_dir)
+    container_dir = Path(container_dir)
+    snapshot = snapshot or TreeSnapshot(lesson_dir)
+
+    omap: dict[str, ModuleNode | LessonSetNode] = {}
+    root: ModuleNode | LessonSetNode | None = None
+
+    for (dirpath, dirnames, filenames) in snapshot.walk(container_dir):
 
         if not match_rank(Path(dirpath)):
             continue # No rank, so skip this directory
 
         dprtld = Path(dirpath).relative_to(lesson_dir)
 
-        ranks = extract_rank_string(Path(dirpath))
+        ranks = extract_rank_string(dprtld)
         pparts = ranks.split('/')
+        parent = omap.get('/'.join(pparts[:-1]))
 
+        if is_lesson(Path(dirpath), snapshot) and parent is not None:
 
-        if is_lesson(Path(dirpath)):
-
-            last_container.lessons.append(
-                Lesson.new_lesson(lesson_dir, dprtld)
+            parent.lessons.append(
+                LessonNode.new(lesson_dir, dprtld, cache, snapshot)
             )
-        else:
-            if len(pparts) == 1:
-                assert is_module(Path(dirpath)), (
-                    f"Path {dirpath} is not a module"
-                )
-
-                module = Module(
-                    name=clean_filename(dirpath.stem), path=ranks
-                )
-                m = get_readme_metadata(dirpath)
-                module.description = m.get('description')
-                module.uid = m.get('uid')
-                # Allow README frontmatter (or first H1) to override
-                # cleaned directory name
-                if m.get('name'):
-                    module.name = m['name']
-                course.modules.append(module)
-                omap[ranks] = module
-                last_container = module
+            continue
 
+        if len(pparts) == 1:
+            assert is_module(Path(dirpath), snapshot), (
+                f"Path {dirpath} is not a module"
+            )
 
-            else:
-                assert is_lesson_set(Path(dirpath)), (
-                    f"Path {dirpath} is not a lesson set"
-                )
+            container = ModuleNode(
+                name=clean_filename(dirpath.stem), path=ranks
+            )
+        else:
+            assert is_lesson_set(Path(dirpath), snapshot), (
+                f"Path {dirpath} is not a lesson set"
+            )
 
-                lesson_set = LessonSet(
-                    name=clean_filename(dirpath.stem), path=ranks
-                )
-                m = get_readme_metadata(dirpath)
-                lesson_set.description = m.get('description')
-                lesson_set.uid = m.get('uid')
-                if m.get('name'):
-                    lesson_set.name = m['name']
+            container = LessonSetNode(
+                name=clean_filename(dirpath.stem), path=ranks
+            )
 
-                module = omap['/'.join(pparts[:-1])]
-                module.lessons.append(lesson_set)
-                omap[ranks] = lesson_set
-                last_container = lesson_set
+        m = get_readme_metadata(dirpath, snapshot)
+        container.description = m.get('description')
+        container.uid = m.get('uid')
+        # Allow README frontmatter (or first H1) to override
+        # cleaned directory name
+        if m.get('name'):
+            container.name = m['name']
+
+        if parent is not None:
+            parent.lessons.append(container)
+        elif root is None:
+            root = container
+        else:
+            continue # Not connected to the container; skip it
 
+        omap[ranks] = container
 
         for f in sorted(filenames):
-            if is_lesson(Path(f)):
-                l = Lesson.new_lesson(
+            if is_lesson(Path(dirpath, f), snapshot):
+                l = LessonNode.new(
                     lesson_dir,
-                    Path(dirpath, f).relative_to(lesson_dir)
+                    Path(dirpath, f).relative_to(lesson_dir),
+                    cache,
+                    snapshot
                 )
-                last_container.lessons.append(l)
+                container.lessons.append(l)
 
+    return root
 
-    # Because we added the lessons that are single files independently
-    # from lessons that are directories, they won't have been added in
-    # sorted order. So we need to sort them now.
-
-    course.sort()
 
-    def remove_path(obj: Course | Module | LessonSet | Lesson) -> None:
-        """Remove the rank path from the object."""
-        if hasattr(obj, 'path'):
-            del obj.path
-        if hasattr(obj, 'lessons'):
-            for lesson in obj.lessons:
-                remove_path(lesson)
-        elif hasattr(obj, 'modules'):
-            for module in obj.modules:
-                remove_path(module)
+def uid_files(
+    lesson_dir: Path, snapshot: TreeSnapshot | None = None
+) -> list[Path]:
+    """Return every file that can hold a uid: the lesson files, and the
+    READMEs of the course, modules and lesson sets."""
 
-    remove_path(course)
+    lesson_dir = Path(lesson_dir)
+    fs = _fs(snapshot)
 
+    readmes = [
+        Path(d, 'README.md')
+        for d in [lesson_dir] + [
+            Path(dirpath) for dirpath, _, _ in fs.walk(lesson_dir)
+            if match_rank(Path(dirpath))
+            and not is_lesson(Path(dirpath), snapshot)
+        ]
+        if fs.exists(Path(d, 'README.md'))
+    ]
 
-    return course
+    return readmes + lesson_files(lesson_dir, snapshot)
 
 
 def iterlessons(
     lesson_dir: Path,
+    snapshot: TreeSnapshot | None = None,
 ) -> Generator[tuple[str, Path], None, None]:
 
     """Iterate over the lessons in the lesson directory."""
 
     lesson_dir = Path(lesson_dir)
 
-    for (dirpath, dirnames, filenames) in lesson_dir.walk():
+    snapshot = snapshot or TreeSnapshot(lesson_dir)
+
+    for (dirpath, dirnames, filenames) in snapshot.walk(lesson_dir):
 
         if not match_rank(Path(dirpath)):
             continue # No rank, so skip this directory
 
-        tp = what_is(Path(dirpath))
+        tp = what_is(Path(dirpath), snapshot)
 
         yield tp, dirpath
 
@@ -221,29 +413,44 @@ def iterlessons(
             continue
 
         for f in filenames:
-            yield what_is(Path(f)), Path(dirpath, f)
+            yield what_is(Path(dirpath, f), snapshot), Path(dirpath, f)
 
 
-def ensure_readme(p: Path, uid: str | None = None) -> None:
-    """Ensure that a directory has a README.md"""
+def ensure_readme(
+    p: Path, uid: str | None = None, snapshot: TreeSnapshot | None = None,
+    tree: TreeModel | None = None, registry: UidRegistry | None = None,
+    uid_seed: str | None = None
+) -> None:
+    """Ensure that a directory has a README.md with a uid. If a TreeModel
+    is given, the README is written to it instead of to the filesystem.
+    If a UidRegistry is given, a new uid is one that is not in it, and is
+    recorded in it; with a ``uid_seed`` too, it is derived from the seed
+    and the directory's rank path."""
 
     from syllabus.cli.main import logger
     from syllabus.util import rand62
 
-    if not p.is_dir():
+    fs = _fs(tree if tree is not None else snapshot)
+
+    if not fs.is_dir(p):
         return
 
     readme_path = Path(p, 'README.md')
 
-    uid = uid or rand62(8)
-
-    if not readme_path.exists():
+    def new_uid():
+        if registry is None:
+            return uid or rand62(8)
+        if uid is None:
+            return registry.new_uid(readme_path, seed=uid_seed)
+        registry.record(readme_path, uid)
+        return uid
 
+    if not fs.exists(readme_path):
 
         text = dedent(f"""
         ---
 
-        uid: {uid}
+        uid: {new_uid()}
 
         ---
 
@@ -251,83 +458,162 @@ def ensure_readme(p: Path, uid: str | None = None) -> None:
 
         """)
 
-        with open(readme_path, 'w', encoding='utf-8') as file:
-            file.write(text)
+        if tree is not None:
+            tree.write_text(readme_path, text)
+        else:
+            write_text_atomic(readme_path, text)
+            FileAnalysis.forget(readme_path)
 
         logger.info("Create %s", readme_path.relative_to(p))
 
     else:
+        # The header is enough to see that there already is a uid
+        source = tree.source(readme_path) if tree is not None else readme_path
+        if (source is not None
+                and 'uid' in FileAnalysis.for_path(source).frontmatter):
+            return
+
+        import frontmatter
+
         # Load the README.md file
-        with open(readme_path, 'r', encoding='utf-8') as file:
-            post = frontmatter.load(file)
+        if tree is not None:
+            post = frontmatter.loads(tree.read_text(readme_path))
+        else:
+            with open(readme_path, 'r', encoding='utf-8') as file:
+                post = frontmatter.load(file)
 
         # Ensure the frontmatter has a uid
         if 'uid' not in post.metadata:
-            post.metadata['uid'] = uid
+            post.metadata['uid'] = new_uid()
 
             # Save the updated README.md file
-            frontmatter.dump(post, readme_path)
+            if tree is not None:
+                tree.write_text(readme_path, frontmatter.dumps(post))
+            else:
+                write_text_atomic(readme_path, frontmatter.dumps(post))
+                FileAnalysis.forget(readme_path)
 
 
+@phased('metafy')
 def metafy_lessons(
-    lesson_dir: Path, dryrun: bool = True
-) -> None:
+    lesson_dir: Path, dryrun: bool = True, tree: TreeModel | None = None,
+    uid_seed: str | None = None
+) -> list[Path]:
     """ Add metadata to lessons, modules and sets.
 
     Creates README.md files, or ads uids to existing READMEs, and
-    ads metadata to ipynb and py files"""
+    ads metadata to ipynb and py files. Files that already have their
+    metadata are not rewritten. Returns the paths of the files that are
+    written or removed; they are only changed if ``dryrun`` is False. If a
+    TreeModel is given, the changes are made to it, and the caller commits
+    them.
+
+    New uids are checked against the uid registry in ``.jtl/uids.json``,
+    which is brought up to date first, and added to it; the registry is
+    saved unless ``dryrun`` is set. New uids are random, unless there is a
+    uid seed (see :func:`uid_seed_for`); then each is derived from the
+    seed and the rank path of its lesson, module or lesson set."""
 
     from syllabus.cli.main import logger
     from uuid import uuid4
 
     logger.debug("Metafy lessons in %s", lesson_dir)
 
+    lesson_dir = Path(lesson_dir)
+
+    own_tree = tree is None
+    if own_tree:
+        tree = TreeModel.scan(lesson_dir)
+        FileAnalysis.clear()
+
+    start = len(tree.ops)
+
+    registry = UidRegistry.load(lesson_dir)
+    registry.refresh(uid_files(lesson_dir, tree), tree)
+
+    for uid, paths in registry.duplicates().items():
+        logger.warning("Duplicate uid %s in %s", uid, ', '.join(paths))
+
+    seed = uid_seed_for(lesson_dir, tree, uid_seed)
+
     # The course gets a uuid4, for more randomness
-    ensure_readme(lesson_dir, uid=str(uuid4()))
+    ensure_readme(
+        lesson_dir, uid=str(uuid4()) if seed is None else None, tree=tree,
+        registry=registry, uid_seed=seed
+    )
 
-    for typ, p in iterlessons(lesson_dir):
+    for typ, p in iterlessons(lesson_dir, tree):
 
         if typ == 'UK' and p.name == '.DS_Store': # I hate these files.
-            p.unlink()
+            tree.unlink(p)
+
+        if tree.is_dir(p):
+            ensure_readme(p, tree=tree, registry=registry, uid_seed=seed)
 
-        if p.is_dir():
-            ensure_readme(p)
+        if typ == 'LF' and p.suffix in ('.ipynb', '.py'):
 
-        if typ == 'LF':
+            metadata = extract_metadata(tree.source(p))
 
-            metadata = extract_metadata(p)
+            if 'uid' in metadata and 'name' in metadata:
+                continue  # Already tagged
 
             if 'uid' not in metadata:
-                    metadata['uid'] = metadata.get('uid', rand62(8))
+                metadata['uid'] = registry.new_uid(p, seed=seed)
             if 'name' not in metadata:
                 metadata['name'] = clean_filename(p.stem).title()
 
+            text = tree.read_text(p)
+
             if p.suffix == '.ipynb':
-                insert_metadata_notebook(p, metadata)
-                logger.info(
-                    "Add uid to notebook %s",
-                    p.relative_to(lesson_dir)
+                new_text = notebook_with_metadata(text, metadata)
+                kind = 'notebook'
+            else:
+                new_text = python_with_metadata(
+                    text, metadata, filename=str(p)
                 )
-            elif p.suffix == '.py':
-                insert_metadata_python(p, metadata)
+                kind = 'python file'
+
+            if new_text != text:
+                tree.write_text(p, new_text)
+                registry.record(p, metadata['uid'])
                 logger.info(
-                    "Add uid to python file %s",
-                    p.relative_to(lesson_dir)
+                    "Add uid to %s %s", kind, p.relative_to(lesson_dir)
                 )
 
+    changed = list(dict.fromkeys(op[1] for op in tree.ops[start:]))
+
+    if own_tree and not dryrun:
+        tree.commit()
+        registry.stat_recorded()
+
+    if not dryrun:
+        registry.save()
 
+    return changed
 
+
+@phased('regroup')
 def regroup_lessons(
-    lesson_dir: Path, dryrun: bool = True
-) -> None:
+    lesson_dir: Path, dryrun: bool = True, tree: TreeModel | None = None
+) -> RenamePlan:
+    """Move lesson files that share a rank and base name into a directory
+    of their own. Returns the plan of the changes, which are only made if
+    ``dryrun`` is False. If a TreeModel is given, the changes are made to
+    it, and the caller commits them."""
 
     from syllabus.cli.main import logger
 
-    check_structure(lesson_dir)
-
     lesson_dir = Path(lesson_dir)
 
-    for (dirpath, dirnames, filenames) in lesson_dir.walk():
+    own_tree = tree is None
+    if own_tree:
+        tree = TreeModel.scan(lesson_dir)
+
+    check_structure(lesson_dir, tree)
+
+    plan = RenamePlan(lesson_dir)
+
+    for (dirpath, dirnames, filenames) in tree.walk(lesson_dir):
 
         if not match_rank(Path(dirpath)):
             continue # No rank, so skip this directory
@@ -347,8 +633,7 @@ def regroup_lessons(
             # Create a new directory for the group
             new_dir = Path(dirpath, k)
 
-            if not dryrun:
-                new_dir.mkdir(parents=True, exist_ok=True)
+            plan.mkdir(new_dir)
 
             for f in v:
                 old_path = Path(dirpath, f)
@@ -368,19 +653,57 @@ def regroup_lessons(
                     new_path.relative_to(lesson_dir)
                 )
 
-                if not dryrun:
-                    old_path.rename(new_path)
+                plan.move(old_path, new_path)
 
+    plan.apply(tree)
 
-def renumber_lessons(
-    lesson_dir: Path, increment: int = 1, dryrun: bool = True
-) -> None:
+    if own_tree and not dryrun:
+        tree.commit()
+
+    return plan
 
 
+@phased('renumber')
+def renumber_lessons(
+    lesson_dir: Path, increment: int = 1, dryrun: bool = True,
+    tree: TreeModel | None = None, minimal: bool = False,
+    max_density: float = 0.5
+) -> RenamePlan:
+    """Renumber the ranks of the modules, lesson sets and lessons, in steps
+    of ``increment``, and remove empty directories. Returns the plan of the
+    changes, which are only made if ``dryrun`` is False. If a TreeModel is
+    given, the changes are made to it, and the caller commits them.
+
+    With ``minimal``, only the entries that are out of order are renamed,
+    into gaps between the other ranks or with letter suffixes (see
+    :func:`syllabus.util.minimal_ranks`). A directory is renumbered in
+    full when there is no room, or when more than ``max_density`` of its
+    ranks would have letters."""
+
     from syllabus.cli.main import logger
     lesson_dir = Path(lesson_dir)
 
-    check_structure(lesson_dir)
+    own_tree = tree is None
+    if own_tree:
+        tree = TreeModel.scan(lesson_dir)
+
+    check_structure(lesson_dir, tree)
+
+    plan = RenamePlan(lesson_dir)
+
+    # Delete all empty directories, except in hidden ones like .git
+    for dirpath, dirnames, filenames in tree.walk(lesson_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for dirname in dirnames:
+            dir_to_check = Path(dirpath, dirname)
+            if not tree.names(dir_to_check):
+                logger.info(
+                    "Deleting empty directory: %s",
+                    dir_to_check.relative_to(lesson_dir)
+                )
+                plan.rmdir(dir_to_check)
+
+    removed = set(plan.rmdirs)
 
     def compile_changes(
         dirpath: Path,
@@ -390,29 +713,50 @@ def renumber_lessons(
 
         changes: list[tuple[int, Path, Path]] = []
 
+        all_names = [
+            n for n in all_names if Path(dirpath, n) not in removed
+        ]
+
         if len(all_names) == 0:
             return changes
 
 
         all_names.sort()
 
-        max_n = max(len(all_names)*increment, 1)
+        new_ranks = None
+        if minimal:
+            new_ranks = minimal_ranks(
+                [match_rank(Path(n)) for n in all_names],
+                increment, max_density
+            )
+            if new_ranks is None:
+                logger.info(
+                    "Rebalancing %s",
+                    Path(dirpath).relative_to(lesson_dir)
+                )
 
-        digits = math.ceil(math.log10(max_n))
-        digits = max(digits, 2)
+        if new_ranks is None:
+            max_n = max(len(all_names)*increment, 1)
 
+            digits = math.ceil(math.log10(max_n))
+            digits = max(digits, 2)
 
-        for i, n in enumerate(all_names,1):
+            new_ranks = [
+                str(i * increment).zfill(digits)
+                for i in range(1, len(all_names) + 1)
+            ]
 
-            i *= increment
+        for n, rank in zip(all_names, new_ranks):
 
-            new_name = replace_rank(Path(n), str(i).zfill(digits))
+            new_name = replace_rank(Path(n), rank)
 
             if str(n) == str(new_name):
                 continue
 
             old_path = Path(dirpath, n)
-            assert old_path.exists(), f"File {old_path} does not exist"
+            assert tree.exists(old_path), (
+                f"File {old_path} does not exist"
+            )
 
             depth = len(old_path.relative_to(lesson_dir).parts)
 
@@ -425,11 +769,11 @@ def renumber_lessons(
     changes.extend(compile_changes(
         lesson_dir,
         [d.relative_to(lesson_dir)
-         for d in lesson_dir.iterdir() if match_rank(Path(d))]
+         for d in tree.iterdir(lesson_dir) if match_rank(Path(d))]
     ))
 
 
-    for (dirpath, dirnames, filenames) in lesson_dir.walk():
+    for (dirpath, dirnames, filenames) in tree.walk(lesson_dir):
 
         if not match_rank(Path(dirpath)):
             continue # No rank, so skip this directory
@@ -442,19 +786,6 @@ def renumber_lessons(
         changes.extend(compile_changes(dirpath, all_names))
 
 
-    # Delete all empty directories
-    for dirpath, dirnames, filenames in lesson_dir.walk():
-        for dirname in dirnames:
-            dir_to_check = Path(dirpath, dirname)
-            if not any(dir_to_check.iterdir()):
-                logger.info(
-                    "Deleting empty directory: %s",
-                    dir_to_check.relative_to(lesson_dir)
-                )
-                if not dryrun:
-                    dir_to_check.rmdir()
-
-
     for depth, old_name, new_name in reversed(
         sorted(changes, key=lambda x: x[0])
     ):
@@ -463,17 +794,67 @@ def renumber_lessons(
             old_name.relative_to(lesson_dir),
             new_name.relative_to(lesson_dir)
         )
-        if not dryrun:
-            try:
-                old_name.rename(new_name)
-            except OSError as e:
-                logger.info(
-                    "Error renaming %s to %s: %s",
-                    old_name.relative_to(lesson_dir),
-                    new_name.relative_to(lesson_dir), e
-                )
+        plan.move(old_name, new_name)
+
+    plan.apply(tree)
+
+    if own_tree and not dryrun:
+        tree.commit()
+
+    return plan
+
+
+def compile_pipeline(
+    lesson_dir: Path,
+    regroup: bool = False,
+    renumber: bool = False,
+    metafy: bool = False,
+    increment: int = 1,
+    cache: CompileCache | None = None,
+    jobs: int = 1,
+    minimal: bool = False,
+    model: bool = True,
+    uid_seed: str | None = None,
+) -> Course | CourseNode:
+    """Regroup, renumber and add metadata to the lessons, then compile them.
+
+    This is the same as running :func:`regroup_lessons`,
+    :func:`renumber_lessons`, :func:`metafy_lessons` and
+    :func:`compile_syllabus` in turn, but the tree is scanned only once.
+    Each step changes an in-memory TreeModel, the changes are written to
+    the filesystem in one batch, and the syllabus is compiled from the
+    model."""
+
+    lesson_dir = Path(lesson_dir)
+
+    FileAnalysis.clear()
+    tree = TreeModel.scan(lesson_dir)
+
+    if regroup:
+        regroup_lessons(lesson_dir, dryrun=False, tree=tree)
+
+    if renumber:
+        renumber_lessons(
+            lesson_dir, increment=increment, dryrun=False, tree=tree,
+            minimal=minimal
+        )
+
+    if metafy:
+        metafy_lessons(
+            lesson_dir, dryrun=False, tree=tree, uid_seed=uid_seed
+        )
+
+    tree.commit()
+
+    return compile_syllabus(
+        lesson_dir, cache=cache, jobs=jobs, snapshot=tree, model=model,
+        uid_seed=uid_seed
+    )
+
 
-def check_structure(lesson_dir: Path) -> bool:
+def check_structure(
+    lesson_dir: Path, snapshot: TreeSnapshot | None = None
+) -> bool:
     """Check the structure of the lesson directory.
 
     Validates that the top level contains only ranked module directories
@@ -487,8 +868,9 @@ def check_structure(lesson_dir: Path) -> bool:
     logger.debug("Checking structure of %s", lesson_dir)
 
     lesson_dir = Path(lesson_dir)
+    fs = _fs(snapshot)
 
-    if not lesson_dir.is_dir():
+    if not fs.is_dir(lesson_dir):
         raise ValueError(
             f"Lesson directory not found: '{lesson_dir}' is not a "
             f"directory. Expected a directory containing ranked module "
@@ -499,7 +881,7 @@ def check_structure(lesson_dir: Path) -> bool:
     # which means (1) There are no files except a README.md, (2) all of
     # the directories have a rank.
 
-    for p in lesson_dir.iterdir():
+    for p in fs.iterdir(lesson_dir):
 
         if p.name in ('.DS_Store', '.git', 'README.md'):
             continue
@@ -509,7 +891,7 @@ def check_structure(lesson_dir: Path) -> bool:
 
         if p.stem.lower() == 'readme':
             continue
-        if not p.is_dir() and p.name != 'README.md':
+        if not fs.is_dir(p) and p.name != 'README.md':
             raise ValueError(
                 f"Unexpected file at top level: '{p.name}' in "
                 f"'{lesson_dir}'. The top-level lesson directory "
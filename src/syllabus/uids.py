@@ -0,0 +1,229 @@
+"""Registry of the uids in a lesson directory, stored under ``.jtl/``.
+
+The registry maps every file that can carry a uid -- lesson files and the
+READMEs of the course, modules and lesson sets -- to the uid in its
+metadata, with an index from uid back to the files. New uids are checked
+against the index, so :func:`syllabus.sync.metafy_lessons` never hands out
+one that is already in use, and duplicates can be found without parsing
+the whole tree. Like the compile cache, an entry is reused only while
+the file's size and mtime are unchanged, so a refresh only parses the
+files that changed.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from syllabus.profile import count, phase
+from syllabus.util import (
+    extract_metadata,
+    extract_rank_string,
+    rand62,
+    stable_uid,
+    write_text_atomic,
+)
+
+REGISTRY_VERSION = 1
+REGISTRY_FILE = 'uids.json'
+
+
+class UidRegistry:
+    """The uids of the files in a lesson directory.
+
+    A registry created without a path lives only in memory; one created
+    with :meth:`load` is read from, and saved back to, ``.jtl/uids.json``.
+    """
+
+    def __init__(self, lesson_dir: Path, path: Path | None = None):
+        self.lesson_dir = Path(lesson_dir)
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        self.changed = False
+        self._by_uid: dict[str, set[str]] = {}
+
+    @classmethod
+    def load(cls, lesson_dir: Path) -> 'UidRegistry':
+        """Load the registry for a lesson directory, or start an empty one
+        if there is no usable registry file."""
+
+        lesson_dir = Path(lesson_dir)
+        registry = cls(lesson_dir, lesson_dir / '.jtl' / REGISTRY_FILE)
+
+        try:
+            with phase('uids'):
+                data = json.loads(registry.path.read_text(encoding='utf-8'))
+                count('parse.json')
+        except (OSError, ValueError):
+            return registry
+
+        if isinstance(data, dict) and data.get('version') == REGISTRY_VERSION:
+            registry.entries = data.get('entries', {})
+            for key, entry in registry.entries.items():
+                registry._index(key, entry.get('uid'))
+
+        return registry
+
+    def save(self) -> None:
+        """Write the registry back to disk, if it changed."""
+
+        if self.path is None or not self.changed:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(self.path, json.dumps({
+            'version': REGISTRY_VERSION,
+            'entries': dict(sorted(self.entries.items())),
+        }))
+        self.changed = False
+
+    def key(self, p: Path) -> str:
+        """Return the key for a file, its path relative to the lesson
+        directory."""
+
+        try:
+            return Path(p).relative_to(self.lesson_dir).as_posix()
+        except ValueError:
+            return Path(p).as_posix()
+
+    def _index(self, key: str, uid) -> None:
+        if uid:
+            self._by_uid.setdefault(str(uid), set()).add(key)
+
+    def _unindex(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        self.changed = True
+        uid = entry and entry.get('uid')
+        if uid:
+            keys = self._by_uid.get(str(uid), set())
+            keys.discard(key)
+            if not keys:
+                self._by_uid.pop(str(uid), None)
+
+    def refresh(self, paths: list[Path], snapshot=None) -> 'UidRegistry':
+        """Bring the registry up to date with the files in ``paths``, the
+        only files that are now in the tree. Files whose size or mtime
+        changed are read again. ``snapshot`` is a TreeSnapshot or
+        TreeModel of the tree, for stat results and, for a TreeModel, for
+        where to read moved files from."""
+
+        with phase('uids'):
+            seen = set()
+
+            for p in paths:
+                key = self.key(p)
+                seen.add(key)
+
+                st = snapshot.stat(p) if snapshot is not None else os.stat(p)
+                sig = [st.st_size, st.st_mtime_ns]
+                entry = self.entries.get(key)
+                if entry is not None and entry.get('sig') == sig:
+                    continue
+
+                source = p
+                if hasattr(snapshot, 'source'):
+                    source = snapshot.source(p) or p
+                uid = extract_metadata(Path(source)).get('uid')
+
+                self._unindex(key)
+                self.entries[key] = {
+                    'uid': str(uid) if uid else None, 'sig': sig
+                }
+                self._index(key, uid)
+
+            for key in set(self.entries) - seen:
+                self._unindex(key)
+
+        return self
+
+    def record(self, p: Path, uid: str) -> None:
+        """Record that file ``p`` now has ``uid``. The file is read again
+        by the next :meth:`refresh`, once it has been written."""
+
+        key = self.key(p)
+        self._unindex(key)
+        self.entries[key] = {'uid': uid, 'sig': None}
+        self._index(key, uid)
+
+    def stat_recorded(self) -> None:
+        """Store the size and mtime of the files recorded since the last
+        refresh, once they have been written, so they are not read
+        again."""
+
+        for key, entry in self.entries.items():
+            if entry['sig'] is None:
+                try:
+                    st = os.stat(self.lesson_dir / key)
+                except OSError:
+                    continue
+                entry['sig'] = [st.st_size, st.st_mtime_ns]
+
+    def rank_path(self, p: Path) -> str:
+        """Return the rank path of the object whose uid file ``p`` holds: a
+        README stands for its directory."""
+
+        key = Path(self.key(p))
+        if key.name == 'README.md':
+            key = key.parent
+        return extract_rank_string(key)
+
+    def new_uid(
+        self, p: Path, n: int = 8, seed: str | None = None
+    ) -> str:
+        """Return a uid that is not in use, recorded for ``p``. The uid is
+        random, or, with a course ``seed``, derived from the seed and the
+        rank path of ``p``; see :func:`syllabus.util.stable_uid`."""
+
+        if seed is None:
+            uid = rand62(n)
+            while uid in self:
+                uid = rand62(n)
+        else:
+            rank_path = self.rank_path(p)
+            attempt = 0
+            uid = stable_uid(seed, rank_path, n)
+            while uid in self:
+                attempt += 1
+                uid = stable_uid(seed, rank_path, n, attempt)
+
+        self.record(p, uid)
+        return uid
+
+    def __contains__(self, uid) -> bool:
+        return str(uid) in self._by_uid
+
+    def __len__(self) -> int:
+        return len(self._by_uid)
+
+    def paths(self, uid) -> list[str]:
+        """Return the files that have ``uid``, relative to the lesson
+        directory."""
+
+        return sorted(self._by_uid.get(str(uid), ()))
+
+    def duplicates(self) -> dict[str, list[str]]:
+        """Return the uids held by more than one file, with the files."""
+
+        return {
+            uid: sorted(keys) for uid, keys in sorted(self._by_uid.items())
+            if len(keys) > 1
+        }
+
+
+def find_duplicates(
+    registries: list[UidRegistry]
+) -> dict[str, list[tuple[Path, str]]]:
+    """Return the uids held by more than one file in any of the
+    registries, with the lesson directory and path of each file."""
+
+    holders: dict[str, list[tuple[Path, str]]] = {}
+
+    for registry in registries:
+        for uid, keys in registry._by_uid.items():
+            holders.setdefault(uid, []).extend(
+                (registry.lesson_dir, k) for k in sorted(keys)
+            )
+
+    return {
+        uid: files for uid, files in sorted(holders.items())
+        if len(files) > 1
+    }
@@ -1,10 +1,12 @@
+import os
 import re
+import shutil
 from pathlib import Path
-import frontmatter
 import json
 import string
 import random
 import ast
+import bisect
 
 name_p = re.compile(r'^(\d+[A-Za-z]*)_([^\.]+)$')
 assignment_exts = ['.py', '.ipynb', '.md', '.class','.java', '.cpp', '.c', '.h']
@@ -14,8 +16,34 @@ rank_p = re.compile(r'^(\d+[A-Za-z]*)_')
 DISPLAY_MODULES = ['turtle', 'guizero', 'pygame', 'tkinter']
 
 def get_imports(filepath: Path) -> list[str]:
-    with open(filepath, "r", encoding="utf-8") as file:
-        node = ast.parse(file.read(), filename=filepath)
+    """Return the sorted top-level names of the modules a Python file, or
+    the code cells of a notebook, imports."""
+
+    from syllabus.analysis import FileAnalysis
+
+    return FileAnalysis.for_path(filepath).imports
+
+# A line that starts an import statement
+import_line_p = re.compile(r'^[ \t]*(?:import|from)[ \t\\(]', re.M)
+
+# An import after a semicolon or a colon, as in ``try: import turtle``,
+# which the line scan does not look for
+inline_import_p = re.compile(r'[;:][ \t]*(?:import|from)\b')
+
+# Strings and comments, so that import-like lines inside triple-quoted
+# strings can be ignored.
+string_or_comment_p = re.compile(
+    r'(\'\'\'|""")(?:\\.|(?!\1).)*\1?'
+    r'|#[^\n]*'
+    r'|"(?:\\.|[^"\\\n])*"?'
+    r"|'(?:\\.|[^'\\\n])*'?",
+    re.S
+)
+
+
+def _import_names(node: ast.AST) -> set[str]:
+    """Return the top-level module names of the imports in an AST."""
+
     imports: set[str] = set()
 
     for n in ast.walk(node):
@@ -26,6 +54,90 @@ def get_imports(filepath: Path) -> list[str]:
             if n.module is not None:
                 imports.add(n.module.split('.')[0])
 
+    return imports
+
+
+def _scan_imports(source: str) -> set[str] | None:
+    """Find imports by looking only at lines that start an import statement.
+
+    Returns None when the source has something the line scan can't handle
+    reliably, in which case the caller should parse the whole file."""
+
+    if inline_import_p.search(source):
+        return None
+
+    candidates = [m.start() for m in import_line_p.finditer(source)]
+
+    if not candidates:
+        return set()
+
+    # Spans of triple-quoted strings; imports inside them don't count. An
+    # unterminated string runs to the end of the source.
+    spans: list[tuple[int, int]] = []
+    if '"""' in source or "'''" in source:
+        for m in string_or_comment_p.finditer(source):
+            if m.group(1):
+                spans.append(m.span())
+
+    span_starts = [a for a, _ in spans]
+    imports: set[str] = set()
+
+    for start in candidates:
+        i = bisect.bisect_right(span_starts, start) - 1
+        if i >= 0 and start < spans[i][1]:
+            continue
+
+        # Gather the whole statement: bracketed or backslash-continued
+        # lines belong to it.
+        stmt = ''
+        pos = start
+        while pos < len(source):
+            end = source.find('\n', pos)
+            end = len(source) if end < 0 else end + 1
+            line = source[pos:end]
+            stmt += line
+            pos = end
+            depth = stmt.count('(') - stmt.count(')')
+            if depth <= 0 and not line.rstrip('\r\n').endswith('\\'):
+                break
+
+        try:
+            node = ast.parse(stmt.lstrip())
+        except SyntaxError:
+            return None
+
+        imports.update(_import_names(node))
+
+    return imports
+
+
+def imports_from_source(source: str, filename: str = '<unknown>') -> list[str]:
+    """Return the sorted top-level names of the modules imported by Python
+    source code.
+
+    Only the lines that start import statements are parsed. If the line
+    scan can't be trusted, the whole source is parsed instead, and if that
+    fails with a SyntaxError, the import lines that parse on their own are
+    used, so a broken exercise file does not stop a compile."""
+
+    from syllabus.profile import count
+
+    count('parse.python')
+    imports = _scan_imports(source)
+
+    if imports is None:
+        count('parse.ast')
+        try:
+            imports = _import_names(ast.parse(source, filename=filename))
+        except SyntaxError:
+            imports = set()
+            for m in import_line_p.finditer(source):
+                line = source[m.start():].split('\n', 1)[0]
+                try:
+                    imports.update(_import_names(ast.parse(line.strip())))
+                except SyntaxError:
+                    continue
+
     return sorted(imports)
 
 def needs_display(filepath: Path) -> bool:
@@ -36,12 +148,153 @@ def rand62(n: int) -> str:
     chars = string.ascii_letters + string.digits
     return ''.join(random.choices(chars, k=n))
 
+def stable_uid(seed: str, rank_path: str, n: int = 8, attempt: int = 0) -> str:
+    """Return a base-62 uid derived from a course seed and the rank path of
+    an object, such as ``10/20``, or ``.`` for the course. The same inputs
+    always give the same uid; ``attempt`` gives another one, for when the
+    first is taken."""
+
+    import hashlib
+
+    digest = hashlib.blake2b(
+        f'{seed}\0{rank_path}\0{attempt}'.encode('utf-8'), digest_size=16
+    ).digest()
+
+    chars = string.ascii_letters + string.digits
+    d = int.from_bytes(digest, 'big')
+    uid = []
+    for _ in range(n):
+        d, r = divmod(d, 62)
+        uid.append(chars[r])
+    return ''.join(uid)
+
 def clean_filename(filename: str) -> str:
     """Remove leading numbers and letters up to the first "_" or " "."""
 
     return re.sub(rank_p, '', filename).replace('_', ' ').replace('-', ' ')
 
 
+# The start of a string literal at the start of a line, with its prefix
+string_start_p = re.compile(r'([rRuU]?)("""|\'\'\'|"|\')')
+
+# A line of metadata, in a docstring or in a comment
+doc_metadata_p = re.compile(r'^(\w+):\s*(.*)$')
+comment_metadata_p = re.compile(r'^#\s+(\w+):\s*(.*)')
+
+
+def _string_end(text: str, i: int, quote: str) -> int | None:
+    """Return the position after the closing ``quote`` of a string literal
+    whose body starts at ``i``, or None if it is not closed."""
+
+    start = i
+    while True:
+        j = text.find(quote, i)
+        if j < 0:
+            return None
+
+        k = j
+        while k > start and text[k - 1] == '\\':
+            k -= 1
+
+        if (j - k) % 2 == 0:  # Not escaped
+            if len(quote) == 1 and '\n' in text[start:j]:
+                return None
+            return j + len(quote)
+
+        i = j + 1
+
+
+def python_header(
+    text: str
+) -> tuple[list[str], str | None, tuple[int, int] | None]:
+    """Scan the header of a Python file: the comments, blank lines and
+    module docstring before the first statement. Nothing after the header
+    is looked at, so the cost does not depend on the length of the file.
+
+    Returns the comment lines, the docstring, or None if there is none,
+    and the (start, end) position of the docstring's lines in ``text``.
+    """
+
+    comments: list[str] = []
+    docstring, span = None, None
+    pos = 0
+
+    while pos < len(text):
+        eol = text.find('\n', pos)
+        eol = len(text) if eol < 0 else eol
+        line = text[pos:eol]
+        stripped = line.strip()
+
+        if not stripped or stripped.startswith('#'):
+            if stripped:
+                comments.append(line)
+            pos = eol + 1
+            continue
+
+        # The first statement: a docstring, if it is a string by itself
+        m = string_start_p.match(line)
+        if docstring is not None or m is None:
+            break
+
+        end = _string_end(text, pos + m.end(), m.group(2))
+        if end is None:
+            break
+
+        eol = text.find('\n', end)
+        eol = len(text) if eol < 0 else eol
+        rest = text[end:eol].strip()
+        if rest and not rest.startswith('#'):
+            break
+
+        try:
+            docstring = ast.literal_eval(text[pos:end])
+        except (ValueError, SyntaxError):
+            break
+
+        span = (pos, min(eol + 1, len(text)))
+        pos = eol + 1
+
+    return comments, docstring, span
+
+
+def python_metadata_from_source(
+    text: str, filename: str = '<unknown>'
+) -> tuple[dict[str, str], dict[str, str], str]:
+    """Extract metadata from the source of a Python file.
+
+    Returns a tuple of the ``key: value`` lines in the module docstring,
+    the ``# key: value`` comment lines, and the docstring with the metadata
+    lines removed. Only the header of the file is read (see
+    :func:`python_header`), so comments further down are not metadata.
+    """
+    doc_metadata: dict[str, str] = {}
+    comment_metadata: dict[str, str] = {}
+    cleaned_doc = ''
+
+    comments, docstring, _ = python_header(text)
+
+    # Parse module docstring for key: value lines.
+    if docstring is not None:
+        preserved_lines: list[str] = []
+        for line in docstring.splitlines():
+            m = doc_metadata_p.match(line.strip())
+            if m:
+                k, v = m.groups()
+                doc_metadata[k] = v
+            else:
+                preserved_lines.append(line)
+        cleaned_doc = '\n'.join(l for l in preserved_lines).strip('\n')
+
+    # Also parse YAML-ish comment lines beginning with '# key: value'
+    for line in comments:
+        match = comment_metadata_p.match(line)
+        if match:
+            key, value = match.groups()
+            comment_metadata[key.strip()] = value.strip()
+
+    return doc_metadata, comment_metadata, cleaned_doc
+
+
 def extract_metadata_python(
     p: Path, with_doc: bool = False
 ) -> dict[str, str] | tuple[dict[str, str], str]:
@@ -61,71 +314,211 @@ def extract_metadata_python(
         If ``with_doc`` is False (default): ``dict`` of metadata.
         If ``with_doc`` is True: ``(metadata_dict, cleaned_docstring_text)``.
     """
-    metadata: dict[str, str] = {}
-    cleaned_doc = ''
-
-    text = p.read_text(encoding='utf-8')
-
-    # Parse module docstring for key: value lines.
-    try:
-        module = ast.parse(text, filename=str(p))
-        if (module.body
-                and isinstance(module.body[0], ast.Expr)
-                and isinstance(module.body[0].value, ast.Constant)
-                and isinstance(module.body[0].value.value, str)):
-            docstring = module.body[0].value.value
-            preserved_lines: list[str] = []
-            for line in docstring.splitlines():
-                m = re.match(r'^(\w+):\s*(.*)$', line.strip())
-                if m:
-                    k, v = m.groups()
-                    metadata[k] = v
-                else:
-                    preserved_lines.append(line)
-            cleaned_doc = '\n'.join(l for l in preserved_lines).strip('\n')
-    except SyntaxError:
-        pass  # fall through; metadata may still come from comments
+    from syllabus.analysis import FileAnalysis
 
-    # Also parse YAML-ish comment lines beginning with '# key: value'
-    for line in text.splitlines():
-        if line.startswith('#') and ':' in line:
-            match = re.match(r'^#\s+(\w+):\s*(.*)', line)
-            if match:
-                key, value = match.groups()
-                metadata[key.strip()] = value.strip()
+    analysis = FileAnalysis.for_path(p)
+    metadata = {**analysis.doc_metadata, **analysis.comment_metadata}
 
     if with_doc:
-        return metadata, cleaned_doc
+        return metadata, analysis.docstring
     return metadata
 
 
 
+# A boundary line of YAML frontmatter, as python-frontmatter matches it
+frontmatter_boundary_p = re.compile(r'^-{3,}\s*$', re.M)
+
+# A level 1 heading
+heading_p = re.compile(r'^# (.*)$', re.M)
+
+# A top-level name key in YAML frontmatter
+frontmatter_name_p = re.compile(r'^name\s*:', re.M)
+
+# How much of a markdown file to read at a time, looking for its header
+MARKDOWN_CHUNK = 4096
+MARKDOWN_CHUNK_MAX = 1 << 20
+
+
+def _find_heading(lines: str) -> str | None:
+    """Return the first level 1 heading in ``lines``, if there is one."""
+
+    # Looking for the line start with find() is much faster than a
+    # multiline regex search
+    if lines.startswith('# '):
+        i = 0
+    else:
+        i = lines.find('\n# ') + 1
+        if not i:
+            return None
+
+    return heading_p.match(lines, i).group(1).strip()
+
+
+class _MarkdownHeaderScan:
+    """Tracks, a region of whole lines at a time, whether the start of a
+    markdown file holds all of the frontmatter and the first level 1
+    heading. Each region is only scanned once. The heading is only
+    needed for the name, so frontmatter with a name is enough."""
+
+    def __init__(self):
+        self.lead = None  # 'yaml', 'other' frontmatter, or 'none'
+        self.front: list[str] = []  # The YAML frontmatter, while open
+        self.boundaries = 0
+        self.named = False
+        self.heading: str | None = None
+
+    def feed(self, lines: str) -> bool:
+        """Scan the next whole lines of the file, and return True once the
+        header is complete."""
+
+        if self.lead is None:
+            stripped = lines.lstrip()
+            if not stripped:
+                return False
+            if stripped.startswith(('+++', '{')):
+                self.lead = 'other'  # TOML or JSON frontmatter: read it all
+            elif stripped.startswith('---'):
+                self.lead = 'yaml'
+                lines = stripped
+            else:
+                self.lead = 'none'
+
+        if self.lead == 'yaml' and self.boundaries < 2:
+            self.front.append(lines)
+            self.boundaries += len(frontmatter_boundary_p.findall(lines))
+            if self.boundaries >= 2:
+                front = ''.join(self.front)
+                b = list(frontmatter_boundary_p.finditer(front))
+                self.named = bool(
+                    frontmatter_name_p.search(front, b[0].end(), b[1].start())
+                )
+                self.front = []
+
+        if self.heading is None:
+            self.heading = _find_heading(lines)
+
+        if self.lead == 'other':
+            return False
+        if self.lead == 'yaml':
+            return self.boundaries >= 2 and (
+                self.named or self.heading is not None
+            )
+        return self.heading is not None
+
+
+def read_markdown_header(p: Path) -> tuple[dict, str | None]:
+    """Return the frontmatter and the first level 1 heading of a markdown
+    file. The file is read a chunk at a time, each chunk twice the size of
+    the last, only as far as the end of the frontmatter and the heading,
+    so a long body is not read. Each chunk is scanned once. If the
+    frontmatter has a name, the heading is not looked for past the chunk
+    that ends the frontmatter, and may be None."""
+
+    from syllabus.profile import count, count_read
+
+    count('parse.frontmatter')
+    chunks = []
+    scan = _MarkdownHeaderScan()
+    with open(p, 'r', encoding='utf-8') as file:
+        tail = []  # The last, partial line, scanned once it is whole
+        size = MARKDOWN_CHUNK
+        while True:
+            chunk = file.read(size)
+            chunks.append(chunk)
+            if len(chunk) < size:
+                scan.feed(''.join(tail) + chunk)  # The rest of the file
+                break
+            end = chunk.rfind('\n') + 1
+            if not end:
+                tail.append(chunk)
+            else:
+                lines = ''.join(tail) + chunk[:end]
+                tail = [chunk[end:]]
+                if scan.feed(lines):
+                    break
+            # The header is usually in the first chunk; if not, read more
+            # at a time, so a long body costs few reads
+            size = min(size * 2, MARKDOWN_CHUNK_MAX)
+
+    text = ''.join(chunks)
+    count_read(text)
+    heading = scan.heading
+
+    if not text.lstrip().startswith(('---', '+++', '{')):
+        return {}, heading  # No frontmatter, so no need to parse it
+
+    import frontmatter
+
+    return frontmatter.loads(text).metadata, heading
+
+
 def extract_metadata_markdown(p: Path) -> dict[str, str]:
     """ Return the frontmatter"""
+    from syllabus.analysis import FileAnalysis
 
-    with open(p, 'r', encoding='utf-8') as file:
-        return frontmatter.load(file).metadata
+    return dict(FileAnalysis.for_path(p).frontmatter)
 
 def extract_metadata_notebook(p: Path) -> dict[str, str]:
-    """Extract metadata from a jupyter notebook file."""
-    with open(p, 'r', encoding='utf-8') as file:
-        notebook = json.load(file)
-        metadata = notebook.get('metadata', {}).get('syllabus', {})
-        return metadata
+    """Extract metadata from a jupyter notebook file.
+
+    Only the notebook's top-level ``metadata`` object is decoded; the cells
+    and their outputs are skipped over."""
+    from syllabus.analysis import FileAnalysis
+
+    return FileAnalysis.for_path(p).metadata
+
+
+def write_text_atomic(p: Path, text: str) -> None:
+    """Write a file through a temporary file in the same directory, which
+    then replaces it, so that a reader never sees a partial file. The
+    file keeps its permissions."""
+
+    p = Path(p)
+    tmp = p.with_name(f'.{p.name}.syl-tmp')
+
+    try:
+        with open(tmp, 'w', encoding='utf-8') as file:
+            file.write(text)
+        if p.exists():
+            shutil.copymode(p, tmp)
+        os.replace(tmp, p)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
 
 def insert_metadata_notebook(p: Path, metadata: dict[str, str]) -> None:
-    """Insert metadata into a jupyter notebook file."""
+    """Insert metadata into a jupyter notebook file. The file is not
+    written if it would not change."""
     with open(p, 'r', encoding='utf-8') as file:
-        notebook = json.load(file)
+        original_text = file.read()
 
-        if 'syllabus' not in notebook['metadata']:
-            notebook['metadata']['syllabus'] = {}
+    text = notebook_with_metadata(original_text, metadata)
+    if text == original_text:
+        return
 
-        notebook['metadata']['syllabus'] = metadata
+    write_text_atomic(p, text)
 
-    with open(p, 'w', encoding='utf-8') as file:
-        json.dump(notebook, file, indent=2)
+    from syllabus.analysis import FileAnalysis
+    FileAnalysis.forget(p)
+
+
+def notebook_with_metadata(text: str, metadata: dict[str, str]) -> str:
+    """Return the text of a notebook with its syllabus metadata replaced.
+    Only the metadata is rewritten, unless it can't be found, in which case
+    the whole notebook is reformatted."""
+
+    from syllabus.notebook import patch_notebook_metadata
+
+    patched = patch_notebook_metadata(text, metadata)
+    if patched is not None:
+        return patched
+
+    notebook = json.loads(text)
+
+    notebook.setdefault('metadata', {})['syllabus'] = metadata
+
+    return json.dumps(notebook, indent=2)
 
 
 def insert_metadata_python(p: Path, metadata: dict[str, str]) -> None:
@@ -133,17 +526,32 @@ def insert_metadata_python(p: Path, metadata: dict[str, str]) -> None:
 
     Metadata is appended (or updated) as simple `key: value` lines at the END
     of the module docstring (no --- delimiters). If the file has no module
-    docstring, one is created at the top.
+    docstring, one is created at the top. The file is not written if it
+    would not change.
     """
     original_text = p.read_text(encoding='utf-8')
 
+    text = python_with_metadata(original_text, metadata, filename=str(p))
+    if text == original_text:
+        return
+
+    write_text_atomic(p, text)
+
+    from syllabus.analysis import FileAnalysis
+    FileAnalysis.forget(p)
+
+
+def python_with_metadata(
+    original_text: str, metadata: dict[str, str], filename: str = '<unknown>'
+) -> str:
+    """Return the source of a Python file with metadata merged into its
+    module docstring. See :func:`insert_metadata_python`."""
+
     # 1) Get existing metadata + cleaned docstring text (without metadata lines)
-    try:
-        existing_md, cleaned_doc = extract_metadata_python(
-            p, with_doc=True
-        )  # type: ignore[assignment]
-    except Exception:
-        existing_md, cleaned_doc = {}, ''
+    doc_md, comment_md, cleaned_doc = python_metadata_from_source(
+        original_text, filename=filename
+    )
+    existing_md = {**doc_md, **comment_md}
 
     # 2) Merge metadata (new overrides old)
     merged = {**existing_md, **metadata}
@@ -162,37 +570,25 @@ def insert_metadata_python(p: Path, metadata: dict[str, str]) -> None:
     new_docstring_block = f'"""\n{new_docstring_text}"""\n\n'
 
     # 3) Remove the existing module docstring block from file text (if present)
-    try:
-        module = ast.parse(original_text, filename=str(p))
-        if (module.body
-                and isinstance(module.body[0], ast.Expr)
-                and isinstance(module.body[0].value, ast.Constant)
-                and isinstance(module.body[0].value.value, str)):
-            docnode = module.body[0]
-            lines = original_text.splitlines()
-            start = docnode.lineno - 1
-            end = getattr(docnode, 'end_lineno', docnode.lineno) - 1
-            # Remove those lines
-            del lines[start:end+1]
-            remainder = '\n'.join(lines).lstrip('\n')
-        else:
-            remainder = original_text.lstrip('\n')
-    except SyntaxError:
-        remainder = original_text
+    _, docstring, span = python_header(original_text)
+    if span is not None:
+        remainder = (
+            original_text[:span[0]] + original_text[span[1]:]
+        ).lstrip('\n')
+    else:
+        remainder = original_text.lstrip('\n')
 
-    # 4) Write new file content with reconstructed docstring at top
-    p.write_text(new_docstring_block + remainder, encoding='utf-8')
+    # 4) New file content with reconstructed docstring at top
+    return new_docstring_block + remainder
 
 
 
 def extract_metadata(p: Path) -> dict[str, str]:
     """Extract metadata from a file."""
-    if p.suffix == '.ipynb':
-        return extract_metadata_notebook(p)
-    elif p.suffix == '.md':
-        return extract_metadata_markdown(p)
-    elif p.suffix == '.py':
-        return extract_metadata_python(p)
+    from syllabus.analysis import FileAnalysis
+
+    if p.suffix in ('.ipynb', '.md', '.py'):
+        return FileAnalysis.for_path(p).metadata
     else:
         return {}
 
@@ -225,6 +621,140 @@ def replace_rank(f: Path, rank: str) -> Path:
 
     return f.with_stem(f.stem.replace(old_rank, rank, 1))
 
+
+# A rank: digits, then optional letters, as in "04b"
+rank_parts_p = re.compile(r'^(\d+)([A-Za-z]*)$')
+
+
+def rank_key(rank: str) -> tuple[int, str]:
+    """Return a sort key for a rank: its number, then its letters."""
+
+    digits, letters = rank_parts_p.match(rank).groups()
+    return int(digits), letters
+
+
+def increasing_subsequence(keys: list) -> list[int]:
+    """Return the indexes of a longest strictly increasing subsequence of
+    ``keys``. Keys that are None are never part of it."""
+
+    tails: list[int] = []  # Index of the smallest tail of each length
+    tail_keys: list = []
+    prev: list[int | None] = [None] * len(keys)
+
+    for i, k in enumerate(keys):
+        if k is None:
+            continue
+        j = bisect.bisect_left(tail_keys, k)
+        if j < len(tails) and tail_keys[j] == k:
+            continue  # Keep the earliest of equal keys
+        if j > 0:
+            prev[i] = tails[j - 1]
+        if j == len(tails):
+            tails.append(i)
+            tail_keys.append(k)
+        else:
+            tails[j] = i
+            tail_keys[j] = k
+
+    out: list[int] = []
+    i = tails[-1] if tails else None
+    while i is not None:
+        out.append(i)
+        i = prev[i]
+
+    return out[::-1]
+
+
+def _fill_ranks(
+    lo: tuple[int, str] | None, hi: tuple[int, str] | None, n: int,
+    increment: int, width: int
+) -> list[str] | None:
+    """Return ``n`` increasing ranks that sort between ``lo`` and ``hi``,
+    or None if there is no room."""
+
+    lo_n = lo[0] if lo is not None else 0
+    limit = 10 ** width
+
+    if hi is None:
+        # After the last rank that stays: keep counting by the increment
+        nums = [lo_n + increment * (k + 1) for k in range(n)]
+        if nums[-1] < limit:
+            return [str(x).zfill(width) for x in nums]
+        hi_n = limit
+    else:
+        hi_n = hi[0]
+
+    # Spread the ranks evenly over the free numbers in the gap
+    if hi_n - lo_n - 1 >= n:
+        step = (hi_n - lo_n) // (n + 1)
+        return [str(lo_n + step * (k + 1)).zfill(width) for k in range(n)]
+
+    # No free numbers, so add letters to the rank before the gap
+    if lo is None or n > 26:
+        return None
+
+    ranks = [(lo_n, lo[1] + chr(ord('a') + k)) for k in range(n)]
+    if hi is not None and ranks[-1] >= hi:
+        return None
+
+    return [str(x).zfill(width) + letters for x, letters in ranks]
+
+
+def minimal_ranks(
+    ranks: list[str], increment: int = 1, max_density: float = 0.5
+) -> list[str] | None:
+    """Return new ranks for a directory's entries, in their current order,
+    that strictly increase while changing as few of them as possible.
+
+    The longest run of ranks that already increase is kept, and the others
+    are given free numbers in the gaps around them, or a letter suffix,
+    like ``04b``, where there are no free numbers. Ranks with fewer digits
+    than the widest one always change, so that names sort the same as
+    ranks. Returns None if the directory should be renumbered from
+    scratch: when there is no room, or when more than ``max_density`` of
+    the ranks would have letters.
+    """
+
+    if not ranks:
+        return []
+
+    width = max(2, *(len(rank_parts_p.match(r).group(1)) for r in ranks))
+
+    keys = [
+        rank_key(r) if len(rank_parts_p.match(r).group(1)) == width else None
+        for r in ranks
+    ]
+    keep = set(increasing_subsequence(keys))
+
+    new = list(ranks)
+    i = 0
+    while i < len(ranks):
+        if i in keep:
+            i += 1
+            continue
+
+        j = i
+        while j < len(ranks) and j not in keep:
+            j += 1
+
+        filled = _fill_ranks(
+            keys[i - 1] if i > 0 else None,
+            keys[j] if j < len(ranks) else None,
+            j - i, increment, width
+        )
+        if filled is None:
+            return None
+
+        new[i:j] = filled
+        i = j
+
+    lettered = sum(1 for r in new if rank_key(r)[1])
+    if lettered / len(new) > max_density:
+        return None
+
+    return new
+
+
 def extract_rank_string(p: Path) -> str:
     """ Extract the rank from each components of the path and
     return a path composed of just the ranks"""
@@ -0,0 +1,308 @@
+"""Watch a lesson directory and keep its syllabus up to date.
+
+A :class:`Watcher` polls the lesson tree for changes to file sizes and
+mtimes. When a burst of changes settles, only the modules or lesson sets
+that contain the changed files are compiled again, and the results are
+spliced into the course that is held in memory before it is written out.
+"""
+
+import os
+import time
+from pathlib import Path
+
+from syllabus.analysis import FileAnalysis
+from syllabus.cache import CompileCache
+from syllabus.models import Course
+from syllabus.nodes import CourseNode, LessonSetNode, ModuleNode
+from syllabus.snapshot import TreeSnapshot
+from syllabus.sync import (
+    check_structure,
+    compile_container,
+    compile_course_header,
+    is_lesson_set,
+    module_dirs,
+)
+from syllabus.util import extract_rank_string, match_rank
+
+Signature = dict[Path, tuple[int, int] | None]
+
+
+def tree_signature(snapshot: TreeSnapshot) -> Signature:
+    """Return the (size, mtime) of every file in the lesson tree, and None
+    for every directory. Hidden directories, like ``.jtl``, are skipped."""
+
+    sig: Signature = {}
+
+    for dirpath, dirnames, filenames in snapshot.walk():
+        dirnames[:] = [
+            d for d in dirnames
+            if not d.startswith('.') and d != '__pycache__'
+        ]
+        for d in dirnames:
+            sig[Path(dirpath, d)] = None
+        for f in filenames:
+            p = Path(dirpath, f)
+            try:
+                st = snapshot.stat(p)
+            except OSError:
+                continue  # Removed while we were scanning
+            sig[p] = (st.st_size, st.st_mtime_ns)
+
+    return sig
+
+
+def changed_paths(old: Signature, new: Signature) -> set[Path]:
+    """Return the paths that were added, removed or modified."""
+
+    return {
+        p for p in old.keys() | new.keys()
+        if old.get(p, False) != new.get(p, False)
+    }
+
+
+class Watcher:
+    """Keeps a compiled course for a lesson directory, and recompiles the
+    parts of it that change.
+
+    ``output`` is the syllabus file to write, usually
+    ``.jtl/syllabus.yaml`` in the lesson directory. The course is kept with
+    the rank paths of its modules and lesson sets, so a recompiled
+    container can be put in place of the old one.
+    """
+
+    def __init__(
+        self,
+        lesson_dir: Path,
+        output: Path | None = None,
+        cache: CompileCache | None = None,
+        interval: float = 0.2,
+        debounce: float = 0.1,
+    ):
+        self.lesson_dir = Path(lesson_dir)
+        self.output = (
+            Path(output) if output is not None
+            else self.lesson_dir / '.jtl' / 'syllabus.yaml'
+        )
+        self.cache = cache or CompileCache(self.lesson_dir)
+        self.interval = interval
+        self.debounce = debounce
+
+        self.course: CourseNode | None = None
+        self.modules: dict[Path, ModuleNode] = {}
+        self.signature: Signature = {}
+        self.snapshot: TreeSnapshot | None = None
+        self._pending: tuple[TreeSnapshot, Signature] | None = None
+
+    def _scan(self) -> tuple[TreeSnapshot, Signature]:
+        snapshot = TreeSnapshot(self.lesson_dir)
+        return snapshot, tree_signature(snapshot)
+
+    def build(self) -> Course:
+        """Compile the whole lesson directory."""
+
+        self.snapshot, self.signature = self._scan()
+        self.cache.snapshot = self.snapshot
+
+        FileAnalysis.clear()
+        check_structure(self.lesson_dir, self.snapshot)
+
+        self.course = compile_course_header(self.lesson_dir, self.snapshot)
+        self.modules = {
+            d: compile_container(self.lesson_dir, d, self.cache, self.snapshot)
+            for d in module_dirs(self.lesson_dir, self.snapshot)
+        }
+
+        return self.compiled()
+
+    def compiled(self) -> Course:
+        """Return the course, sorted and without rank paths, the same as
+        :func:`syllabus.sync.compile_syllabus` would give."""
+
+        self.course.modules = list(self.modules.values())
+        self.course.sort()
+        return self.course.to_model()
+
+    def write(self) -> Course:
+        """Write the course to the output file and save the cache."""
+
+        course = self.compiled()
+        course.module_dir = str(
+            Path(os.path.relpath(self.lesson_dir, start=self.output.parent))
+        )
+
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        course.to_yaml(path=self.output)
+        self.cache.save()
+
+        return course
+
+    def poll(self) -> set[Path]:
+        """Scan the tree and return the paths that changed since the last
+        scan. The signatures are only updated by :meth:`update`."""
+
+        snapshot, sig = self._scan()
+        changed = changed_paths(self.signature, sig)
+        if changed:
+            self._pending = (snapshot, sig)
+        return changed
+
+    def wait(self) -> set[Path]:
+        """Block until something changes, then wait until the changes have
+        stopped for ``debounce`` seconds, and return everything that
+        changed."""
+
+        while True:
+            changed = self.poll()
+            if changed:
+                break
+            time.sleep(self.interval)
+
+        while True:
+            time.sleep(self.debounce)
+            snapshot, sig = self._scan()
+            if sig == self._pending[1]:
+                break
+            self._pending = (snapshot, sig)
+
+        return changed_paths(self.signature, self._pending[1])
+
+    def _containers(self, changed: set[Path]) -> tuple[bool, set[Path]]:
+        """Work out what to recompile. Returns whether the course header
+        must be read again, and the module and lesson set directories to
+        recompile. A ranked path directly under the lesson directory
+        means the modules themselves changed, which is given as the lesson
+        directory."""
+
+        header = False
+        dirs: set[Path] = set()
+        snapshots = [self.snapshot, self._pending[0]]
+
+        for p in changed:
+            parts = p.relative_to(self.lesson_dir).parts
+
+            if len(parts) == 1:
+                if p.name.lower() == 'readme.md':
+                    header = True
+                elif match_rank(p):
+                    dirs.add(self.lesson_dir)
+                continue
+
+            module = self.lesson_dir / parts[0]
+            if not match_rank(module):
+                continue
+
+            # Recompile just the lesson set, if the file is inside one that
+            # existed both before and after the change.
+            lesson_set = module / parts[1]
+            if len(parts) > 2 and all(
+                is_lesson_set(lesson_set, s) for s in snapshots
+            ):
+                dirs.add(lesson_set)
+            else:
+                dirs.add(module)
+
+        # A module being recompiled covers its lesson sets
+        dirs = {
+            d for d in dirs
+            if d.parent == self.lesson_dir or d.parent not in dirs
+        }
+        if self.lesson_dir in dirs:
+            dirs = {self.lesson_dir}
+
+        return header, dirs
+
+    def update(self, changed: set[Path]) -> list[Path]:
+        """Recompile the parts of the course affected by ``changed``, from
+        the scan made by the last :meth:`poll`. Returns the directories
+        that were recompiled. If the last update failed, the whole course
+        is compiled again."""
+
+        if self.course is None:
+            self.build()
+            return [self.lesson_dir]
+
+        snapshot, sig = self._pending
+        header, dirs = self._containers(changed)
+
+        for p in changed:
+            FileAnalysis.forget(p)
+            self.cache.forget(p)
+
+        self.snapshot, self.signature = snapshot, sig
+        self.cache.snapshot = snapshot
+
+        check_structure(self.lesson_dir, snapshot)
+
+        if header:
+            self.course = compile_course_header(self.lesson_dir, snapshot)
+
+        if self.lesson_dir in dirs:
+            old = self.modules
+            self.modules = {}
+            for d in module_dirs(self.lesson_dir, snapshot):
+                if d in old and not any(
+                    p == d or d in p.parents for p in changed
+                ):
+                    self.modules[d] = old[d]
+                else:
+                    self.modules[d] = compile_container(
+                        self.lesson_dir, d, self.cache, snapshot
+                    )
+            return sorted(dirs)
+
+        for d in sorted(dirs):
+            container = compile_container(
+                self.lesson_dir, d, self.cache, snapshot
+            )
+            if isinstance(container, ModuleNode):
+                self.modules[d] = container
+            else:
+                self._splice(d, container)
+
+        return sorted(dirs)
+
+    def _splice(self, d: Path, lesson_set: LessonSetNode) -> None:
+        """Put a recompiled lesson set in place of the old one."""
+
+        module = self.modules[d.parent]
+        path = extract_rank_string(d.relative_to(self.lesson_dir))
+
+        for i, lesson in enumerate(module.lessons):
+            if getattr(lesson, 'path', None) == path:
+                module.lessons[i] = lesson_set
+                return
+
+        module.lessons.append(lesson_set)
+
+    def run(self, once: bool = False) -> None:
+        """Compile and write the course, then keep it up to date until
+        interrupted."""
+
+        from syllabus.cli.main import logger
+
+        start = time.perf_counter()
+        self.build()
+        self.write()
+        logger.info(
+            "Compiled %s in %.3fs", self.lesson_dir,
+            time.perf_counter() - start
+        )
+
+        while not once:
+            changed = self.wait()
+            start = time.perf_counter()
+            try:
+                dirs = self.update(changed)
+                self.write()
+            except (ValueError, AssertionError) as e:
+                logger.error("Error: %s", e)
+                self.course = None  # Start over after the next change
+                continue
+
+            names = [
+                str(d.relative_to(self.lesson_dir)) for d in dirs
+            ] or ['course']
+            print(
+                f"Recompiled {', '.join(names)} in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms"
+            )
@@ -0,0 +1,138 @@
+"""Tests for syllabus.analysis."""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from syllabus import analysis
+from syllabus.analysis import FileAnalysis
+from syllabus.sync import compile_syllabus, get_readme_metadata
+from syllabus.util import (
+    extract_metadata,
+    extract_metadata_python,
+    get_imports,
+    needs_display,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_analyses():
+    FileAnalysis.clear()
+    yield
+    FileAnalysis.clear()
+
+
+class TestFileAnalysis:
+    def test_python(self, tmp_path):
+        p = tmp_path / "10_Draw.py"
+        p.write_text(
+            '"""\nDraw a square.\nuid: doc1\n"""\n'
+            "# name: Draw\n"
+            "import turtle\n"
+        )
+        a = FileAnalysis.for_path(p)
+        assert a.imports == ["turtle"]
+        assert a.doc_metadata == {"uid": "doc1"}
+        assert a.comment_metadata == {"name": "Draw"}
+        assert a.docstring == "Draw a square."
+        assert a.metadata == {"uid": "doc1", "name": "Draw"}
+
+    def test_markdown(self, tmp_path):
+        p = tmp_path / "README.md"
+        p.write_text("---\nuid: m1\n---\n\nIntro\n\n# Title\n\n# Other\n")
+        a = FileAnalysis.for_path(p)
+        assert a.frontmatter == {"uid": "m1"}
+        assert a.heading == "Title"
+
+    def test_notebook(self, tmp_path):
+        p = tmp_path / "nb.ipynb"
+        p.write_text(json.dumps({
+            "cells": [{"cell_type": "code", "source": ["import pygame\n"],
+                       "outputs": []}],
+            "metadata": {"syllabus": {"uid": "nb1"}},
+        }))
+        a = FileAnalysis.for_path(p)
+        assert a.imports == ["pygame"]
+        assert a.metadata == {"uid": "nb1"}
+
+    def test_memoized(self, simple_source):
+        p = simple_source / "10_Basics" / "10_Hello.py"
+        assert FileAnalysis.for_path(p) is FileAnalysis.for_path(p)
+
+    def test_rewritten_file_is_read_again(self, tmp_path):
+        p = tmp_path / "10_Draw.py"
+        p.write_text("# uid: one\n")
+        assert extract_metadata(p) == {"uid": "one"}
+        assert not needs_display(p)
+
+        p.write_text("# uid: two\nimport turtle\n")
+        assert extract_metadata(p) == {"uid": "two"}
+        assert needs_display(p)
+
+    def test_forget(self, simple_source):
+        p = simple_source / "10_Basics" / "10_Hello.py"
+        assert extract_metadata(p)["name"] == "Hello World"
+        # The same size and mtime, so only forget() notices the change
+        st = p.stat()
+        text = p.read_text()
+        p.write_text(text.replace("Hello World", "Hello Earth"))
+        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert extract_metadata(p)["name"] == "Hello World"
+        FileAnalysis.forget(p)
+        assert extract_metadata(p)["name"] == "Hello Earth"
+
+    def test_metadata_is_a_copy(self, simple_source):
+        p = simple_source / "10_Basics" / "20_Variables.md"
+        extract_metadata(p)["uid"] = "mutated"
+        assert extract_metadata(p)["uid"] == "test5678"
+
+
+class TestReadOnce:
+    def test_each_file_read_once(self, lessons_source, monkeypatch):
+        reads: list[Path] = []
+        read_text = Path.read_text
+
+        def counting_read_text(self, *args, **kwargs):
+            reads.append(self)
+            return read_text(self, *args, **kwargs)
+
+        monkeypatch.setattr(Path, "read_text", counting_read_text)
+
+        header_reads: list[Path] = []
+        read_header = analysis.read_markdown_header
+
+        def counting_read_header(p):
+            header_reads.append(p)
+            return read_header(p)
+
+        monkeypatch.setattr(
+            analysis, "read_markdown_header", counting_read_header
+        )
+
+        p = lessons_source / "10_Loops" / "20_Crazy_Tina.py"
+        needs_display(p)
+        get_imports(p)
+        extract_metadata_python(p, with_doc=True)
+        extract_metadata(p)
+        get_readme_metadata(lessons_source)
+        get_readme_metadata(lessons_source)
+
+        assert reads.count(p) == 1
+        assert reads.count(lessons_source / "README.md") == 0
+        assert header_reads == [lessons_source / "README.md"]
+
+    def test_compile_reads_each_file_once(self, lessons_source, monkeypatch):
+        reads: list[Path] = []
+        read_text = Path.read_text
+
+        def counting_read_text(self, *args, **kwargs):
+            reads.append(self)
+            return read_text(self, *args, **kwargs)
+
+        monkeypatch.setattr(Path, "read_text", counting_read_text)
+        compile_syllabus(lessons_source)
+
+        assert reads
+        assert len(reads) == len(set(reads))
@@ -0,0 +1,84 @@
+"""Tests for syllabus.batch."""
+
+import shutil
+
+from syllabus.batch import (
+    compile_all,
+    compile_course,
+    find_lesson_dirs,
+    read_manifest,
+    summary,
+)
+from syllabus.sync import compile_syllabus
+
+
+def make_repo(tmp_path, simple_source, lessons_source):
+    """Lay out two courses, a course with a stray file, and a directory
+    that is not a course."""
+
+    repo = tmp_path / "repo"
+    (repo / "docs").mkdir(parents=True)
+    (repo / "docs" / "README.md").write_text("# Docs\n")
+    shutil.move(simple_source, repo / "courses" / "simple")
+    shutil.move(lessons_source, repo / "courses" / "lessons")
+    bad = repo / "courses" / "bad"
+    (bad / "10_Module").mkdir(parents=True)
+    (bad / "README.md").write_text("# Bad\n")
+    (bad / "stray.py").write_text("x = 1\n")
+    return repo
+
+
+class TestFindLessonDirs:
+    def test_discovery(self, tmp_path, simple_source, lessons_source):
+        repo = make_repo(tmp_path, simple_source, lessons_source)
+        # Not into the modules of a course, nor hidden directories
+        shutil.copytree(repo / "courses" / "simple", repo / ".cache" / "x")
+
+        assert find_lesson_dirs([repo]) == [
+            repo / "courses" / "bad",
+            repo / "courses" / "lessons",
+            repo / "courses" / "simple",
+        ]
+
+    def test_root_is_a_course(self, simple_source):
+        assert find_lesson_dirs([simple_source, simple_source]) \
+            == [simple_source]
+
+    def test_manifest(self, tmp_path):
+        manifest = tmp_path / "courses.txt"
+        manifest.write_text("# Our courses\ncourses/a\n\n  courses/b  \n")
+        assert read_manifest(manifest) == [
+            tmp_path / "courses" / "a", tmp_path / "courses" / "b",
+        ]
+
+
+class TestCompileAll:
+    def test_same_as_compile(self, simple_source):
+        result = compile_course(simple_source)
+        assert result.ok
+        assert result.lessons == 4
+        assert result.output == simple_source / ".jtl" / "syllabus.yaml"
+
+        course = compile_syllabus(simple_source, model=False)
+        course.module_dir = ".."
+        assert result.output.read_text() == course.to_yaml()
+
+    def test_pool_and_failures(self, tmp_path, simple_source,
+                               lessons_source):
+        repo = make_repo(tmp_path, simple_source, lessons_source)
+        dirs = find_lesson_dirs([repo])
+
+        results = compile_all(dirs, jobs=2)
+        assert [r.lesson_dir for r in results] == dirs
+        assert [r.ok for r in results] == [False, True, True]
+        assert "stray.py" in results[0].error
+        assert not (repo / "courses" / "bad" / ".jtl").exists()
+
+        # The second run is served from the caches
+        again = compile_all(dirs, jobs=1)
+        assert all(r.misses == 0 for r in again if r.ok)
+        assert [r.lessons for r in again] == [r.lessons for r in results]
+
+        table = summary(results, 1.0)
+        assert "FAILED: Unexpected file" in table
+        assert table.splitlines()[-1] == "3 courses, 1 failed, in 1.00 s"
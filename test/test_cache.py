@@ -0,0 +1,92 @@
+"""Tests for syllabus.cache."""
+
+import os
+
+from click.testing import CliRunner
+
+from syllabus.cache import CompileCache
+from syllabus.cli.main import cli
+from syllabus.sync import compile_syllabus
+
+
+class TestCompileCache:
+    def test_first_compile_misses(self, simple_source):
+        cache = CompileCache.load(simple_source)
+        compile_syllabus(simple_source, cache=cache)
+        assert cache.hits == 0
+        assert cache.misses == 4
+
+    def test_second_compile_hits(self, simple_source):
+        cache = CompileCache.load(simple_source)
+        compile_syllabus(simple_source, cache=cache)
+        cache.save()
+
+        cache = CompileCache.load(simple_source)
+        compile_syllabus(simple_source, cache=cache)
+        assert cache.hits == 4
+        assert cache.misses == 0
+
+    def test_changed_file_misses(self, simple_source):
+        cache = CompileCache.load(simple_source)
+        compile_syllabus(simple_source, cache=cache)
+        cache.save()
+
+        p = simple_source / "10_Basics" / "10_Hello.py"
+        p.write_text("# name: Changed Name\n# uid: test1234\n")
+
+        cache = CompileCache.load(simple_source)
+        course = compile_syllabus(simple_source, cache=cache)
+        assert cache.hits == 3
+        assert cache.misses == 1
+        assert course.modules[0].lessons[0].name == "Changed Name"
+
+    def test_touched_file_misses(self, simple_source):
+        cache = CompileCache.load(simple_source)
+        compile_syllabus(simple_source, cache=cache)
+        cache.save()
+
+        p = simple_source / "10_Basics" / "10_Hello.py"
+        st = os.stat(p)
+        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        cache = CompileCache.load(simple_source)
+        compile_syllabus(simple_source, cache=cache)
+        assert cache.misses == 1
+
+    def test_cached_output_identical(self, lessons_source):
+        expected = compile_syllabus(lessons_source).to_yaml()
+
+        cache = CompileCache.load(lessons_source)
+        compile_syllabus(lessons_source, cache=cache)
+        cache.save()
+
+        cache = CompileCache.load(lessons_source)
+        actual = compile_syllabus(lessons_source, cache=cache).to_yaml()
+        assert cache.misses == 0
+        assert actual == expected
+
+    def test_corrupt_cache_file(self, simple_source):
+        path = simple_source / ".jtl" / "cache.json"
+        path.parent.mkdir()
+        path.write_text("{not json")
+        cache = CompileCache.load(simple_source)
+        assert cache.entries == {}
+
+
+class TestCacheCLI:
+    def test_stats_line(self, simple_source):
+        runner = CliRunner()
+        args = ["-l", str(simple_source), "compile"]
+        runner.invoke(cli, args)
+        result = runner.invoke(cli, args)
+        assert result.exit_code == 0
+        assert "Cache: 4 hits, 0 misses" in result.output
+
+    def test_no_cache(self, simple_source):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["-l", str(simple_source), "compile", "--no-cache"]
+        )
+        assert result.exit_code == 0
+        assert "Cache:" not in result.output
+        assert not (simple_source / ".jtl" / "cache.json").exists()
@@ -1,8 +1,11 @@
 """Tests for the CLI using Click's CliRunner."""
 
 import os
+import subprocess
+import sys
 from pathlib import Path
 
+import yaml
 from click.testing import CliRunner
 
 from syllabus.cli.main import cli
@@ -25,6 +28,14 @@ class TestCLI:
         assert result.exit_code == 0
         assert "Course YAML written to" in result.output
 
+    def test_compile_jobs(self, simple_source):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["-l", str(simple_source), "compile", "-j", "2"]
+        )
+        assert result.exit_code == 0
+        assert "Course YAML written to" in result.output
+
     def test_check_valid(self, simple_source):
         runner = CliRunner()
         result = runner.invoke(
@@ -40,6 +51,28 @@ class TestCLI:
         result = runner.invoke(cli, ["-l", str(bad_dir), "check"])
         assert result.exit_code == 1
 
+    def test_compile_regroup_collision(self, simple_source):
+        # Regrouping would make a directory where a file already is
+        basics = simple_source / "10_Basics"
+        for name in ("30_Loops.py", "30_Loops.md", "30_Loops"):
+            (basics / name).write_text("")
+
+        runner = CliRunner()
+        result = runner.invoke(cli, ["-l", str(simple_source), "compile", "-g"])
+        assert result.exit_code == 1
+        assert isinstance(result.exception, SystemExit)
+        assert (basics / "30_Loops").is_file()
+
+    def test_compile_minimal_requires_renumber(self, simple_source):
+        runner = CliRunner()
+        for args in (["--minimal"], ["-g", "--minimal"]):
+            result = runner.invoke(
+                cli, ["-l", str(simple_source), "compile", *args]
+            )
+            assert result.exit_code == 2
+            assert "--minimal requires -n" in result.output
+        assert not (simple_source / ".jtl").exists()
+
     def test_renumber_dryrun(self, simple_source):
         runner = CliRunner()
         result = runner.invoke(
@@ -60,3 +93,139 @@ class TestCLI:
             cli, ["-v", "-l", str(simple_source), "meta", "-d"]
         )
         assert result.exit_code == 0
+        assert "Would change 10_Basics/README.md" in result.stdout
+        readme = simple_source / "10_Basics" / "README.md"
+        assert "uid" not in readme.read_text()
+
+    def test_compile_sidecar(self, simple_source):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["-l", str(simple_source), "compile", "--sidecar"]
+        )
+        assert result.exit_code == 0
+        assert (simple_source / ".jtl" / "syllabus.json").exists()
+
+    def test_compile_stdout(self, simple_source):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["-l", str(simple_source), "-f", "-", "compile"]
+        )
+        assert result.exit_code == 0
+        assert "name: Simple Test Course" in result.stdout
+
+    def test_renumber_dryrun_writes_plan(self, simple_source):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["-l", str(simple_source), "renumber", "-d", "-i", "100"]
+        )
+        assert result.exit_code == 0
+        assert (simple_source / ".jtl" / "plan.json").exists()
+
+
+class TestQuery:
+    def compile(self, source):
+        runner = CliRunner()
+        runner.invoke(cli, ["-l", str(source), "compile"])
+        return runner
+
+    def test_by_path(self, lessons_source):
+        runner = self.compile(lessons_source)
+        result = runner.invoke(cli, [
+            "-l", str(lessons_source), "query",
+            "--path", "10_Loops/20_Crazy_Tina.py",
+        ])
+        assert result.exit_code == 0
+        assert yaml.safe_load(result.output) == [{
+            "name": "Crazy Tina",
+            "exercise": "10_Loops/20_Crazy_Tina.py",
+            "display": True,
+        }]
+
+    def test_parents(self, lessons_source):
+        runner = self.compile(lessons_source)
+        result = runner.invoke(cli, [
+            "-l", str(lessons_source), "query", "--display", "--parents",
+        ])
+        assert result.exit_code == 0
+        chains = yaml.safe_load(result.output)
+        assert len(chains) == 4
+        assert chains[0][-1] == {
+            "name": "Your First Lessons in Python", "uid": "course01"
+        }
+
+    def test_no_match(self, lessons_source):
+        runner = self.compile(lessons_source)
+        result = runner.invoke(cli, [
+            "-l", str(lessons_source), "query", "--uid", "nope",
+        ])
+        assert result.exit_code == 1
+
+    def test_not_compiled(self, lessons_source):
+        result = CliRunner().invoke(cli, [
+            "-l", str(lessons_source), "query", "--display",
+        ])
+        assert result.exit_code == 1
+
+
+class TestCompileAll:
+    def test_compile_all(self, tmp_path, monkeypatch, simple_source,
+                         lessons_source):
+        # The working directory has no lessons/, which is fine here
+        monkeypatch.chdir(tmp_path)
+        runner = CliRunner()
+        result = runner.invoke(cli, ["compile-all"])
+        assert result.exit_code == 0, result.output
+        assert "2 courses, 0 failed" in result.output
+        assert (simple_source / ".jtl" / "syllabus.yaml").exists()
+        assert (lessons_source / ".jtl" / "syllabus.yaml").exists()
+
+    def test_manifest_and_failure(self, tmp_path, monkeypatch,
+                                  simple_source):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "bad").mkdir()
+        (tmp_path / "bad" / "stray.py").write_text("x = 1\n")
+        manifest = tmp_path / "courses.txt"
+        manifest.write_text("simple-source\nbad\n")
+
+        runner = CliRunner()
+        result = runner.invoke(cli, [
+            "compile-all", "-m", str(manifest), "-j", "1",
+        ])
+        assert result.exit_code == 1
+        assert "2 courses, 1 failed" in result.output
+        assert (simple_source / ".jtl" / "syllabus.yaml").exists()
+
+
+# Run in a fresh interpreter, since the test process has imported
+# everything already
+LIGHT_IMPORTS = """
+import sys
+from syllabus.cli.main import cli
+try:
+    cli(sys.argv[1:])
+except SystemExit as e:
+    assert not e.code, e.code
+heavy = {'pydantic', 'yaml', 'frontmatter'} & set(sys.modules)
+assert not heavy, heavy
+"""
+
+
+class TestLazyImports:
+    def run(self, *args):
+        return subprocess.run(
+            [sys.executable, "-c", LIGHT_IMPORTS, *args],
+            capture_output=True, text=True, check=False,
+        )
+
+    def test_import_cli(self):
+        result = self.run("--help")
+        assert result.returncode == 0, result.stderr
+
+    def test_version_option(self):
+        result = self.run("--version")
+        assert result.returncode == 0, result.stderr
+        assert "syl, version" in result.stdout
+
+    def test_check(self, lessons_source):
+        result = self.run("-l", str(lessons_source), "check")
+        assert result.returncode == 0, result.stderr
@@ -3,7 +3,9 @@
 import yaml
 from pathlib import Path
 
-from syllabus.models import Course, Lesson, Module, LessonSet, to_yaml
+from syllabus.models import (
+    Course, Lesson, Module, LessonSet, libyaml_safe, to_yaml
+)
 
 
 class TestLesson:
@@ -99,3 +101,124 @@ class TestCourse:
         ])
         course.sort()
         assert course.modules[0].name == "A"
+
+
+class TestCourseIndex:
+    def course(self, golden_dir):
+        return Course.from_yaml(golden_dir / "lessons-source-syllabus.yaml")
+
+    def test_by_path(self, golden_dir):
+        course = self.course(golden_dir)
+        lesson = course.by_path("10_Loops/20_Crazy_Tina.py")
+        assert lesson.name == "Crazy Tina"
+        assert course.by_path("10_Loops/20_Crazy_Tina.md").lesson \
+            == "10_Loops/20_Crazy_Tina.md"
+        assert course.by_path("nope.py") is None
+
+    def test_by_uid(self, golden_dir):
+        course = self.course(golden_dir)
+        course.modules[1].lessons[0].uid = "set1"
+        course.reindex()
+        assert course.by_uid("set1").name == "First"
+        assert course.by_uid(False) is None
+
+    def test_by_name(self, golden_dir):
+        course = self.course(golden_dir)
+        assert len(course.by_name("Crazy Tina")) == 2
+        assert course.by_name("Nobody") == []
+
+    def test_parents(self, golden_dir):
+        course = self.course(golden_dir)
+        lesson = course.by_path("20_Turtles/01_First/020_Meet_Tina.py")
+        assert [p.name for p in course.parents(lesson)] \
+            == ["First", "Lesson 2: Turtles", course.name]
+        assert course.parent(course) is None
+
+    def test_find_lessons(self, golden_dir):
+        course = self.course(golden_dir)
+        names = [l.name for l in course.find_lessons(display=True)]
+        assert names == [
+            "Crazy Tina", "Meet Tina", "Turtle Tricks", "Efficient Turtle"
+        ]
+
+    def test_index_is_lazy(self, golden_dir):
+        course = self.course(golden_dir)
+        assert course._index is None
+        course.by_name("Strings")
+        index = course.index()
+        course.by_uid("x")
+        assert course.index() is index
+
+
+class TestFastLoad:
+    def test_sidecar(self, golden_dir, tmp_path):
+        path = tmp_path / "syllabus.yaml"
+        path.write_text(
+            (golden_dir / "lessons-source-syllabus.yaml").read_text()
+        )
+        course = Course.from_yaml(path)
+        course.write_sidecar(path)
+
+        loaded = Course.load(path)
+        assert loaded.model_dump() == course.model_dump()
+        assert loaded.to_yaml() == path.read_text()
+
+    def test_stale_sidecar_ignored(self, golden_dir, tmp_path):
+        path = tmp_path / "syllabus.yaml"
+        path.write_text(
+            (golden_dir / "simple-source-syllabus.yaml").read_text()
+        )
+        Course.from_yaml(path).write_sidecar(path)
+
+        course = Course.from_yaml(path)
+        course.name = "Changed"
+        course.to_yaml(path=path)
+        assert Course.load(path).name == "Changed"
+
+    def test_no_sidecar(self, golden_dir):
+        course = Course.load(golden_dir / "simple-source-syllabus.yaml")
+        assert course.name == "Simple Test Course"
+
+
+class TestFastDump:
+    def test_golden_byte_identical(self, golden_dir):
+        for name in ("simple-source-syllabus.yaml",
+                     "lessons-source-syllabus.yaml"):
+            path = golden_dir / name
+            course = Course.from_yaml(path)
+            assert libyaml_safe(course.model_dump(exclude_none=True))
+            assert course.to_yaml() == path.read_text()
+
+    def test_matches_pure_python_emitter(self):
+        for description in (
+            "Two\nlines",
+            "Trailing space \nbefore a break",
+            "Café " * 30,
+            "Tab\there, and a long line that needs wrapping " * 4,
+            "'Quoted' and: colons # and hashes " * 5,
+        ):
+            course = Course(name="C", uid="u", description=description,
+                            modules=[Module(name="M", lessons=[
+                                Lesson(name=description, display=True)
+                            ])])
+            data = course.model_dump(exclude_defaults=True,
+                                     exclude_none=True, by_alias=True)
+            assert course.to_yaml() == yaml.dump(data, sort_keys=False)
+
+    def test_to_yaml_stream(self, tmp_path):
+        course = Course(name="Stream", uid="s1")
+        path = tmp_path / "syllabus.yaml"
+        course.to_yaml(path=path)
+        assert path.read_text() == course.to_yaml()
+
+    def test_to_json_matches_json_dumps(self, golden_dir, tmp_path):
+        import json
+        course = Course.from_yaml(
+            golden_dir / "lessons-source-syllabus.yaml"
+        )
+        for description in ("plain", "café ☃", "del\x7f"):
+            course.description = description
+            expected = json.dumps(course.model_dump(), indent=4)
+            assert course.to_json() == expected
+            course.to_json(path=tmp_path / "syllabus.json")
+            assert (tmp_path / "syllabus.json").read_text() == expected
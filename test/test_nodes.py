@@ -0,0 +1,62 @@
+"""Tests for syllabus.nodes."""
+
+from pathlib import Path
+
+import pytest
+
+from syllabus.models import Course, Lesson
+from syllabus.nodes import CourseNode, LessonNode, LessonSetNode, ModuleNode
+from syllabus.sync import compile_syllabus
+
+
+class TestNodes:
+    def test_slotted(self):
+        lesson = LessonNode("A", path="10")
+        assert not hasattr(lesson, "__dict__")
+        assert not hasattr(ModuleNode("M"), "__dict__")
+
+    def test_to_model(self):
+        course = CourseNode("C", uid="c1", modules=[
+            ModuleNode("M", path="10", lessons=[
+                LessonSetNode("S", path="10/20", lessons=[
+                    LessonNode("A", path="10/20/30", uid=123),
+                ]),
+            ]),
+        ])
+
+        model = course.to_model()
+
+        assert isinstance(model, Course)
+        lesson = model.modules[0].lessons[0].lessons[0]
+        assert isinstance(lesson, Lesson)
+        assert lesson.uid == 123  # Not validated
+        assert not hasattr(lesson, "path")
+        assert not hasattr(model.modules[0], "path")
+
+    def test_to_model_with_path(self):
+        lesson = LessonNode("A", path="10").to_model(path=True)
+        assert lesson.path == "10"
+
+    @pytest.mark.parametrize("fixture", ["simple_source", "lessons_source"])
+    @pytest.mark.parametrize("simplify", [False, True])
+    def test_yaml_same_as_model(self, request, fixture, simplify):
+        source = request.getfixturevalue(fixture)
+        node = compile_syllabus(source, model=False)
+        model = compile_syllabus(source)
+
+        assert isinstance(node, CourseNode)
+        node.uid = model.uid  # A course without a uid gets a random one
+        assert node.to_yaml(simplify=simplify) \
+            == model.to_yaml(simplify=simplify)
+
+    def test_to_yaml_file(self, simple_source, tmp_path):
+        node = compile_syllabus(simple_source, model=False)
+        out = tmp_path / "syllabus.yaml"
+        node.to_yaml(path=out)
+        assert out.read_text() == node.to_yaml()
+
+    def test_new_lesson(self, simple_source):
+        lesson = LessonNode.new(simple_source, Path("10_Basics/10_Hello.py"))
+        assert lesson.name == "Hello World"
+        assert lesson.uid == "test1234"
+        assert lesson.path == "10/10"
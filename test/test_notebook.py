@@ -0,0 +1,226 @@
+"""Tests for syllabus.notebook."""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from syllabus import notebook
+from syllabus.notebook import (
+    JsonScanner,
+    cell_python,
+    cells_imports,
+    patch_notebook_metadata,
+    scan_notebook,
+)
+from syllabus.util import (
+    extract_metadata_notebook,
+    needs_display,
+    notebook_with_metadata,
+)
+
+TEST_DIR = Path(__file__).parent
+
+
+def notebook_imports(p: Path) -> list[str]:
+    return cells_imports(scan_notebook(p)[1], filename=str(p))
+
+
+def big_notebook(output_size: int = 1_000_000) -> dict:
+    return {
+        "cells": [
+            {
+                "cell_type": "code",
+                "metadata": {"note": "cell \"metadata\" is not it"},
+                "outputs": [
+                    {"data": {"image/png": "A\\\"" * (output_size // 3)}}
+                ],
+                "source": ["import turtle\n"],
+            }
+        ],
+        "metadata": {"syllabus": {"uid": "big123", "name": "Big"}},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+
+
+class TestJsonScanner:
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 1 << 16])
+    def test_matches_json_load(self, monkeypatch, chunk_size):
+        monkeypatch.setattr(notebook, "CHUNK_SIZE", chunk_size)
+        data = {
+            "a": [1, -2.5e3, True, False, None, "x\\\"y"],
+            "b": {"c": "\\\\", "d": []},
+            "e": "é\\u00e9",
+        }
+        text = json.dumps(data, indent=1)
+        scanner = JsonScanner(file=io.StringIO(text))
+        result = {}
+        for key in scanner.iter_object():
+            result[key] = scanner.read_value()
+        assert result == data
+
+    def test_skip_keeps_buffer_small(self, monkeypatch):
+        monkeypatch.setattr(notebook, "CHUNK_SIZE", 1024)
+        text = json.dumps(big_notebook())
+        scanner = JsonScanner(file=io.StringIO(text))
+        largest = 0
+        for key in scanner.iter_object():
+            if key == "metadata":
+                assert scanner.read_value()["syllabus"]["uid"] == "big123"
+            else:
+                scanner.skip_value()
+            largest = max(largest, len(scanner.buf))
+        assert largest < 4096
+
+    def test_value_span(self):
+        text = '{"a": [1, 2], "b": {"c": 3}}'
+        scanner = JsonScanner(text)
+        spans = {}
+        for key in scanner.iter_object():
+            spans[key] = scanner.value_span()
+        assert text[slice(*spans["a"])] == "[1, 2]"
+        assert text[slice(*spans["b"])] == '{"c": 3}'
+
+    def test_malformed(self):
+        scanner = JsonScanner('{"a": [1, 2}')
+        with pytest.raises(ValueError):
+            for _ in scanner.iter_object():
+                scanner.skip_value()
+
+
+class TestScanNotebook:
+    def test_fixture_notebooks(self):
+        for p in (TEST_DIR / "lessons-source").rglob("*.ipynb"):
+            expected = json.loads(p.read_text())["metadata"]
+            assert scan_notebook(p)[0] == expected, p
+
+    def test_big_notebook(self, tmp_path):
+        p = tmp_path / "big.ipynb"
+        p.write_text(json.dumps(big_notebook(), indent=1))
+        assert extract_metadata_notebook(p) == {"uid": "big123", "name": "Big"}
+
+    def test_no_metadata(self, tmp_path):
+        p = tmp_path / "empty.ipynb"
+        p.write_text('{"cells": [], "nbformat": 4}')
+        assert scan_notebook(p) == ({}, [])
+
+    def test_fallback_to_full_parse(self, tmp_path, monkeypatch):
+        p = tmp_path / "nb.ipynb"
+        p.write_text('{"metadata": {"syllabus": {"uid": "x"}}}')
+
+        def broken(self):
+            raise ValueError("scan failed")
+
+        monkeypatch.setattr(JsonScanner, "iter_object", broken)
+        assert extract_metadata_notebook(p) == {"uid": "x"}
+
+
+class TestPatchNotebookMetadata:
+    @pytest.mark.parametrize("indent", [None, 1, 2])
+    def test_replaces_only_syllabus(self, indent):
+        nb = big_notebook(3000)
+        nb["metadata"]["kernelspec"] = {"name": "python3"}
+        text = json.dumps(nb, indent=indent)
+
+        patched = patch_notebook_metadata(text, {"uid": "new", "name": "é"})
+
+        nb["metadata"]["syllabus"] = {"uid": "new", "name": "é"}
+        assert json.loads(patched) == nb
+        cells_end = text.index('"metadata": {"syllabus"' if indent is None
+                               else '"metadata": {\n')
+        assert patched[:cells_end] == text[:cells_end]
+        assert patched.endswith(text[text.index('"nbformat"') - 2:])
+
+    @pytest.mark.parametrize("indent", [None, 1])
+    @pytest.mark.parametrize("metadata", [{}, {"kernelspec": {"a": 1}}])
+    def test_adds_syllabus(self, indent, metadata):
+        nb = {"cells": [], "metadata": metadata, "nbformat": 4}
+        text = json.dumps(nb, indent=indent)
+
+        patched = patch_notebook_metadata(text, {"uid": "x"})
+
+        assert patched == json.dumps(
+            {**nb, "metadata": {**metadata, "syllabus": {"uid": "x"}}},
+            indent=indent
+        )
+
+    def test_no_metadata(self):
+        text = '{"cells": [], "nbformat": 4}'
+        assert patch_notebook_metadata(text, {"uid": "x"}) is None
+        assert json.loads(notebook_with_metadata(text, {"uid": "x"})) == {
+            "cells": [], "nbformat": 4, "metadata": {"syllabus": {"uid": "x"}}
+        }
+
+
+def write_notebook(p: Path, cells: list[tuple[str, str]]) -> Path:
+    p.write_text(json.dumps({
+        "cells": [
+            {
+                "cell_type": cell_type,
+                "metadata": {},
+                "outputs": [{"data": {"text/plain": ["import pygame"]}}],
+                "source": source.splitlines(keepends=True),
+            }
+            for cell_type, source in cells
+        ],
+        "metadata": {},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }, indent=1))
+    return p
+
+
+class TestNotebookImports:
+    def test_code_cells_only(self, tmp_path):
+        p = write_notebook(tmp_path / "nb.ipynb", [
+            ("markdown", "```python\nimport tkinter\n```\n"),
+            ("code", "import turtle\nt = turtle.Turtle()\n"),
+        ])
+        assert scan_notebook(p)[1] == ["import turtle\nt = turtle.Turtle()\n"]
+        assert notebook_imports(p) == ["turtle"]
+        assert needs_display(p)
+
+    def test_no_display(self, tmp_path):
+        p = write_notebook(tmp_path / "nb.ipynb", [
+            ("code", "import math\n"),
+        ])
+        assert not needs_display(p)
+
+    def test_magics_and_shell(self, tmp_path):
+        p = write_notebook(tmp_path / "nb.ipynb", [
+            ("code", "%matplotlib inline\n!pip install x\nimport pygame\n"),
+            ("code", "for i in range(3):\n    !echo hi\nlen?\n"),
+            ("code", "%%bash\nimport guizero\n"),
+            ("code", "%%time\nfrom guizero import App\n"),
+        ])
+        assert notebook_imports(p) == ["guizero", "pygame"]
+
+    def test_invalid_cell_ignored(self, tmp_path):
+        p = write_notebook(tmp_path / "nb.ipynb", [
+            ("code", "def broken(:\n"),
+            ("code", "import tkinter.ttk\n"),
+        ])
+        assert notebook_imports(p) == ["tkinter"]
+
+    def test_cell_python(self):
+        assert cell_python("  %time x = 1\ny = 2") == "  pass\ny = 2"
+        assert cell_python("%%html\n<b>hi</b>") == ""
+
+    def test_question_mark_in_comment_or_string(self):
+        assert cell_python("len?\n  x.y??\n?len") \
+            == "pass\n  pass\npass"
+        for line in ("import turtle  # what?", "s = 'what?'",
+                     "s = '''what?", "# what?", "s = 'a#b?'"):
+            assert cell_python(line) == line
+
+    def test_comment_ending_in_question_mark(self, tmp_path):
+        p = write_notebook(tmp_path / "nb.ipynb", [
+            ("code", "import turtle  # what does this do?\n"),
+        ])
+        assert needs_display(p)
+
+    def test_fixture_notebooks_parse(self):
+        for p in (TEST_DIR / "lessons-source").rglob("*.ipynb"):
+            assert "turtle" not in notebook_imports(p), p
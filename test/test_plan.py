@@ -0,0 +1,90 @@
+"""Tests for syllabus.plan."""
+
+import json
+
+import pytest
+
+from syllabus.plan import RenamePlan
+from syllabus.snapshot import TreeModel
+from syllabus.sync import regroup_lessons, renumber_lessons
+
+
+class TestRenamePlan:
+    def test_swap_uses_temporary_names(self, simple_source):
+        basics = simple_source / "10_Basics"
+        hello = (basics / "10_Hello.py").read_text()
+        variables = (basics / "20_Variables.md").read_text()
+
+        tree = TreeModel.scan(simple_source)
+        plan = RenamePlan(simple_source)
+        plan.move(basics / "10_Hello.py", basics / "20_Variables.md")
+        plan.move(basics / "20_Variables.md", basics / "10_Hello.py")
+        plan.apply(tree)
+        tree.commit()
+
+        assert (basics / "20_Variables.md").read_text() == hello
+        assert (basics / "10_Hello.py").read_text() == variables
+        assert len(plan.steps) == 4
+        assert sorted(p.name for p in basics.iterdir()) == [
+            "10_Hello.py", "20_Variables.md", "README.md"
+        ]
+
+    def test_collisions_change_nothing(self, simple_source):
+        basics = simple_source / "10_Basics"
+        tree = TreeModel.scan(simple_source)
+        plan = RenamePlan(simple_source)
+        plan.move(basics / "10_Hello.py", basics / "30_Same.py")
+        plan.move(basics / "20_Variables.md", basics / "30_Same.py")
+        plan.move(basics / "missing.py", basics / "40_Missing.py")
+        plan.move(basics / "README.md", basics / "10_Hello.py")
+
+        with pytest.raises(ValueError) as e:
+            plan.apply(tree)
+
+        assert "would both be moved to '10_Basics/30_Same.py'" in str(e.value)
+        assert "'10_Basics/missing.py': it does not exist" in str(e.value)
+        assert "'10_Basics/10_Hello.py' already exists" not in str(e.value)
+        assert tree.ops == []
+
+    def test_to_dict(self, simple_source):
+        basics = simple_source / "10_Basics"
+        plan = RenamePlan(simple_source)
+        plan.rmdir(basics / "99_Empty")
+        plan.move(basics / "10_Hello.py", basics / "01_Hello.py")
+        plan.resolve(TreeModel.scan(simple_source))
+
+        d = plan.to_dict()
+        assert d["move"] == [["10_Basics/10_Hello.py", "10_Basics/01_Hello.py"]]
+        assert d["steps"] == [
+            ["rmdir", "10_Basics/99_Empty"],
+            ["rename", "10_Basics/10_Hello.py", "10_Basics/01_Hello.py"],
+        ]
+
+
+class TestPlannedCommands:
+    def test_renumber_dryrun_plan(self, simple_source):
+        (simple_source / "10_Basics" / "15_Empty").mkdir()
+        before = sorted(simple_source.rglob("*"))
+
+        plan = renumber_lessons(simple_source, increment=100, dryrun=True)
+
+        assert sorted(simple_source.rglob("*")) == before
+        assert plan.rmdirs == [simple_source / "10_Basics" / "15_Empty"]
+        assert ["10_Basics", "100_Basics"] in plan.to_dict()["move"]
+
+        path = plan.write()
+        assert path == simple_source / ".jtl" / "plan.json"
+        assert json.loads(path.read_text())["rmdir"] == ["10_Basics/15_Empty"]
+
+    def test_empty_dirs_not_numbered(self, simple_source):
+        (simple_source / "10_Basics" / "15_Empty").mkdir()
+        renumber_lessons(simple_source, increment=10, dryrun=False)
+        assert not (simple_source / "10_Basics" / "15_Empty").exists()
+        assert (simple_source / "10_Basics" / "20_Variables.md").exists()
+
+    def test_regroup_plan(self, lessons_source):
+        plan = regroup_lessons(lessons_source, dryrun=True)
+        loops = lessons_source / "10_Loops"
+        assert loops / "20_Crazy_Tina" in plan.mkdirs
+        assert (loops / "20_Crazy_Tina.md",
+                loops / "20_Crazy_Tina" / "README.md") in plan.moves
@@ -0,0 +1,66 @@
+"""Tests for syllabus.profile."""
+
+import pstats
+import time
+
+from click.testing import CliRunner
+
+from syllabus import profile as profile_module
+from syllabus.cli.main import cli
+from syllabus.profile import count, phase, profile
+from syllabus.sync import compile_syllabus
+
+
+class TestProfile:
+    def test_inactive_is_a_no_op(self):
+        with phase("walk"):
+            count("fs.stat")
+        assert profile_module._active is None
+
+    def test_nested_phases_are_exclusive(self, monkeypatch):
+        # Each reading of the clock is one second after the last
+        clock = iter(range(100))
+        monkeypatch.setattr(time, "perf_counter", lambda: next(clock))
+
+        with profile() as prof:
+            with phase("outer"):
+                with phase("inner"):
+                    pass
+
+        assert prof.times == {"outer": 2, "inner": 1}
+        assert prof.total == 5
+
+    def test_compile_phases_and_counts(self, lessons_source):
+        with profile() as prof:
+            compile_syllabus(lessons_source)
+
+        assert {"walk", "classify", "analyze", "build", "sort"} \
+            <= set(prof.times)
+        counts = prof.as_dict()["counts"]
+        assert counts["files.opened"] > 0
+        assert counts["bytes.read"] > 0
+        assert counts["parse.notebook"] > 0
+        assert counts["parse.python"] > 0
+        assert counts["fs.scandir"] > 0
+        assert "analyze" in prof.report()
+
+    def test_cprofile_dump(self, simple_source, tmp_path):
+        out = tmp_path / "run.prof"
+        with profile(cprofile=out):
+            compile_syllabus(simple_source)
+        assert pstats.Stats(str(out)).total_calls > 0
+
+
+class TestProfileCLI:
+    def test_profile_option(self, simple_source, tmp_path):
+        out = tmp_path / "run.prof"
+        runner = CliRunner()
+        result = runner.invoke(cli, [
+            "-l", str(simple_source), "--profile", "--cprofile", str(out),
+            "compile",
+        ])
+        assert result.exit_code == 0
+        assert "phase" in result.stderr
+        assert "files.opened" in result.stderr
+        assert out.exists()
+        assert profile_module._active is None
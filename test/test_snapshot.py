@@ -0,0 +1,142 @@
+"""Tests for syllabus.snapshot."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from syllabus.snapshot import TreeModel, TreeSnapshot
+from syllabus.sync import compile_syllabus, iterlessons, what_is
+
+
+class TestTreeSnapshot:
+    def test_is_dir(self, simple_source):
+        snapshot = TreeSnapshot.scan(simple_source)
+        assert snapshot.is_dir(simple_source / "10_Basics")
+        assert not snapshot.is_dir(simple_source / "10_Basics" / "10_Hello.py")
+        assert not snapshot.is_dir(simple_source / "missing")
+
+    def test_exists(self, simple_source):
+        snapshot = TreeSnapshot.scan(simple_source)
+        assert snapshot.exists(simple_source / "README.md")
+        assert not snapshot.exists(simple_source / "NOPE.md")
+
+    def test_names_sorted(self, simple_source):
+        snapshot = TreeSnapshot.scan(simple_source)
+        assert snapshot.names(simple_source / "10_Basics") == [
+            "10_Hello.py", "20_Variables.md", "README.md"
+        ]
+
+    def test_walk_matches_os_walk(self, lessons_source):
+        snapshot = TreeSnapshot(lessons_source)
+        walked = {
+            str(d): (sorted(dn), sorted(fn))
+            for d, dn, fn in snapshot.walk()
+        }
+        expected = {
+            d: (sorted(dn), sorted(fn))
+            for d, dn, fn in os.walk(lessons_source)
+        }
+        assert walked == expected
+
+    def test_walk_prunes(self, lessons_source):
+        snapshot = TreeSnapshot(lessons_source)
+        seen = []
+        for d, dirnames, _ in snapshot.walk():
+            seen.append(d)
+            dirnames.clear()
+        assert seen == [lessons_source]
+
+    def test_what_is_matches_live(self, lessons_source):
+        snapshot = TreeSnapshot.scan(lessons_source)
+        for d, dirnames, filenames in os.walk(lessons_source):
+            for n in dirnames + filenames:
+                p = Path(d, n)
+                assert what_is(p, snapshot) == what_is(p), p
+
+
+class TestSnapshotReads:
+    def test_no_fs_classification_after_scan(
+        self, lessons_source, monkeypatch
+    ):
+        """Once scanned, compiling must not list or probe directories."""
+        snapshot = TreeSnapshot.scan(lessons_source)
+        expected = compile_syllabus(lessons_source).to_yaml()
+
+        probes = []
+
+        def recorder(name, orig):
+            def probe(*args, **kwargs):
+                probes.append((name, args))
+                return orig(*args, **kwargs)
+            return probe
+
+        for name in ("iterdir", "is_dir", "exists"):
+            monkeypatch.setattr(
+                Path, name, recorder(name, getattr(Path, name))
+            )
+        monkeypatch.setattr(os, "scandir", recorder("scandir", os.scandir))
+
+        actual = compile_syllabus(lessons_source, snapshot=snapshot)
+        monkeypatch.undo()
+
+        assert probes == []
+        assert actual.to_yaml() == expected
+
+    def test_iterlessons(self, simple_source):
+        kinds = [t for t, _ in iterlessons(simple_source)]
+        assert kinds.count("LF") == 4
+        assert kinds.count("MO") == 2
+        assert kinds.count("RM") == 2
+
+    def test_missing_root(self, tmp_path):
+        snapshot = TreeSnapshot(tmp_path / "missing")
+        assert list(snapshot.walk()) == []
+        with pytest.raises(FileNotFoundError):
+            snapshot.stat(tmp_path / "missing")
+
+
+class TestTreeModel:
+    def test_changes_wait_for_commit(self, simple_source):
+        tree = TreeModel.scan(simple_source)
+        basics = simple_source / "10_Basics"
+
+        tree.mkdir(basics / "30_New")
+        tree.rename(basics / "10_Hello.py", basics / "30_New" / "Hello.py")
+        tree.write_text(basics / "30_New" / "README.md", "# New\n")
+
+        assert tree.names(basics / "30_New") == ["Hello.py", "README.md"]
+        assert not tree.exists(basics / "10_Hello.py")
+        assert tree.read_text(basics / "30_New" / "Hello.py") == (
+            (basics / "10_Hello.py").read_text()
+        )
+        assert not (basics / "30_New").exists()
+
+        tree.commit()
+
+        assert (basics / "30_New" / "Hello.py").exists()
+        assert (basics / "30_New" / "README.md").read_text() == "# New\n"
+        assert not (basics / "10_Hello.py").exists()
+
+    def test_rename_directory(self, lessons_source):
+        tree = TreeModel.scan(lessons_source)
+        old = lessons_source / "20_Turtles"
+        new = lessons_source / "30_Turtles"
+
+        tree.rename(old, new)
+
+        assert tree.is_dir(new / "01_First")
+        assert tree.source(new / "01_First" / "020_Meet_Tina.py") == (
+            old / "01_First" / "020_Meet_Tina.py"
+        )
+
+    def test_rename_onto_existing(self, simple_source):
+        tree = TreeModel.scan(simple_source)
+        with pytest.raises(FileExistsError):
+            tree.rename(simple_source / "10_Basics",
+                        simple_source / "20_Advanced")
+
+    def test_walk_matches_snapshot(self, lessons_source):
+        tree = TreeModel.scan(lessons_source)
+        snapshot = TreeSnapshot.scan(lessons_source)
+        assert list(tree.walk()) == list(snapshot.walk())
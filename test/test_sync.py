@@ -5,16 +5,21 @@ from pathlib import Path
 
 import pytest
 
+from syllabus.cache import CompileCache
 from syllabus.sync import (
     check_structure,
+    compile_pipeline,
     compile_syllabus,
     is_lesson,
     is_lesson_set,
     is_module,
+    lesson_files,
+    metafy_lessons,
     renumber_lessons,
     regroup_lessons,
     what_is,
 )
+from syllabus.util import stable_uid
 
 
 class TestCheckStructure:
@@ -109,6 +114,20 @@ class TestCompileSyllabus:
             f"Expected:\n{expected}\nActual:\n{actual}"
         )
 
+    def test_parallel_matches_serial(self, lessons_source):
+        serial = compile_syllabus(lessons_source).to_yaml()
+        parallel = compile_syllabus(lessons_source, jobs=2).to_yaml()
+        assert parallel == serial
+
+    def test_lesson_files(self, lessons_source):
+        files = lesson_files(lessons_source)
+        rel = [str(p.relative_to(lessons_source)) for p in files]
+        assert "10_Loops/20_Crazy_Tina.py" in rel
+        assert (
+            "10_Loops/70_Fizz_Buzz_Badgers/Fizz_Buzz_Badgers.py" in rel
+        )
+        assert "10_Loops/README.md" not in rel
+
 
 class TestRenumberLessons:
     def test_renumber_increment_100(self, simple_source, golden_dir):
@@ -140,6 +159,23 @@ class TestRenumberLessons:
         ).read_text()
         assert renamed == original
 
+    def test_minimal_renames_only_inserted(self, simple_source):
+        basics = simple_source / "10_Basics"
+        (basics / "10_Greeting.py").write_text("print('hi')\n")
+
+        plan = renumber_lessons(simple_source, dryrun=False, minimal=True)
+
+        assert plan.moves == [
+            (basics / "10_Hello.py", basics / "15_Hello.py")
+        ]
+        assert sorted(p.name for p in basics.iterdir()) == [
+            "10_Greeting.py", "15_Hello.py", "20_Variables.md", "README.md"
+        ]
+
+    def test_minimal_noop(self, simple_source):
+        plan = renumber_lessons(simple_source, dryrun=False, minimal=True)
+        assert not plan
+
 
 class TestRegroupLessons:
     def test_regroup_creates_directories(self, lessons_source):
@@ -157,3 +193,139 @@ class TestRegroupLessons:
         regroup_lessons(lessons_source, dryrun=True)
         after = set(str(p) for p in lessons_source.rglob("*"))
         assert before == after
+
+
+def without_uids(d):
+    if isinstance(d, dict):
+        return {k: without_uids(v) for k, v in d.items() if k != "uid"}
+    if isinstance(d, list):
+        return [without_uids(v) for v in d]
+    return d
+
+
+def tree_listing(root: Path) -> list[str]:
+    return sorted(str(p.relative_to(root)) for p in root.rglob("*"))
+
+
+def tree_contents(root: Path) -> dict[str, tuple[bytes, int]]:
+    return {
+        str(p.relative_to(root)): (p.read_bytes(), p.stat().st_mtime_ns)
+        for p in root.rglob("*") if p.is_file()
+    }
+
+
+class TestMetafyLessons:
+    def test_dryrun_changes_nothing(self, lessons_source):
+        before = tree_contents(lessons_source)
+        changed = metafy_lessons(lessons_source, dryrun=True)
+        assert changed
+        assert tree_contents(lessons_source) == before
+
+    def test_second_run_writes_nothing(self, lessons_source):
+        changed = metafy_lessons(lessons_source, dryrun=False)
+        assert lessons_source / "10_Loops" / "20_Crazy_Tina.py" in changed
+
+        before = tree_contents(lessons_source)
+        assert metafy_lessons(lessons_source, dryrun=False) == []
+        assert tree_contents(lessons_source) == before
+
+    def test_no_temp_files_left(self, lessons_source):
+        metafy_lessons(lessons_source, dryrun=False)
+        assert not list(lessons_source.rglob("*.syl-tmp"))
+
+
+def untag_course(root: Path) -> None:
+    readme = root / "README.md"
+    readme.write_text(readme.read_text().replace("uid: course01\n", ""))
+
+
+class TestDeterministicUids:
+    def test_compile_byte_identical(self, lessons_source):
+        untag_course(lessons_source)
+
+        first = compile_syllabus(lessons_source, uid_seed="s1").to_yaml()
+        again = compile_syllabus(lessons_source, uid_seed="s1").to_yaml()
+        other = compile_syllabus(lessons_source, uid_seed="s2").to_yaml()
+
+        assert first == again
+        assert first != other
+
+    def test_seed_in_readme(self, lessons_source):
+        untag_course(lessons_source)
+        readme = lessons_source / "README.md"
+        readme.write_text(readme.read_text().replace(
+            "---\n", "---\nuid_seed: course-seed\n", 1
+        ))
+
+        course = compile_syllabus(lessons_source)
+        assert course.uid == stable_uid("course-seed", ".")
+        assert compile_syllabus(lessons_source).uid == course.uid
+
+    def test_metafy_same_everywhere(self, lessons_source, tmp_path):
+        import shutil
+
+        untag_course(lessons_source)
+        other = tmp_path / "other"
+        shutil.copytree(lessons_source, other)
+
+        metafy_lessons(lessons_source, dryrun=False, uid_seed="s1")
+        metafy_lessons(other, dryrun=False, uid_seed="s1")
+
+        def files(root):
+            return {
+                k: v[0] for k, v in tree_contents(root).items()
+                if not k.startswith(".jtl")
+            }
+
+        assert files(lessons_source) == files(other)
+        # The course README gets the uid that compiling would make up
+        assert compile_syllabus(other).uid == stable_uid("s1", ".")
+
+
+class TestCompilePipeline:
+    def test_matches_separate_passes(self, lessons_source, tmp_path):
+        import shutil
+
+        other = tmp_path / "separate"
+        shutil.copytree(lessons_source, other)
+
+        regroup_lessons(other, dryrun=False)
+        renumber_lessons(other, increment=10, dryrun=False)
+        metafy_lessons(other, dryrun=False)
+        expected = compile_syllabus(other)
+
+        course = compile_pipeline(
+            lessons_source, regroup=True, renumber=True, metafy=True,
+            increment=10,
+        )
+
+        assert tree_listing(lessons_source) == tree_listing(other)
+        assert (without_uids(course.model_dump())
+                == without_uids(expected.model_dump()))
+
+    def test_with_cache(self, lessons_source):
+        cache = CompileCache.load(lessons_source)
+        course = compile_pipeline(
+            lessons_source, regroup=True, renumber=True, metafy=True,
+            increment=10, cache=cache,
+        )
+        assert (without_uids(course.model_dump())
+                == without_uids(compile_syllabus(lessons_source).model_dump()))
+
+    def test_scans_once(self, lessons_source, monkeypatch):
+        scanned: list[str] = []
+        scandir = os.scandir
+
+        def recording_scandir(p):
+            scanned.append(str(p))
+            return scandir(p)
+
+        monkeypatch.setattr(os, "scandir", recording_scandir)
+        compile_pipeline(
+            lessons_source, regroup=True, renumber=True, metafy=True
+        )
+        monkeypatch.undo()
+
+        assert len(scanned) == len(set(scanned))
+        assert str(lessons_source / "10_Loops" / "20_Crazy_Tina") \
+            not in scanned
@@ -0,0 +1,115 @@
+"""Tests for syllabus.uids."""
+
+import shutil
+
+from click.testing import CliRunner
+
+from syllabus import uids as uids_module
+from syllabus.analysis import FileAnalysis
+from syllabus.cli.main import cli
+from syllabus.snapshot import TreeSnapshot
+from syllabus.sync import metafy_lessons, uid_files
+from syllabus.uids import UidRegistry, find_duplicates
+from syllabus.util import extract_metadata, stable_uid
+
+
+def registry_for(lesson_dir):
+    FileAnalysis.clear()
+    snapshot = TreeSnapshot(lesson_dir)
+    registry = UidRegistry.load(lesson_dir)
+    return registry.refresh(uid_files(lesson_dir, snapshot), snapshot)
+
+
+class TestUidRegistry:
+    def test_refresh(self, lessons_source):
+        registry = registry_for(lessons_source)
+        assert "course01" in registry
+        assert registry.paths("course01") == ["README.md"]
+
+    def test_metafy_registers_uids(self, lessons_source):
+        metafy_lessons(lessons_source, dryrun=False)
+        registry = UidRegistry.load(lessons_source)
+
+        for p in uid_files(lessons_source):
+            uid = extract_metadata(p).get("uid")
+            if uid:
+                key = p.relative_to(lessons_source).as_posix()
+                assert registry.paths(uid) == [key]
+
+        assert registry.duplicates() == {}
+
+    def test_new_uid_avoids_collisions(self, lessons_source, monkeypatch):
+        registry = registry_for(lessons_source)
+        made = iter(["course01", "course01", "fresh123"])
+        monkeypatch.setattr(uids_module, "rand62", lambda n: next(made))
+
+        assert registry.new_uid(lessons_source / "x.py") == "fresh123"
+        assert registry.paths("fresh123") == ["x.py"]
+
+    def test_seeded_uid(self, lessons_source):
+        registry = registry_for(lessons_source)
+        first = registry.new_uid(lessons_source / "10_Loops" / "20_A.py",
+                                 seed="s1")
+        second = registry.new_uid(lessons_source / "10_Loops" / "20_A.ipynb",
+                                  seed="s1")
+
+        assert first == stable_uid("s1", "10/20")
+        assert second == stable_uid("s1", "10/20", attempt=1)
+
+    def test_only_changed_files_read(self, lessons_source, monkeypatch):
+        registry_for(lessons_source).save()
+
+        readme = lessons_source / "README.md"
+        readme.write_text("---\nuid: changed1\n---\n\n# Course\n")
+
+        read = []
+
+        def recording(p):
+            read.append(p)
+            return extract_metadata(p)
+
+        monkeypatch.setattr(uids_module, "extract_metadata", recording)
+        registry = registry_for(lessons_source)
+
+        assert read == [readme]
+        assert "changed1" in registry
+        assert "course01" not in registry
+
+    def test_removed_file_dropped(self, lessons_source):
+        registry_for(lessons_source).save()
+        (lessons_source / "README.md").unlink()
+        assert "course01" not in registry_for(lessons_source)
+
+    def test_duplicates(self, lessons_source, tmp_path):
+        other = tmp_path / "other"
+        shutil.copytree(lessons_source, other)
+        shutil.copy(
+            lessons_source / "README.md",
+            lessons_source / "10_Loops" / "README.md",
+        )
+
+        one, two = registry_for(lessons_source), registry_for(other)
+        assert one.duplicates() == {
+            "course01": ["10_Loops/README.md", "README.md"]
+        }
+        assert len(find_duplicates([one, two])["course01"]) == 3
+
+
+class TestUidsCLI:
+    def test_check(self, lessons_source, tmp_path):
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["-l", str(lessons_source), "uids", "--check"]
+        )
+        assert result.exit_code == 0
+        assert "0 duplicate uids" in result.output
+        assert (lessons_source / ".jtl" / "uids.json").exists()
+
+        other = tmp_path / "other"
+        shutil.copytree(lessons_source, other)
+        result = runner.invoke(cli, [
+            "-l", str(lessons_source), "uids", "--check",
+            str(lessons_source), str(other),
+        ])
+        assert result.exit_code == 1
+        assert "Duplicate uid course01" in result.output
@@ -1,17 +1,27 @@
 """Tests for syllabus.util functions."""
 
+import time
 from pathlib import Path
 
+from syllabus.profile import profile
 from syllabus.util import (
     DISPLAY_MODULES,
+    MARKDOWN_CHUNK,
     clean_filename,
     extract_metadata_markdown,
     extract_metadata_python,
     extract_rank_string,
+    get_imports,
+    imports_from_source,
     match_rank,
     match_rank_name,
+    minimal_ranks,
+    python_header,
+    python_with_metadata,
     rand62,
+    read_markdown_header,
     replace_rank,
+    stable_uid,
 )
 
 
@@ -80,6 +90,40 @@ class TestReplaceRank:
         assert result == Path("100_Hello.py")
 
 
+class TestMinimalRanks:
+    def test_in_order_unchanged(self):
+        assert minimal_ranks(["10", "15", "20", "30"]) == [
+            "10", "15", "20", "30"
+        ]
+
+    def test_duplicate_takes_gap(self):
+        assert minimal_ranks(["10", "20", "20", "30"]) == [
+            "10", "20", "25", "30"
+        ]
+
+    def test_no_gap_uses_letter(self):
+        assert minimal_ranks(["01", "02", "02", "03"]) == [
+            "01", "02", "02a", "03"
+        ]
+
+    def test_after_last_uses_increment(self):
+        assert minimal_ranks(["10", "20", "10"], increment=10) == [
+            "10", "20", "30"
+        ]
+
+    def test_short_rank_padded(self):
+        assert minimal_ranks(["9", "10", "11"]) == ["05", "10", "11"]
+
+    def test_too_dense(self):
+        assert minimal_ranks(["01", "01", "01", "02"]) == [
+            "01", "01a", "01b", "02"
+        ]
+        assert minimal_ranks(["01", "01", "01", "02"], max_density=0.3) is None
+
+    def test_no_room(self):
+        assert minimal_ranks(["01", "01", "00"]) is None
+
+
 class TestExtractRankString:
     def test_single_level(self):
         assert extract_rank_string(Path("10_Loops")) == "10"
@@ -101,6 +145,27 @@ class TestRand62:
         assert all(c in valid for c in result)
 
 
+class TestStableUid:
+    def test_deterministic(self):
+        assert stable_uid("seed", "10/20") == stable_uid("seed", "10/20")
+
+    def test_inputs_matter(self):
+        uids = {
+            stable_uid("seed", "10/20"),
+            stable_uid("seed", "10/30"),
+            stable_uid("other", "10/20"),
+            stable_uid("seed", "10/20", attempt=1),
+        }
+        assert len(uids) == 4
+
+    def test_characters(self):
+        import string
+        valid = set(string.ascii_letters + string.digits)
+        result = stable_uid("seed", ".", n=20)
+        assert len(result) == 20
+        assert all(c in valid for c in result)
+
+
 class TestExtractMetadataPython:
     def test_comment_metadata(self, tmp_path):
         p = tmp_path / "test.py"
@@ -123,6 +188,39 @@ class TestExtractMetadataPython:
         assert md["name"] == "Test"
         assert "Some description" in doc
 
+    def test_deep_comment_not_metadata(self, tmp_path):
+        p = tmp_path / "test.py"
+        p.write_text('"""\nname: Test\n"""\n# uid: abc\n\n'
+                     'x = 1\n# note: not metadata\n')
+        assert extract_metadata_python(p) == {"name": "Test", "uid": "abc"}
+
+    def test_syntax_error_after_header(self, tmp_path):
+        p = tmp_path / "test.py"
+        p.write_text("'''name: Broken'''\nprint('unclosed\n")
+        assert extract_metadata_python(p) == {"name": "Broken"}
+
+
+class TestPythonHeader:
+    def test_comments_and_docstring(self):
+        text = ('#!/usr/bin/env python\n# a: 1\n\n'
+                'r"""Doc \\" here"""\n# b: 2\nx = 1\n')
+        comments, doc, span = python_header(text)
+        assert comments == ["#!/usr/bin/env python", "# a: 1", "# b: 2"]
+        assert doc == 'Doc \\" here'
+        assert text[span[0]:span[1]] == 'r"""Doc \\" here"""\n'
+
+    def test_no_docstring(self):
+        assert python_header('x = "s"\n"""not a docstring"""\n') == (
+            [], None, None
+        )
+        assert python_header('"a" + "b"\n') == ([], None, None)
+
+    def test_with_metadata_idempotent(self):
+        text = '"""\nAbout.\n"""\n\nprint("hi")\n'
+        once = python_with_metadata(text, {"uid": "x"})
+        assert once == '"""\nAbout.\n\nuid: x\n"""\n\nprint("hi")\n'
+        assert python_with_metadata(once, {"uid": "x"}) == once
+
 
 class TestExtractMetadataMarkdown:
     def test_frontmatter(self, tmp_path):
@@ -133,9 +231,113 @@ class TestExtractMetadataMarkdown:
         assert md["name"] == "Test Lesson"
 
 
+class TestReadMarkdownHeader:
+    def test_frontmatter_and_heading(self, tmp_path):
+        p = tmp_path / "README.md"
+        p.write_text("\n---\nuid: abc\n---\n\nText\n# Title \n\n# Other\n")
+        assert read_markdown_header(p) == ({"uid": "abc"}, "Title")
+
+    def test_reads_only_the_header(self, tmp_path):
+        p = tmp_path / "README.md"
+        # Bytes that are not UTF-8 fail the read if it gets that far
+        p.write_bytes(b"---\nname: Long\n---\n# Head\n"
+                      + b"body\n" * 10000 + b"\xff\xfe")
+        assert read_markdown_header(p) == ({"name": "Long"}, "Head")
+
+    def test_name_without_heading(self, tmp_path):
+        # The heading is only needed for the name, so the read stops at
+        # the chunk that ends the frontmatter
+        p = tmp_path / "README.md"
+        p.write_bytes(b"---\nuid: abc\nname: No Head\n---\n"
+                      + b"body\n" * 10000 + b"\xff\xfe")
+        with profile() as prof:
+            assert read_markdown_header(p) == (
+                {"uid": "abc", "name": "No Head"}, None
+            )
+        assert prof.counts["bytes.read"] == MARKDOWN_CHUNK
+
+    def test_long_file_without_header(self, tmp_path):
+        # Each chunk is scanned once, so the read is linear in the size
+        p = tmp_path / "README.md"
+        p.write_text("---\nuid: abc\n---\n" + "Some body text.\n" * 250000
+                     + "x" * 1000000)
+        start = time.perf_counter()
+        assert read_markdown_header(p) == ({"uid": "abc"}, None)
+        assert time.perf_counter() - start < 2
+
+    def test_no_frontmatter_or_heading(self, tmp_path):
+        p = tmp_path / "README.md"
+        p.write_text("Just text\n" * 1000)
+        assert read_markdown_header(p) == ({}, None)
+
+
 class TestDisplayModules:
     def test_known_modules(self):
         assert "turtle" in DISPLAY_MODULES
         assert "guizero" in DISPLAY_MODULES
         assert "pygame" in DISPLAY_MODULES
         assert "tkinter" in DISPLAY_MODULES
+
+
+class TestGetImports:
+    def test_simple(self):
+        src = "import turtle\nimport os.path as p\nfrom math import pi\n"
+        assert imports_from_source(src) == ["math", "os", "turtle"]
+
+    def test_nested_and_multiline(self):
+        src = (
+            "def main():\n"
+            "    import pygame\n"
+            "from tkinter import (\n"
+            "    Tk,\n"
+            "    Label)\n"
+            "import guizero, \\\n"
+            "    json\n"
+        )
+        assert imports_from_source(src) == [
+            "guizero", "json", "pygame", "tkinter"
+        ]
+
+    def test_relative_import(self):
+        src = "from . import x\nfrom .y import z\n"
+        assert imports_from_source(src) == ["y"]
+
+    def test_ignores_strings_and_comments(self):
+        src = (
+            '"""\nimport turtle\n"""\n'
+            "# import pygame\n"
+            "x = 'import tkinter'\n"
+            "s = '''\nfrom guizero import App\n'''\n"
+        )
+        assert imports_from_source(src) == []
+
+    def test_semicolon(self):
+        assert imports_from_source("x = 1; import turtle\n") == ["turtle"]
+
+    def test_compound_statements(self):
+        # One-line compound statements put the import after a colon
+        assert imports_from_source("try: import turtle\n"
+                                   "except ImportError: pass\n") == ["turtle"]
+        assert imports_from_source("if True: import pygame\n") == ["pygame"]
+        assert imports_from_source("class A: import tkinter\n") \
+            == ["tkinter"]
+        assert imports_from_source("with x: from guizero import App\n") \
+            == ["guizero"]
+
+    def test_syntax_error_degrades(self):
+        src = "import turtle\ndef broken(:\n    pass\n"
+        assert imports_from_source(src) == ["turtle"]
+
+    def test_unterminated_string(self):
+        src = 'import turtle\n"""\nimport pygame\n'
+        assert imports_from_source(src) == ["turtle"]
+
+    def test_matches_ast_on_fixtures(self):
+        import ast
+        from syllabus.util import _import_names
+
+        test_dir = Path(__file__).parent
+        for p in test_dir.glob("*-source/**/*.py"):
+            src = p.read_text()
+            expected = sorted(_import_names(ast.parse(src)))
+            assert get_imports(p) == expected, p
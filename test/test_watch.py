@@ -0,0 +1,103 @@
+"""Tests for syllabus.watch."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from syllabus.models import Course
+from syllabus.sync import compile_syllabus
+from syllabus.watch import Watcher
+
+
+def full_compile(lesson_dir: Path, uid: str) -> dict:
+    course = compile_syllabus(lesson_dir)
+    course.uid = uid
+    return course.model_dump()
+
+
+@pytest.fixture
+def watcher(lessons_source) -> Watcher:
+    w = Watcher(lessons_source)
+    w.build()
+    return w
+
+
+def update(w: Watcher) -> list[Path]:
+    changed = w.poll()
+    assert changed
+    return w.update(changed)
+
+
+class TestWatcher:
+    def test_build_matches_compile(self, watcher, lessons_source):
+        course = watcher.write()
+        assert course.model_dump() == {
+            **full_compile(lessons_source, course.uid),
+            "module_dir": "..",
+        }
+        assert Course.from_yaml(lessons_source / ".jtl" / "syllabus.yaml")
+
+    def test_no_change(self, watcher):
+        assert watcher.poll() == set()
+
+    def test_lesson_set_recompiled(self, watcher, lessons_source):
+        p = lessons_source / "20_Turtles" / "02_Second" / "050_Turtle_Tricks.py"
+        p.write_text('"""\nname: Tricky Turtle\n"""\nimport turtle\n')
+
+        assert update(watcher) == [p.parent]
+
+        course = watcher.compiled()
+        assert course.model_dump() == full_compile(lessons_source, course.uid)
+        assert "Tricky Turtle" in course.to_yaml()
+
+    def test_module_recompiled(self, watcher, lessons_source):
+        p = lessons_source / "10_Loops" / "30_While.py"
+        p.write_text("# name: While Loops\n")
+
+        assert update(watcher) == [lessons_source / "10_Loops"]
+
+        course = watcher.compiled()
+        assert course.model_dump() == full_compile(lessons_source, course.uid)
+        assert "While Loops" in course.to_yaml()
+
+    def test_module_added_and_removed(self, watcher, lessons_source):
+        new = lessons_source / "30_Functions"
+        new.mkdir()
+        (new / "10_Def.py").write_text("print('hi')\n")
+
+        assert update(watcher) == [lessons_source]
+        course = watcher.compiled()
+        assert [m.name for m in course.modules][-1] == "Functions"
+        assert course.model_dump() == full_compile(lessons_source, course.uid)
+
+        shutil.rmtree(new)
+        update(watcher)
+        course = watcher.compiled()
+        assert "Functions" not in [m.name for m in course.modules]
+        assert course.model_dump() == full_compile(lessons_source, course.uid)
+
+    def test_readme_updates_header(self, watcher, lessons_source):
+        readme = lessons_source / "README.md"
+        readme.write_text("---\nname: Renamed\nuid: abc\n---\n")
+
+        assert update(watcher) == []
+        assert watcher.compiled().name == "Renamed"
+
+    def test_jtl_ignored(self, watcher, lessons_source):
+        watcher.write()
+        assert watcher.poll() == set()
+
+    def test_error_then_rebuild(self, watcher, lessons_source):
+        stray = lessons_source / "stray.py"
+        stray.write_text("x = 1\n")
+
+        with pytest.raises(ValueError):
+            update(watcher)
+
+        watcher.course = None
+        stray.unlink()
+        (lessons_source / "10_Loops" / "30_While.py").write_text("x = 1\n")
+        assert update(watcher) == [lessons_source]
+        course = watcher.compiled()
+        assert course.model_dump() == full_compile(lessons_source, course.uid)